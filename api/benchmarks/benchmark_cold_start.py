@@ -0,0 +1,242 @@
+"""
+Benchmark the cold start of the Lambda handlers listed in serverless.yml.
+
+The import time of every handler module is measured with python -X importtime in a fresh interpreter, which is what a
+new Lambda container pays before the first request. The first invocation of every handler is timed in another fresh
+interpreter against moto - it includes creating the boto3 session and clients, loading the service models and the
+first DynamoDB requests. Run it from the api folder:
+
+    python -m benchmarks.benchmark_cold_start --repeat 5
+
+The benchmark exits with an error if the median import time of a handler module exceeds its budget, so it can be used
+to catch regressions, e.g. a heavy module imported at the top of a handler module again. Budgets can be overridden:
+
+    python -m benchmarks.benchmark_cold_start --budget iwanttoreadmore.handlers.handlers_user=50
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import importlib
+import statistics
+import subprocess
+
+# Maximal median import time of the handler modules in milliseconds. The votes handlers need boto3 for every request,
+# so it is loaded when their module is imported, while the users handlers load it on first use.
+DEFAULT_IMPORT_BUDGETS = {
+    "iwanttoreadmore.handlers.handlers_user": 100,
+    "iwanttoreadmore.handlers.handlers_vote": 600,
+}
+
+
+def get_handlers(serverless_file="serverless.yml"):
+    """
+    Get all handlers configured in the Serverless configuration
+    :param serverless_file: path to the Serverless configuration
+    :return: list of (module name, function name) tuples
+    """
+    with open(serverless_file) as file:
+        handlers = re.findall(
+            r"^\s+handler:\s*(\S+)\.(\w+)\s*$", file.read(), re.MULTILINE
+        )
+
+    return [(module.replace("/", "."), function) for module, function in handlers]
+
+
+def measure_import_time(module):
+    """
+    Measure the time needed to import a module in a fresh interpreter
+    :param module: name of the module
+    :return: cumulative import time of the module in milliseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # Each line has the format "import time: self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1000
+
+    raise RuntimeError(f"Import time of {module} not found")
+
+
+def get_benchmark_event(function):
+    """
+    Create a request event for a handler, using the data from the test fixtures
+    :param function: name of the handler function
+    :return: event
+    """
+    from iwanttoreadmore.common import sign_cookie
+
+    headers = {"Cookie": sign_cookie("user=user_1"), "Client-Ip": "192.168.0.1"}
+    topic_path = dict(user="user_1", project="project_a", topic="topic_aaa")
+
+    events = dict(
+        add_vote=dict(pathParameters=topic_path),
+        add_votes_batch=dict(
+            pathParameters=dict(user="user_1"),
+            body=json.dumps(dict(votes=[dict(project="project_a", topic="topic_aaa")])),
+        ),
+        add_vote_and_redirect=dict(pathParameters=topic_path),
+        get_votes_for_user=dict(pathParameters=dict(user="user_1")),
+        get_votes_for_project=dict(pathParameters=dict(user="user_1", project="project_a")),
+        get_vote_history=dict(pathParameters=topic_path),
+        set_vote_hidden=dict(pathParameters=topic_path, body="1"),
+        delete_vote=dict(pathParameters=topic_path),
+        login_user=dict(body="identifier=user_1&password=test"),
+        change_password=dict(body="newpassword=test1&newpassword2=test1"),
+        change_account_public=dict(body="1"),
+        change_voted_message_and_redirect=dict(body="voted_message=Thanks"),
+        add_single_voting_project=dict(body="project_c"),
+        remove_single_voting_project=dict(body="project_c"),
+    )
+
+    return dict(dict(headers=headers, body=None), **events.get(function, dict()))
+
+
+def invoke_first_time(module, function):
+    """
+    Invoke a handler for the first time in the current interpreter against moto and print the results as JSON. The
+    tables, test data and cookie secret are created before the handler module is imported.
+    :param module: name of the handler module
+    :param function: name of the handler function
+    """
+    from moto import mock_dynamodb2, mock_ssm
+    from tests.helpers import create_cookie_parameter
+    from tests.data.data_test_user import create_users_table, create_test_users_data
+    from tests.data.data_test_vote import create_votes_table, create_test_votes_data
+    from tests.data.data_test_vote_history import (
+        create_vote_history_table,
+        create_test_vote_history_data,
+    )
+    from tests.data.data_test_vote_buckets import create_vote_buckets_table
+
+    with mock_dynamodb2(), mock_ssm():
+        os.environ["USERS_TABLE"] = "iwanttoreadmore-users-benchmark"
+        os.environ["VOTES_TABLE"] = "iwanttoreadmore-votes-benchmark"
+        os.environ["VOTES_HISTORY_TABLE"] = "iwanttoreadmore-votes-history-benchmark"
+        os.environ["VOTES_BUCKETS_TABLE"] = "iwanttoreadmore-votes-buckets-benchmark"
+
+        create_test_users_data(create_users_table(os.environ["USERS_TABLE"]))
+        create_test_votes_data(create_votes_table(os.environ["VOTES_TABLE"]))
+        create_test_vote_history_data(
+            create_vote_history_table(os.environ["VOTES_HISTORY_TABLE"])
+        )
+        create_vote_buckets_table(os.environ["VOTES_BUCKETS_TABLE"])
+        create_cookie_parameter()
+        event = get_benchmark_event(function)
+
+        # The connections and cookie secrets loaded by the setup must not be reused by the handler
+        from iwanttoreadmore.common import clear_cookie_secrets_cache
+        from iwanttoreadmore.connections import reset_connections
+
+        clear_cookie_secrets_cache()
+        reset_connections()
+
+        start = time.perf_counter()
+        handler = getattr(importlib.import_module(module), function)
+        imported = time.perf_counter()
+        response = handler(event, None)
+        invoked = time.perf_counter()
+
+    print(
+        json.dumps(
+            dict(
+                import_ms=(imported - start) * 1000,
+                invocation_ms=(invoked - imported) * 1000,
+                status=response["statusCode"],
+            )
+        )
+    )
+
+
+def measure_first_invocation(module, function):
+    """
+    Measure the first invocation of a handler in a fresh interpreter
+    :param module: name of the handler module
+    :param function: name of the handler function
+    :return: dict with the invocation time in milliseconds and the status code of the response
+    """
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.benchmark_cold_start",
+            "--invoke",
+            f"{module}.{function}",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def parse_budgets(budget_args):
+    """
+    Combine the default import time budgets with the ones given on the command line
+    :param budget_args: list of strings in the format module=milliseconds
+    :return: dict with the budget in milliseconds by module name
+    """
+    budgets = dict(DEFAULT_IMPORT_BUDGETS)
+
+    for budget in budget_args:
+        module, milliseconds = budget.split("=")
+        budgets[module] = float(milliseconds)
+
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", action="append", default=[])
+    parser.add_argument("--skip-invocations", action="store_true")
+    parser.add_argument("--invoke", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    if args.invoke:
+        invoke_first_time(*args.invoke.rsplit(".", 1))
+        return
+
+    handlers = get_handlers()
+    budgets = parse_budgets(args.budget)
+    over_budget = []
+
+    for module in sorted({module for module, _ in handlers}):
+        import_ms = statistics.median(
+            measure_import_time(module) for _ in range(args.repeat)
+        )
+        budget = budgets.get(module)
+        print(
+            f"{module:<40} import median: {import_ms:8.1f} ms   budget: "
+            + (f"{budget:6.0f} ms" if budget is not None else "     -")
+        )
+
+        if budget is not None and import_ms > budget:
+            over_budget.append(module)
+
+    if not args.skip_invocations:
+        for module, function in handlers:
+            result = measure_first_invocation(module, function)
+            print(
+                f"{module.split('.')[-1] + '.' + function:<50} first invocation: "
+                f"{result['invocation_ms']:8.1f} ms   status: {result['status']}"
+            )
+
+    if over_budget:
+        sys.exit(f"Import time over budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
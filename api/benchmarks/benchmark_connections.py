@@ -0,0 +1,110 @@
+"""
+Benchmark the latency of warm invocations when creating new DynamoDB connections on every request compared to reusing
+the shared connections from iwanttoreadmore.connections.
+
+The benchmark runs against moto, so it measures the client side overhead of creating sessions, resources and table
+objects (credential resolution, loading of the service models, etc.). Run it from the api folder:
+
+    python -m benchmarks.benchmark_connections --iterations 200
+"""
+import os
+import time
+import argparse
+import statistics
+import boto3
+from moto import mock_dynamodb2
+from boto3.dynamodb.conditions import Key
+from iwanttoreadmore.connections import get_table, reset_connections
+
+
+def create_benchmark_table(table_name):
+    """
+    Create the table used by the benchmark
+    :param table_name: name of the table
+    """
+    boto3.resource("dynamodb").create_table(
+        TableName=table_name,
+        KeySchema=[
+            {"AttributeName": "User", "KeyType": "HASH"},
+            {"AttributeName": "TopicKey", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "User", "AttributeType": "S"},
+            {"AttributeName": "TopicKey", "AttributeType": "S"},
+        ],
+        ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
+    )
+
+
+def invocation_new_connection(table_name):
+    """
+    Simulate a warm invocation, which creates a new resource and table object (the old behaviour)
+    :param table_name: name of the table
+    """
+    table = boto3.resource("dynamodb").Table(table_name)
+    table.query(KeyConditionExpression=Key("User").eq("user_1"))
+
+
+def invocation_shared_connection(table_name):
+    """
+    Simulate a warm invocation, which reuses the shared table object
+    :param table_name: name of the table
+    """
+    table = get_table(table_name)
+    table.query(KeyConditionExpression=Key("User").eq("user_1"))
+
+
+def measure(invocation, table_name, iterations):
+    """
+    Measure the latency of a simulated invocation
+    :param invocation: function simulating an invocation
+    :param table_name: name of the table
+    :param iterations: number of invocations to measure
+    :return: list of latencies in milliseconds
+    """
+    # First invocation is the cold one and is not measured
+    invocation(table_name)
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        invocation(table_name)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+
+def print_results(name, latencies):
+    """
+    Print a summary of the measured latencies
+    :param name: name of the measured case
+    :param latencies: list of latencies in milliseconds
+    """
+    print(
+        f"{name:<20} mean: {statistics.mean(latencies):8.3f} ms   "
+        f"median: {statistics.median(latencies):8.3f} ms   max: {max(latencies):8.3f} ms"
+    )
+
+
+@mock_dynamodb2
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    table_name = "iwanttoreadmore-benchmark-connections"
+    create_benchmark_table(table_name)
+    reset_connections()
+
+    print_results(
+        "new connection", measure(invocation_new_connection, table_name, args.iterations)
+    )
+    print_results(
+        "shared connection",
+        measure(invocation_shared_connection, table_name, args.iterations),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark looking up users by e-mail with a scan of the users table (the old behaviour) compared to a query of the
+EMail index for a growing number of synthetic users.
+
+The benchmark runs against moto, which evaluates index queries by iterating over the whole table, so its latencies don't
+match DynamoDB. The number of items read per lookup is what DynamoDB charges read capacity for and what drives its
+latency - it grows linearly with the number of users for the scan and stays constant for the index query. Run it from
+the api folder:
+
+    python -m benchmarks.benchmark_email_lookup --users 1000 10000 100000
+"""
+import os
+import time
+import argparse
+import statistics
+from moto import mock_dynamodb2
+from iwanttoreadmore.connections import get_table
+from boto3.dynamodb.conditions import Key
+from tests.data.data_test_user import create_users_table
+
+
+def add_synthetic_users(table, start, end):
+    """
+    Add synthetic users to the users table
+    :param table: users table object
+    :param start: index of the first user to add
+    :param end: index after the last user to add
+    """
+    with table.batch_writer() as batch:
+        for i in range(start, end):
+            batch.put_item(
+                Item={
+                    "User": f"user_{i}",
+                    "EMail": f"user_{i}@example.com",
+                    "PasswordHash": "",
+                    "Registered": "1111",
+                    "LastActive": "1111",
+                    "IsPublic": False,
+                    "VotedMessage": None,
+                    "VotedRedirect": None,
+                }
+            )
+
+
+def get_user_by_email_scan(table, email):
+    """
+    Look up a user by e-mail by scanning the whole table, following the pagination
+    :param table: users table object
+    :param email: e-mail of the user
+    :return: number of items read
+    """
+    scan_args = dict(
+        ExpressionAttributeValues={":EMail": email}, FilterExpression="EMail = :EMail"
+    )
+    items_read = 0
+
+    while True:
+        response = table.scan(**scan_args)
+        items_read += response["ScannedCount"]
+        if "LastEvaluatedKey" not in response:
+            return items_read
+        scan_args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def get_user_by_email_query(table, email):
+    """
+    Look up a user by e-mail using the EMail index, like User.get_user_by_email
+    :param table: users table object
+    :param email: e-mail of the user
+    :return: number of items read
+    """
+    response = table.query(
+        IndexName="EMailIndex", KeyConditionExpression=Key("EMail").eq(email)
+    )
+    # Without a filter expression a query reads only the matching items (moto reports the whole table as scanned)
+    return response["Count"]
+
+
+def measure(lookup, iterations):
+    """
+    Measure the latency of a lookup
+    :param lookup: function doing the lookup and returning the number of items read
+    :param iterations: number of lookups to measure
+    :return: median latency in milliseconds and number of items read per lookup
+    """
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        items_read = lookup()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(latencies), items_read
+
+
+@mock_dynamodb2
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ["USERS_TABLE"] = "iwanttoreadmore-benchmark-users"
+    create_users_table(os.environ["USERS_TABLE"])
+    table = get_table(os.environ["USERS_TABLE"])
+
+    users_count = 0
+    for target_count in sorted(args.users):
+        add_synthetic_users(table, users_count, target_count)
+        users_count = target_count
+
+        # Look up the last added user, so that the scan has to read the whole table
+        email = f"user_{users_count - 1}@example.com"
+        scan_latency, scan_items = measure(
+            lambda: get_user_by_email_scan(table, email), args.iterations
+        )
+        query_latency, query_items = measure(
+            lambda: get_user_by_email_query(table, email), args.iterations
+        )
+
+        print(
+            f"{users_count:>8} users   "
+            f"scan: {scan_items:>8} items read {scan_latency:10.3f} ms   "
+            f"index query: {query_items:>2} items read {query_latency:8.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Benchmark the warm invocations of the handlers with synthetic events and report the latency percentiles, the DynamoDB
+calls and the consumed capacity per invocation.
+
+The calls and the consumed capacity are taken from the invocation metrics, which the handlers otherwise emit to
+CloudWatch. The benchmark runs against moto by default. Moto doesn't model the DynamoDB latency, so the latencies show the cost of
+the handler code and the number of requests, while the calls and the consumed capacity per invocation match what
+DynamoDB would see. To run against DynamoDB Local, pass its endpoint - the tables are created with unique names and
+deleted at the end. Run it from the api folder:
+
+    python -m benchmarks.benchmark_handlers --iterations 100 --output results.json
+    python -m benchmarks.benchmark_handlers --handlers add_vote login_user --endpoint-url http://localhost:8000
+
+The JSON results contain the commit they were measured on and can be compared with a later run:
+
+    python -m benchmarks.benchmark_handlers --compare results.json
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+import importlib
+import statistics
+import subprocess
+from collections import Counter
+from moto import mock_dynamodb2, mock_ssm
+from iwanttoreadmore.metrics import get_invocation_metrics
+from benchmarks.benchmark_cold_start import get_handlers, get_benchmark_event
+
+
+def get_iteration_event(function, iteration):
+    """
+    Create the event for an iteration of the benchmark. The events change between the iterations where needed, so that
+    every invocation takes the same path through the handler - e.g. every vote comes from a new IP address.
+    :param function: name of the handler function
+    :param iteration: number of the iteration
+    :return: event
+    """
+    event = get_benchmark_event(function)
+
+    # Each handler votes from its own range of IP addresses
+    event["headers"] = dict(event["headers"])
+    event["headers"]["Client-Ip"] = (
+        f"10.{zlib.crc32(function.encode()) % 256}.{iteration // 256 % 256}.{iteration % 256}"
+    )
+
+    if function == "add_votes_batch":
+        event["body"] = json.dumps(
+            dict(
+                votes=[
+                    dict(project="project_c", topic=f"topic_batch_{iteration}_{i}")
+                    for i in range(5)
+                ]
+            )
+        )
+    elif function == "set_vote_hidden" or function == "change_account_public":
+        event["body"] = str(iteration % 2)
+    elif function == "delete_vote":
+        event["pathParameters"] = dict(
+            event["pathParameters"], topic=f"topic_delete_{iteration}"
+        )
+    elif function == "change_password":
+        event["body"] = "newpassword=test&newpassword2=test"
+    elif function == "change_voted_message_and_redirect":
+        event["body"] = f"voted_message=Thanks+{iteration}"
+
+    return event
+
+
+def prepare_handler(function, iterations):
+    """
+    Create the data a handler needs for all iterations of the benchmark
+    :param function: name of the handler function
+    :param iterations: number of iterations, including the warm-up invocation
+    """
+    from iwanttoreadmore.models.vote import Vote
+
+    if function == "delete_vote":
+        vote = Vote()
+        for iteration in range(iterations):
+            vote.add_vote("user_1", "project_a", f"topic_delete_{iteration}")
+
+
+def get_percentiles(latencies):
+    """
+    Get the latency percentiles of a handler
+    :param latencies: list of latencies in milliseconds
+    :return: dict with the p50, p95 and p99 latencies and the mean latency
+    """
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return dict(
+        p50=quantiles[49],
+        p95=quantiles[94],
+        p99=quantiles[98],
+        mean=statistics.mean(latencies),
+    )
+
+
+def benchmark_handler(module, function, iterations):
+    """
+    Measure the warm invocations of a handler. The first invocation warms up the connections and caches and is not
+    measured.
+    :param module: name of the handler module
+    :param function: name of the handler function
+    :param iterations: number of measured invocations
+    :return: dict with the results
+    """
+    handler = getattr(importlib.import_module(module), function)
+    prepare_handler(function, iterations + 1)
+    handler(get_iteration_event(function, 0), None)
+
+    latencies = []
+    operations = Counter()
+    consumed_capacity = 0.0
+    status_codes = Counter()
+
+    for iteration in range(1, iterations + 1):
+        event = get_iteration_event(function, iteration)
+
+        start = time.perf_counter()
+        response = handler(event, None)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        metrics = get_invocation_metrics()
+        for operation, request in metrics["operations"].items():
+            operations[operation.split()[0]] += request["requests"]
+        consumed_capacity += metrics["consumed_capacity"]
+        status_codes[str(response["statusCode"])] += 1
+
+    return dict(
+        latency_ms=get_percentiles(latencies),
+        dynamodb_calls=sum(operations.values()) / iterations,
+        consumed_capacity=consumed_capacity / iterations,
+        operations={
+            operation: count / iterations for operation, count in sorted(operations.items())
+        },
+        status_codes=dict(status_codes),
+    )
+
+
+def create_tables(suffix):
+    """
+    Create the tables with the test data and point the handlers to them
+    :param suffix: suffix of the table names
+    :return: list of the created table objects
+    """
+    from tests.data.data_test_user import create_users_table, create_test_users_data
+    from tests.data.data_test_vote import create_votes_table, create_test_votes_data
+    from tests.data.data_test_vote_history import (
+        create_vote_history_table,
+        create_test_vote_history_data,
+    )
+    from tests.data.data_test_vote_buckets import create_vote_buckets_table
+
+    os.environ["USERS_TABLE"] = f"iwanttoreadmore-users-{suffix}"
+    os.environ["VOTES_TABLE"] = f"iwanttoreadmore-votes-{suffix}"
+    os.environ["VOTES_HISTORY_TABLE"] = f"iwanttoreadmore-votes-history-{suffix}"
+    os.environ["VOTES_BUCKETS_TABLE"] = f"iwanttoreadmore-votes-buckets-{suffix}"
+
+    tables = [
+        create_users_table(os.environ["USERS_TABLE"]),
+        create_votes_table(os.environ["VOTES_TABLE"]),
+        create_vote_history_table(os.environ["VOTES_HISTORY_TABLE"]),
+        create_vote_buckets_table(os.environ["VOTES_BUCKETS_TABLE"]),
+    ]
+    for table in tables:
+        table.wait_until_exists()
+
+    create_test_users_data(tables[0])
+    create_test_votes_data(tables[1])
+    create_test_vote_history_data(tables[2])
+
+    return tables
+
+
+def get_commit():
+    """
+    Get the commit the benchmark runs on
+    :return: commit hash or None if it can't be determined
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(handlers, iterations, endpoint_url=None):
+    """
+    Run the benchmark of the handlers
+    :param handlers: list of (module name, function name) tuples
+    :param iterations: number of measured invocations per handler
+    :param endpoint_url: endpoint of DynamoDB Local or None to use moto
+    :return: dict with the results
+    """
+    from tests.helpers import create_cookie_parameter
+    from iwanttoreadmore.connections import reset_connections
+
+    mocks = [mock_ssm()] + ([] if endpoint_url else [mock_dynamodb2()])
+    for mock in mocks:
+        mock.start()
+
+    if endpoint_url:
+        os.environ["AWS_ENDPOINT_URL_DYNAMODB"] = endpoint_url
+
+    tables = []
+    try:
+        tables = create_tables(f"benchmark-{int(time.time())}")
+        create_cookie_parameter()
+        reset_connections()
+
+        results = dict()
+        for module, function in handlers:
+            results[function] = benchmark_handler(module, function, iterations)
+    finally:
+        if endpoint_url:
+            for table in tables:
+                table.delete()
+
+        for mock in mocks:
+            mock.stop()
+
+    return dict(
+        commit=get_commit(),
+        created=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        backend=endpoint_url or "moto",
+        iterations=iterations,
+        handlers=results,
+    )
+
+
+def print_results(results, baseline=None):
+    """
+    Print a summary of the results
+    :param results: results of the benchmark
+    :param baseline: results of an earlier run to compare with or None
+    """
+    print(
+        f"{'handler':<36}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'calls':>8}{'capacity':>10}"
+        + (f"{'p50 diff':>10}{'calls diff':>12}" if baseline else "")
+    )
+
+    for function, result in results["handlers"].items():
+        latency = result["latency_ms"]
+        line = (
+            f"{function:<36}{latency['p50']:9.2f}{latency['p95']:9.2f}{latency['p99']:9.2f}"
+            f"{result['dynamodb_calls']:8.2f}{result['consumed_capacity']:10.2f}"
+        )
+
+        baseline_result = baseline["handlers"].get(function) if baseline else None
+        if baseline_result:
+            p50_diff = latency["p50"] / baseline_result["latency_ms"]["p50"] - 1
+            calls_diff = result["dynamodb_calls"] - baseline_result["dynamodb_calls"]
+            line += f"{p50_diff:+10.1%}{calls_diff:+12.2f}"
+
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--handlers", nargs="+", help="names of the handlers to run")
+    parser.add_argument("--endpoint-url", help="endpoint of DynamoDB Local")
+    parser.add_argument("--output", help="file to save the JSON results to")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ["INVOCATION_METRICS"] = "0"
+
+    handlers = get_handlers()
+    if args.handlers:
+        unknown_handlers = set(args.handlers) - {function for _, function in handlers}
+        if unknown_handlers:
+            sys.exit(f"Unknown handlers: {', '.join(sorted(unknown_handlers))}")
+
+        handlers = [handler for handler in handlers if handler[1] in args.handlers]
+
+    results = run_benchmark(handlers, args.iterations, args.endpoint_url)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark the CPU time the logging costs per vote with different log levels and event sample rates.
+
+Two measurements are made for each configuration: the logging of a vote alone, which isolates its cost, and the full
+add_vote handler against moto, which shows it in relation to the rest of the invocation. The "legacy" configuration
+reproduces the previous behaviour, where the root logger was set to DEBUG and every event was formatted into the log.
+The log lines are written to /dev/null. Run it from the api folder:
+
+    python -m benchmarks.benchmark_logging --iterations 2000
+"""
+import os
+import time
+import logging
+import argparse
+from moto import mock_dynamodb2, mock_ssm
+from iwanttoreadmore.logs import configure_logging, log_sampled_event
+from benchmarks.benchmark_handlers import create_tables, get_iteration_event
+
+# Configurations as (name, LOG_LEVEL, EVENT_LOG_SAMPLE_RATE)
+CONFIGURATIONS = [
+    ("legacy", "DEBUG", "0"),
+    ("debug, all events", "DEBUG", "1"),
+    ("info, 1% events", "INFO", "0.01"),
+    ("warning, no events", "WARNING", "0"),
+]
+
+
+def log_vote(logger, event, legacy):
+    """
+    Write the log lines of a single vote
+    :param logger: logger
+    :param event: event
+    :param legacy: True to log the event like before, formatted eagerly on every vote
+    """
+    if legacy:
+        logger.debug(f"Event: {event}")
+    else:
+        log_sampled_event(logger, event)
+
+    parameters = event["pathParameters"]
+    logger.debug(
+        "Voting for: %s, %s, %s",
+        parameters["user"],
+        parameters["project"],
+        parameters["topic"],
+    )
+
+
+def measure_logging(name, iterations):
+    """
+    Measure the CPU time of logging a vote with the current configuration
+    :param name: name of the configuration
+    :param iterations: number of votes
+    :return: CPU time per vote in microseconds
+    """
+    logger = logging.getLogger("iwanttoreadmore.handlers.handlers_vote")
+    events = [get_iteration_event("add_vote", i) for i in range(iterations)]
+
+    start = time.process_time()
+    for event in events:
+        log_vote(logger, event, name == "legacy")
+
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def measure_handler(name, iterations):
+    """
+    Measure the CPU time of the add_vote handler with the current configuration. Each configuration votes for its own
+    topic, so that no vote is rejected as a duplicate.
+    :param name: name of the configuration
+    :param iterations: number of votes
+    :return: CPU time per vote in milliseconds
+    """
+    from iwanttoreadmore.handlers import handlers_vote
+
+    events = [get_iteration_event("add_vote", i) for i in range(iterations + 1)]
+    for event in events:
+        event["pathParameters"] = dict(
+            event["pathParameters"], topic=f"topic_logging_{name.split(',')[0]}"
+        )
+    handlers_vote.add_vote(events[0], None)
+
+    start = time.process_time()
+    for event in events[1:]:
+        if name == "legacy":
+            handlers_vote.log.debug(f"Event: {event}")
+
+        handlers_vote.add_vote(event, None)
+
+    return (time.process_time() - start) / iterations * 1000
+
+
+def run_benchmark(iterations):
+    """
+    Run the benchmark for all configurations
+    :param iterations: number of votes per configuration
+    :return: dict with the CPU time per vote for each configuration
+    """
+    from tests.helpers import create_cookie_parameter
+    from iwanttoreadmore.connections import reset_connections
+
+    results = dict()
+
+    with mock_dynamodb2(), mock_ssm(), open(os.devnull, "w") as devnull:
+        create_tables(f"benchmark-logging-{int(time.time())}")
+        create_cookie_parameter()
+        reset_connections()
+
+        for name, log_level, sample_rate in CONFIGURATIONS:
+            os.environ["LOG_LEVEL"] = log_level
+            os.environ["EVENT_LOG_SAMPLE_RATE"] = sample_rate
+            configure_logging(devnull)
+
+            # The legacy configuration set the root logger to DEBUG, which enabled the debug logs of boto3 and botocore
+            root_handler = logging.StreamHandler(devnull)
+            if name == "legacy":
+                logging.getLogger().setLevel(logging.DEBUG)
+                logging.getLogger().addHandler(root_handler)
+                logging.getLogger("iwanttoreadmore").propagate = True
+                logging.getLogger("iwanttoreadmore").handlers.clear()
+
+            try:
+                results[name] = dict(
+                    logging_us=measure_logging(name, iterations),
+                    handler_ms=measure_handler(name, iterations),
+                )
+            finally:
+                logging.getLogger().setLevel(logging.WARNING)
+                logging.getLogger().removeHandler(root_handler)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ["INVOCATION_METRICS"] = "0"
+
+    results = run_benchmark(args.iterations)
+    legacy = results["legacy"]
+
+    print(
+        f"{'configuration':<24}{'logging us/vote':>17}{'handler ms/vote':>17}"
+        f"{'saved ms/vote':>15}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<24}{result['logging_us']:17.2f}{result['handler_ms']:17.3f}"
+            f"{legacy['handler_ms'] - result['handler_ms']:15.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
+import os
 import re
 import time
+import hmac
 import hashlib
 import urllib.parse
-import boto3
-import bcrypt
+from collections import OrderedDict
+from iwanttoreadmore.connections import get_client
+from iwanttoreadmore.tracing import traced
 
 
 def get_current_timestamp():
@@ -47,6 +50,9 @@ def create_password_hash(password):
     :param password: password to be hashed
     :return: password hash
     """
+    # bcrypt is loaded on first use, since most requests are authenticated with HMAC signed cookies and never need it
+    import bcrypt
+
     return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
 
 
@@ -57,6 +63,8 @@ def check_password_hash(password, password_hash):
     :param password: password hash
     :return: True if the passwords match, False otherwise
     """
+    import bcrypt
+
     return bcrypt.checkpw(password.encode(), password_hash.encode())
 
 
@@ -101,52 +109,323 @@ def get_cookie_date(date):
     return date.strftime("%a, %d %b %Y %H:%M:%S GMT")
 
 
+COOKIE_SECRET_PARAMETER = "IWANTTOREADMORE_COOKIE_SECRET"
+COOKIE_SECRET_PREVIOUS_PARAMETER = "IWANTTOREADMORE_COOKIE_SECRET_PREVIOUS"
+
+# Minimal time in seconds between two forced refreshes of the cookie secrets, so that requests with invalid cookies
+# cannot cause a call to the Parameter Store each
+COOKIE_SECRET_MIN_REFRESH_INTERVAL = 30
+
+_cookie_secrets_cache = dict(secrets=None, expires=0, refreshed=0)
+
+# LRU cache of successfully verified session cookies, indexed by a digest of the cookie
+_verified_sessions = OrderedDict()
+_verified_sessions_stats = dict(hits=0, misses=0)
+
+
+def get_cookie_secrets(force_refresh=False):
+    """
+    Retrieve the cookie secrets from the AWS Parameter Store. The secrets are cached for COOKIE_SECRET_TTL seconds
+    (300 by default). The previous secret is optional and is only used during a secret rotation.
+    :param force_refresh: reload the secrets even if the cached ones didn't expire yet
+    :return: list containing the current cookie secret and optionally the previous one
+    """
+    now = time.time()
+
+    if (
+        _cookie_secrets_cache["secrets"] is None
+        or now >= _cookie_secrets_cache["expires"]
+        or (
+            force_refresh
+            and now - _cookie_secrets_cache["refreshed"]
+            >= COOKIE_SECRET_MIN_REFRESH_INTERVAL
+        )
+    ):
+        response = get_client("ssm").get_parameters(
+            Names=[COOKIE_SECRET_PARAMETER, COOKIE_SECRET_PREVIOUS_PARAMETER]
+        )
+        parameters = {
+            parameter["Name"]: parameter["Value"]
+            for parameter in response["Parameters"]
+        }
+
+        if COOKIE_SECRET_PARAMETER not in parameters:
+            raise ValueError(f"Cannot find parameter {COOKIE_SECRET_PARAMETER}")
+
+        secrets = [parameters[COOKIE_SECRET_PARAMETER]]
+        if COOKIE_SECRET_PREVIOUS_PARAMETER in parameters:
+            secrets.append(parameters[COOKIE_SECRET_PREVIOUS_PARAMETER])
+
+        # Sessions verified with the old secrets may not be valid anymore
+        if secrets != _cookie_secrets_cache["secrets"]:
+            _verified_sessions.clear()
+
+        _cookie_secrets_cache.update(
+            secrets=secrets,
+            expires=now + int(os.environ.get("COOKIE_SECRET_TTL", "300")),
+            refreshed=now,
+        )
+
+    return _cookie_secrets_cache["secrets"]
+
+
 def get_cookie_secret():
     """
-    Retrieve the cookie secret from the AWS Parameter Store
+    Retrieve the current cookie secret
     :return: cookie secret string
     """
-    client = boto3.client("ssm")
-    response = client.get_parameter(Name="IWANTTOREADMORE_COOKIE_SECRET")
+    return get_cookie_secrets()[0]
+
+
+def clear_cookie_secrets_cache():
+    """
+    Remove the cached cookie secrets, so that they are loaded again on the next use
+    """
+    _cookie_secrets_cache.update(secrets=None, expires=0, refreshed=0)
+    _verified_sessions.clear()
+
+
+def check_with_cookie_secrets(check):
+    """
+    Run a signature check with each of the cookie secrets. If the check fails with all cached secrets, they are
+    refreshed once, because the secret may have been rotated since it was cached.
+    :param check: function receiving a secret and returning True if the signature is valid for it
+    :return: True if the check is successful for one of the secrets, False otherwise
+    """
+    secrets = get_cookie_secrets()
+    if any(check(secret) for secret in secrets):
+        return True
+
+    refreshed_secrets = get_cookie_secrets(force_refresh=True)
+    return refreshed_secrets != secrets and any(
+        check(secret) for secret in refreshed_secrets
+    )
+
+
+# Version of the session cookie format. Cookies without a version are signed with bcrypt by older releases.
+SESSION_COOKIE_VERSION = "2"
 
-    return response["Parameter"]["Value"]
+# Lifetime of a session cookie in seconds
+SESSION_COOKIE_LIFETIME = 30 * 24 * 3600
+
+
+def get_cookie_signature(cookie_payload, secret):
+    """
+    Compute the signature of a cookie payload using HMAC-SHA256
+    :param cookie_payload: cookie string to be signed
+    :param secret: cookie secret
+    :return: hex encoded signature
+    """
+    return hmac.new(secret.encode(), cookie_payload.encode(), hashlib.sha256).hexdigest()
 
 
 def sign_cookie(cookie_content):
     """
-    Sign the cookie string with the cookie secret
+    Sign the cookie string with the cookie secret. The signed cookie contains the format version and the expiration
+    timestamp of the session.
     :param cookie: cookie string
     :return: signed cookie string
     """
-    cookie_content_signed = cookie_content + get_cookie_secret()
-    signature = bcrypt.hashpw(cookie_content_signed.encode(), bcrypt.gensalt())
-    return f"{cookie_content}&signature={signature.decode()}"
+    expires = int(time.time()) + SESSION_COOKIE_LIFETIME
+    cookie_payload = (
+        f"{cookie_content}&expires={expires}&version={SESSION_COOKIE_VERSION}"
+    )
+    signature = get_cookie_signature(cookie_payload, get_cookie_secret())
+    return f"{cookie_payload}&signature={signature}"
 
 
-def check_cookie_signature(cookie_string):
+def legacy_cookies_accepted():
     """
-    Verify that the content of the cookie wasn't changed by recomputing the signeture
+    Check if bcrypt signed cookies from older releases are still accepted. The migration window is closed by setting the
+    LEGACY_COOKIES_ACCEPTED_UNTIL environment variable to a timestamp.
+    :return: True if legacy cookies are accepted, False otherwise
+    """
+    accepted_until = os.environ.get("LEGACY_COOKIES_ACCEPTED_UNTIL")
+    return not accepted_until or time.time() < float(accepted_until)
+
+
+def get_verified_session(cookie_digest):
+    """
+    Get a session from the cache of verified sessions
+    :param cookie_digest: digest of the session cookie
+    :return: session dict or None if the session is not cached or expired
+    """
+    if cookie_digest in _verified_sessions:
+        session, expires = _verified_sessions[cookie_digest]
+
+        if time.time() < expires:
+            _verified_sessions.move_to_end(cookie_digest)
+            _verified_sessions_stats["hits"] += 1
+            return session
+
+        del _verified_sessions[cookie_digest]
+
+    _verified_sessions_stats["misses"] += 1
+    return None
+
+
+def add_verified_session(cookie_digest, session, session_expires=None):
+    """
+    Add a successfully verified session to the cache. Sessions are cached for SESSION_CACHE_TTL seconds (60 by default),
+    but not longer than they are valid. At most SESSION_CACHE_SIZE sessions (256 by default) are cached and the least
+    recently used ones are evicted first.
+    :param cookie_digest: digest of the session cookie
+    :param session: session dict
+    :param session_expires: expiration timestamp of the session, if it has one
+    """
+    expires = time.time() + int(os.environ.get("SESSION_CACHE_TTL", "60"))
+    if session_expires is not None:
+        expires = min(expires, session_expires)
+
+    _verified_sessions[cookie_digest] = (session, expires)
+    _verified_sessions.move_to_end(cookie_digest)
+
+    while len(_verified_sessions) > int(os.environ.get("SESSION_CACHE_SIZE", "256")):
+        _verified_sessions.popitem(last=False)
+
+
+def get_session_cache_stats():
+    """
+    Get statistics about the cache of verified sessions
+    :return: dict with the number of cache hits, misses and cached sessions
+    """
+    return dict(_verified_sessions_stats, size=len(_verified_sessions))
+
+
+def check_legacy_cookie_signature(cookie_content, signature):
+    """
+    Check the bcrypt signature of a legacy session cookie. The signature comes from the client, so anything which is
+    not a bcrypt hash is treated as an invalid signature.
+    :param cookie_content: signed content of the cookie including the secret
+    :param signature: signature from the cookie
+    :return: True if the signature is valid, False otherwise
+    """
+    try:
+        return check_password_hash(cookie_content, signature)
+    except ValueError:
+        return False
+
+
+@traced("check_session_cookie")
+def check_session_cookie(cookie_string):
+    """
+    Verify that the content of the cookie wasn't changed by recomputing the signature and that the session didn't expire
     :param cookie_string: cookie string containing a signature at the end
-    :return: The username of the logged in user if the cookie signature is valid, None otherwise
+    :return: dict with the username of the logged in user and a flag if the cookie uses the legacy format and should be
+    re-issued, or None if the cookie is not valid
     """
 
     cookies = cookie_string.split(";")
 
     for cookie in cookies:
-        params = urllib.parse.parse_qs(cookie.strip())
+        cookie = cookie.strip()
+        params = urllib.parse.parse_qs(cookie)
 
         if "signature" in params and "user" in params:
-            cookie_with_secret = f"user={params['user'][0]}" + get_cookie_secret()
-            if bcrypt.checkpw(
-                cookie_with_secret.encode(), params["signature"][0].encode()
-            ):
-                return params["user"][0]
-            else:
-                return None
+            cookie_digest = hashlib.sha256(cookie.encode()).digest()
+            session = get_verified_session(cookie_digest)
+            if session and (not session["legacy"] or legacy_cookies_accepted()):
+                return dict(session)
+
+            signature = params["signature"][0]
+
+            if "version" in params:
+                cookie_payload = cookie.rpartition("&signature=")[0]
+
+                if (
+                    params["version"][0] == SESSION_COOKIE_VERSION
+                    and "expires" in params
+                    and params["expires"][0].isdigit()
+                    and int(params["expires"][0]) > time.time()
+                    and check_with_cookie_secrets(
+                        lambda secret: hmac.compare_digest(
+                            get_cookie_signature(cookie_payload, secret), signature
+                        )
+                    )
+                ):
+                    session = dict(user=params["user"][0], legacy=False)
+                    add_verified_session(
+                        cookie_digest, session, int(params["expires"][0])
+                    )
+                    return dict(session)
+
+            elif legacy_cookies_accepted():
+                cookie_content = f"user={params['user'][0]}"
+                if check_with_cookie_secrets(
+                    lambda secret: check_legacy_cookie_signature(
+                        cookie_content + secret, signature
+                    )
+                ):
+                    session = dict(user=params["user"][0], legacy=True)
+                    add_verified_session(cookie_digest, session)
+                    return dict(session)
+
+            return None
 
     return None
 
 
+def check_cookie_signature(cookie_string):
+    """
+    Verify that the content of the cookie wasn't changed by recomputing the signeture
+    :param cookie_string: cookie string containing a signature at the end
+    :return: The username of the logged in user if the cookie signature is valid, None otherwise
+    """
+    session = check_session_cookie(cookie_string)
+    return session["user"] if session else None
+
+
+def get_purpose_secret(secret, purpose):
+    """
+    Derive a separate key from the cookie secret for signing something else than session cookies, so that a signature
+    created for one purpose is never valid for another one or for a cookie
+    :param secret: cookie secret
+    :param purpose: label of the signed data, e.g. "cursor"
+    :return: derived key
+    """
+    return hmac.new(secret.encode(), f"purpose:{purpose}".encode(), hashlib.sha256).hexdigest()
+
+
+def sign_string(data, purpose):
+    """
+    Sign a string with a key derived from the cookie secret, so that it can be handed out to clients and verified when
+    it comes back
+    :param data: string to be signed
+    :param purpose: label of the signed data, the same label has to be used to check the signature
+    :return: hex encoded signature
+    """
+    return get_cookie_signature(data, get_purpose_secret(get_cookie_secret(), purpose))
+
+
+def check_string_signature(data, signature, purpose):
+    """
+    Verify the signature of a string created by sign_string
+    :param data: signed string
+    :param signature: signature to be checked
+    :param purpose: label of the signed data used when signing it
+    :return: True if the signature is valid, False otherwise
+    """
+    return check_with_cookie_secrets(
+        lambda secret: hmac.compare_digest(
+            get_cookie_signature(data, get_purpose_secret(secret, purpose)), signature
+        )
+    )
+
+
+def get_logged_in_session(event):
+    """
+    Get the session of the logged in user from the provided cookie
+    :param event: event
+    :return: session dict as returned by check_session_cookie or None if no valid user is logged in
+    """
+
+    headers = event.get("headers") or dict()
+    if not "Cookie" in headers:
+        return None
+
+    return check_session_cookie(headers["Cookie"])
+
+
 def get_logged_in_user(event):
     """
     Get the logged in user from the provided cookie
@@ -154,10 +433,8 @@ def get_logged_in_user(event):
     :return: the username of the logged in user or None if no valid user is logged in
     """
 
-    if not "Cookie" in event["headers"]:
-        return None
-
-    return check_cookie_signature(event["headers"]["Cookie"])
+    session = get_logged_in_session(event)
+    return session["user"] if session else None
 
 
 def hash_string(data):
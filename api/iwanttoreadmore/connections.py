@@ -0,0 +1,94 @@
+import os
+from iwanttoreadmore.metrics import install_dynamodb_instrumentation
+
+# Module level state is kept for the lifetime of the Lambda container, so that warm invocations reuse the same
+# session, HTTP connection pool and table objects instead of creating new ones on every request. boto3 and botocore
+# are imported on first use, so handlers which don't need AWS don't pay for loading them on a cold start.
+_session = None
+_dynamodb_resource = None
+_tables = dict()
+_clients = dict()
+
+
+def get_connection_config():
+    """
+    Create the botocore configuration used by all AWS connections. The connection pool size and the TCP keep-alive
+    can be configured using the CONNECTION_POOL_SIZE and CONNECTION_TCP_KEEPALIVE environment variables.
+    :return: botocore Config object
+    """
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=int(os.environ.get("CONNECTION_POOL_SIZE", "10")),
+        tcp_keepalive=os.environ.get("CONNECTION_TCP_KEEPALIVE", "1") == "1",
+        retries={"max_attempts": 3, "mode": "standard"},
+    )
+
+
+def get_session():
+    """
+    Get the boto3 session shared by all connections, creating it on first use
+    :return: boto3 session
+    """
+    global _session
+
+    if _session is None:
+        import boto3.session
+
+        _session = boto3.session.Session()
+
+    return _session
+
+
+def get_dynamodb_resource():
+    """
+    Get the DynamoDB resource shared by all models, creating it on first use
+    :return: DynamoDB service resource
+    """
+    global _dynamodb_resource
+
+    if _dynamodb_resource is None:
+        _dynamodb_resource = get_session().resource(
+            "dynamodb", config=get_connection_config()
+        )
+        install_dynamodb_instrumentation(_dynamodb_resource.meta.client)
+
+    return _dynamodb_resource
+
+
+def get_table(table_name):
+    """
+    Get a DynamoDB table object, reusing the already created one if possible
+    :param table_name: name of the table
+    :return: DynamoDB table object
+    """
+    if table_name not in _tables:
+        _tables[table_name] = get_dynamodb_resource().Table(table_name)
+
+    return _tables[table_name]
+
+
+def get_client(service_name):
+    """
+    Get a low-level client for an AWS service, reusing the already created one if possible
+    :param service_name: name of the AWS service, e.g. "ssm"
+    :return: boto3 client
+    """
+    if service_name not in _clients:
+        _clients[service_name] = get_session().client(
+            service_name, config=get_connection_config()
+        )
+
+    return _clients[service_name]
+
+
+def reset_connections():
+    """
+    Drop all cached connections. The next call to any of the getters will create new ones.
+    """
+    global _session, _dynamodb_resource
+
+    _session = None
+    _dynamodb_resource = None
+    _tables.clear()
+    _clients.clear()
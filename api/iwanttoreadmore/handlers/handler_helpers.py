@@ -1,3 +1,24 @@
+import base64
+import logging
+import binascii
+import functools
+from iwanttoreadmore.common import sign_string, check_string_signature
+from iwanttoreadmore.metrics import reset_invocation_metrics, emit_invocation_metrics
+from iwanttoreadmore.tracing import trace
+from iwanttoreadmore.logs import (
+    ensure_logging_configured,
+    get_request_id,
+    set_request_id,
+    reset_request_id,
+    log_sampled_event,
+)
+
+log = logging.getLogger(__name__)
+
+# Label of the key signing the pagination cursors, which is derived from the cookie secret
+CURSOR_SIGNATURE_PURPOSE = "cursor"
+
+
 def create_response(code, method="GET", body="", additional_headers=None):
     """
     Create a HTTP repsonse dictionary
@@ -22,3 +43,122 @@ def create_response(code, method="GET", body="", additional_headers=None):
         "headers": headers,
         "body": body,
     }
+
+
+def get_request_header(event, name):
+    """
+    Get a header of a request. The header names are compared case-insensitively.
+    :param event: event
+    :param name: name of the header
+    :return: value of the header or None if it is not set
+    """
+    for header, value in (event.get("headers") or dict()).items():
+        if header.lower() == name.lower():
+            return value
+
+    return None
+
+
+def check_etag_matches(event, etag):
+    """
+    Check if the If-None-Match header of a request matches an ETag, meaning that the client's copy is up to date
+    :param event: event
+    :param etag: current ETag of the requested resource
+    :return: True if the ETag matches, False otherwise
+    """
+    if_none_match = get_request_header(event, "If-None-Match")
+    if not if_none_match:
+        return False
+
+    # The weak comparison is used for If-None-Match, so weak validators match too
+    client_etags = [
+        client_etag.strip().replace("W/", "", 1)
+        for client_etag in if_none_match.split(",")
+    ]
+
+    return "*" in client_etags or etag.replace("W/", "", 1) in client_etags
+
+
+def get_query_parameter(event, name):
+    """
+    Get a query string parameter of a request
+    :param event: event
+    :param name: name of the parameter
+    :return: value of the parameter or None if it is not set
+    """
+    return (event.get("queryStringParameters") or dict()).get(name)
+
+
+def encode_cursor(scope, position):
+    """
+    Create an opaque, signed pagination cursor
+    :param scope: string identifying the paginated request, so that the cursor cannot be used for other requests
+    :param position: position after which the next page starts
+    :return: cursor string
+    """
+    data = base64.urlsafe_b64encode(position.encode()).decode()
+    return f"{data}.{sign_string(f'{scope}:{data}', CURSOR_SIGNATURE_PURPOSE)}"
+
+
+def decode_cursor(scope, cursor):
+    """
+    Verify and decode a pagination cursor created by encode_cursor. A ValueError is raised if the cursor is invalid.
+    :param scope: string identifying the paginated request
+    :param cursor: cursor string
+    :return: position after which the next page starts
+    """
+    data, _, signature = cursor.partition(".")
+
+    if not check_string_signature(
+        f"{scope}:{data}", signature, CURSOR_SIGNATURE_PURPOSE
+    ):
+        raise ValueError("Invalid cursor")
+
+    try:
+        return base64.urlsafe_b64decode(data.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def request_scoped(handler):
+    """
+    Decorate a handler, so that each user is read from the users table at most once during the invocation, no matter
+    how many models and helpers need it
+    :param handler: handler function
+    :return: decorated handler function
+    """
+
+    @functools.wraps(handler)
+    def handler_in_request_scope(event, context):
+        from iwanttoreadmore.models.user import user_request_scope
+
+        with user_request_scope():
+            return handler(event, context)
+
+    return handler_in_request_scope
+
+
+def instrumented(handler):
+    """
+    Decorate a handler, so that the DynamoDB requests, consumed capacity and latency of each invocation are emitted as
+    metrics tagged with the handler name. If tracing is enabled, each invocation is recorded as a trace. The log lines
+    written during the invocation carry its request id and the full event is logged for a sample of the requests.
+    :param handler: handler function
+    :return: decorated handler function
+    """
+
+    @functools.wraps(handler)
+    def handler_with_metrics(event, context):
+        ensure_logging_configured()
+        request_id_token = set_request_id(get_request_id(event, context))
+        log_sampled_event(log, event)
+
+        reset_invocation_metrics()
+        try:
+            with trace(handler.__name__):
+                return handler(event, context)
+        finally:
+            emit_invocation_metrics(handler.__name__)
+            reset_request_id(request_id_token)
+
+    return handler_with_metrics
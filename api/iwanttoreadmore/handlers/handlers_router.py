@@ -0,0 +1,153 @@
+import re
+import importlib
+from urllib.parse import unquote
+from iwanttoreadmore.handlers.handler_helpers import create_response
+
+# Routes of the API as (HTTP method, resource path, handler). They mirror the http events of the functions in
+# serverless.yml, so that the router can serve all of them from a single function (see serverless-router.yml).
+ROUTES = [
+    ("POST", "/vote/{user}/{project}/{topic}", "handlers_vote.add_vote"),
+    ("POST", "/vote/{user}/batch", "handlers_vote.add_votes_batch"),
+    ("GET", "/vote/{user}/{project}/{topic}", "handlers_vote.add_vote_and_redirect"),
+    ("GET", "/votes/{user}", "handlers_vote.get_votes_for_user"),
+    ("GET", "/votes/{user}/{project}", "handlers_vote.get_votes_for_project"),
+    (
+        "GET",
+        "/votes/{user}/{project}/{topic}/history",
+        "handlers_vote.get_vote_history",
+    ),
+    ("POST", "/votes/hidden/{user}/{project}/{topic}", "handlers_vote.set_vote_hidden"),
+    ("POST", "/votes/delete/{user}/{project}/{topic}", "handlers_vote.delete_vote"),
+    ("POST", "/user/login", "handlers_user.login_user"),
+    ("GET", "/user/loggedin", "handlers_user.check_user_logged_in"),
+    ("POST", "/user/changepassword", "handlers_user.change_password"),
+    ("POST", "/user/changepublic", "handlers_user.change_account_public"),
+    ("GET", "/user/data", "handlers_user.get_user_data"),
+    ("GET", "/user/logout", "handlers_user.logout_user"),
+    ("POST", "/user/changevoted", "handlers_user.change_voted_message_and_redirect"),
+    (
+        "POST",
+        "/user/single_voting_project/add",
+        "handlers_user.add_single_voting_project",
+    ),
+    (
+        "POST",
+        "/user/single_voting_project/remove",
+        "handlers_user.remove_single_voting_project",
+    ),
+]
+
+
+def compile_resource_path(resource):
+    """
+    Compile a resource path into a regular expression matching the request paths of the resource. Each path parameter
+    matches a single path segment.
+    :param resource: resource path, e.g. /votes/{user}
+    :return: compiled regular expression with a named group for each path parameter
+    """
+    pattern = "".join(
+        rf"/(?P<{segment[1:-1]}>[^/]+)"
+        if segment.startswith("{") and segment.endswith("}")
+        else "/" + re.escape(segment)
+        for segment in resource.strip("/").split("/")
+    )
+
+    return re.compile(pattern + "/?")
+
+
+def get_resource_precedence(resource):
+    """
+    Get the sort key ranking the resources like API Gateway does - their path segments are compared from left to
+    right and a fixed segment takes precedence over a path parameter at the same position
+    :param resource: resource path, e.g. /votes/{user}
+    :return: tuple with 0 for each fixed segment and 1 for each path parameter
+    """
+    return tuple(
+        int(segment.startswith("{") and segment.endswith("}"))
+        for segment in resource.strip("/").split("/")
+    )
+
+
+def compile_routes(routes):
+    """
+    Create the route table used to dispatch the requests
+    :param routes: list of (HTTP method, resource path, handler) tuples
+    :return: dict with the handlers by HTTP method for each resource path and a list of (compiled path, resource path)
+    tuples ordered by get_resource_precedence, so that fixed path segments take precedence
+    """
+    handlers = dict()
+
+    for method, resource, handler in routes:
+        handlers.setdefault(resource, dict())[method] = handler
+
+    paths = [
+        (compile_resource_path(resource), resource)
+        for resource in sorted(handlers, key=get_resource_precedence)
+    ]
+
+    return handlers, paths
+
+
+# The route table is compiled once per container and the handlers are imported on first use, so that a request only
+# loads the modules it needs. The connections and caches of the models are shared by all routes.
+_route_handlers, _route_paths = compile_routes(ROUTES)
+_loaded_handlers = dict()
+
+
+def match_route(path):
+    """
+    Find the resource matching a request path
+    :param path: request path
+    :return: tuple with the resource path and a dict with the path parameters, or (None, None) if no resource matches
+    """
+    for compiled_path, resource in _route_paths:
+        match = compiled_path.fullmatch(path)
+        if match:
+            return (
+                resource,
+                {name: unquote(value) for name, value in match.groupdict().items()},
+            )
+
+    return None, None
+
+
+def get_route_handler(handler):
+    """
+    Get a handler function, importing its module on first use
+    :param handler: handler name in the format module.function, relative to the handlers package
+    :return: handler function
+    """
+    if handler not in _loaded_handlers:
+        module_name, function_name = handler.rsplit(".", 1)
+        module = importlib.import_module(f"iwanttoreadmore.handlers.{module_name}")
+        _loaded_handlers[handler] = getattr(module, function_name)
+
+    return _loaded_handlers[handler]
+
+
+def route_request(event, context):
+    """
+    Dispatch a request to the handler of its resource and HTTP method. The router can be deployed behind the resources
+    of the single functions as well as behind a greedy /{proxy+} resource - in the latter case the resource and the
+    path parameters are resolved from the request path.
+    :param event: event
+    :param context: Lambda context
+    :return: response of the handler, 404 if the resource doesn't exist or 405 if it doesn't support the method
+    """
+    method = (event.get("httpMethod") or "").upper()
+    resource = event.get("resource")
+
+    if resource not in _route_handlers:
+        resource, path_parameters = match_route(event.get("path") or "")
+        if not resource:
+            return create_response(404, method, "Not found")
+
+        event = dict(event, resource=resource, pathParameters=path_parameters)
+
+    handlers = _route_handlers[resource]
+    if method not in handlers:
+        return create_response(
+            405, method, "Method not allowed", {"Allow": ", ".join(sorted(handlers))}
+        )
+
+    return get_route_handler(handlers[method])(event, context)
@@ -2,11 +2,47 @@ import re
 import json
 from datetime import datetime, timedelta
 from urllib.parse import parse_qs
-from iwanttoreadmore.handlers.handler_helpers import create_response
-from iwanttoreadmore.common import get_cookie_date, sign_cookie, get_logged_in_user
-from iwanttoreadmore.models.user import User
+from iwanttoreadmore.handlers.handler_helpers import (
+    create_response,
+    request_scoped,
+    instrumented,
+)
+from iwanttoreadmore.common import (
+    get_cookie_date,
+    sign_cookie,
+    get_logged_in_user,
+    get_logged_in_session,
+)
+
+
+def get_login_cookie_headers(username):
+    """
+    Create the headers setting a new signed login cookie for a user
+    :param username: username of the logged in user
+    :return: dict with the cookie headers
+    """
+    cookie_content_signed = sign_cookie(f"user={username}")
+
+    expiration_date = datetime.now() + timedelta(days=30)
+    cookie = f"{cookie_content_signed};SameSite=Strict;Path=/;Expires={get_cookie_date(expiration_date)};HttpOnly"
 
+    return {"Access-Control-Allow-Credentials": "true", "Set-Cookie": cookie}
 
+
+def get_reissued_cookie_headers(session):
+    """
+    Create headers replacing a legacy login cookie with one in the current format
+    :param session: session of the logged in user
+    :return: dict with the cookie headers or None if the cookie doesn't need to be re-issued
+    """
+    if session and session["legacy"]:
+        return get_login_cookie_headers(session["user"])
+
+    return None
+
+
+@instrumented
+@request_scoped
 def login_user(event, _):
     """
     Login a user
@@ -19,36 +55,36 @@ def login_user(event, _):
 
     # Make sure that the request contains all needed data
     if "identifier" in params and "password" in params:
+        from iwanttoreadmore.models.user import User
+
         # Try to login the user
         user = User()
         username = user.login_user(params["identifier"][0], params["password"][0])
 
         if username:
-            cookie_content = f"user={username}"
-            cookie_content_signed = sign_cookie(cookie_content)
-
-            expiration_date = datetime.now() + timedelta(days=30)
-            cookie = f"{cookie_content_signed};SameSite=Strict;Path=/;Expires={get_cookie_date(expiration_date)};HttpOnly"
-
             return create_response(
-                200,
-                "POST",
-                username,
-                {"Access-Control-Allow-Credentials": "true", "Set-Cookie": cookie},
+                200, "POST", username, get_login_cookie_headers(username),
             )
 
     return create_response(401, "POST")
 
 
+@instrumented
 def check_user_logged_in(event, _):
     """
     Check if a user is logged in based on the provided cookie
     :param event: event
     :return: 200 if th euser is logged in, 401 otherwise
     """
-    return create_response(200 if get_logged_in_user(event) else 401)
+    session = get_logged_in_session(event)
+    return create_response(
+        200 if session else 401,
+        additional_headers=get_reissued_cookie_headers(session),
+    )
 
 
+@instrumented
+@request_scoped
 def change_password(event, _):
     """
     Change the password of the user
@@ -72,6 +108,8 @@ def change_password(event, _):
     if not username:
         return create_response(400, "POST", "User not logged in correctly")
 
+    from iwanttoreadmore.models.user import User
+
     # Try to change the password
     user = User()
     try:
@@ -83,6 +121,8 @@ def change_password(event, _):
         return create_response(400, "POST", str(error))
 
 
+@instrumented
+@request_scoped
 def get_user_data(event, _):
     """
     Get the data for the logged in user.
@@ -90,13 +130,15 @@ def get_user_data(event, _):
     :return: dict with the main data attributes for the logged in user
     """
     # Check if the user is logged in correctly and return empty dict if not
-    username = get_logged_in_user(event)
-    if not username:
+    session = get_logged_in_session(event)
+    if not session:
         return create_response(200, body=json.dumps(dict()))
 
+    from iwanttoreadmore.models.user import User
+
     # Get the user data
     user = User()
-    data = user.get_user_by_username(username)
+    data = user.get_user_by_username(session["user"])
 
     # Choose fileds to provide
     return create_response(
@@ -113,9 +155,12 @@ def get_user_data(event, _):
                 ]
             }
         ),
+        additional_headers=get_reissued_cookie_headers(session),
     )
 
 
+@instrumented
+@request_scoped
 def change_account_public(event, _):
     """
     Change the public visibility of an account
@@ -130,6 +175,8 @@ def change_account_public(event, _):
     # Get the new value of the public option
     new_is_public = event["body"] == "1"
 
+    from iwanttoreadmore.models.user import User
+
     # Change the user public setting
     user = User()
     user.set_account_public(username, new_is_public)
@@ -137,6 +184,7 @@ def change_account_public(event, _):
     return create_response(200, "POST")
 
 
+@instrumented
 def logout_user(event, _):
     """
     Logout a user by expiring the login cookie
@@ -154,6 +202,8 @@ def logout_user(event, _):
     )
 
 
+@instrumented
+@request_scoped
 def change_voted_message_and_redirect(event, _):
     """
     Change the user's voted message and redirect.
@@ -173,6 +223,8 @@ def change_voted_message_and_redirect(event, _):
     if "voted_message" in params and params["voted_message"]:
         voted_params["voted_message"] = params["voted_message"][0]
 
+    from iwanttoreadmore.models.user import User
+
     user = User()
     try:
         user.set_voted_message_and_redirect(**voted_params)
@@ -182,6 +234,8 @@ def change_voted_message_and_redirect(event, _):
     return create_response(200, "POST")
 
 
+@instrumented
+@request_scoped
 def add_single_voting_project(event, _):
     """
     Add a project to the user's single voting projects list
@@ -192,6 +246,8 @@ def add_single_voting_project(event, _):
     if not re.fullmatch(r"[a-z0-9_\.\-]{1,100}", project):
         return create_response(400, "POST", "Invalid project name")
 
+    from iwanttoreadmore.models.user import User
+
     # Get the logged in user data
     user = User()
     username = get_logged_in_user(event)
@@ -211,6 +267,8 @@ def add_single_voting_project(event, _):
     return create_response(200, "POST")
 
 
+@instrumented
+@request_scoped
 def remove_single_voting_project(event, _):
     """
     Remove a project from the user's single voting projects list
@@ -221,6 +279,8 @@ def remove_single_voting_project(event, _):
     if not re.fullmatch(r"[a-z0-9_\.\-]{1,100}", project):
         return create_response(400, "POST", "Invalid project name")
 
+    from iwanttoreadmore.models.user import User
+
     # Get the logged in user data
     user = User()
     username = get_logged_in_user(event)
@@ -1,17 +1,77 @@
+import os
 import re
 import json
+import time
+import hashlib
 import logging
 from urllib.parse import quote_plus
 from iwanttoreadmore.common import get_logged_in_user, get_ip_address
-from iwanttoreadmore.handlers.handler_helpers import create_response
+from iwanttoreadmore.handlers.handler_helpers import (
+    create_response,
+    get_query_parameter,
+    check_etag_matches,
+    encode_cursor,
+    decode_cursor,
+    request_scoped,
+    instrumented,
+)
 from iwanttoreadmore.models.vote import Vote, get_topic_key
 from iwanttoreadmore.models.vote_history import VoteHistory
+from iwanttoreadmore.models.vote_admission import VoteAdmission
+from iwanttoreadmore.models.vote_buckets import VoteBuckets, BUCKET_RESOLUTIONS
 from iwanttoreadmore.models.user import User
+from iwanttoreadmore.tracing import span, traced
 
-log = logging.getLogger()
-log.setLevel(logging.DEBUG)
+log = logging.getLogger(__name__)
 
+# Number of votes returned per page by the paginated get votes requests
+DEFAULT_VOTES_PAGE_SIZE = 50
+MAX_VOTES_PAGE_SIZE = 100
 
+# Maximal number of votes in a batch request
+MAX_BATCH_VOTES = 25
+
+# Outcomes of the votes in a batch request, in addition to the ones of VoteAdmission.admit_votes
+VOTE_INVALID = "invalid"
+VOTE_REJECTED = "rejected"
+
+# Orders in which the votes can be requested
+VOTES_ORDERS = ["votes", "recent"]
+
+# The votes in these orders are read from global secondary indexes, whose reads are eventually consistent and can lag
+# shortly behind the votes version. The ETags of these responses are weak and change every INDEX_ETAG_PERIOD seconds, so
+# a copy read before the index caught up is not confirmed with 304 responses for longer than that.
+INDEX_ETAG_PERIOD = 10
+
+# Number of buckets returned by the vote history requests without a time range, per resolution
+DEFAULT_HISTORY_BUCKETS = dict(hour=48, day=30, week=26)
+
+# Maximal number of buckets covered by the time range of a vote history request
+MAX_HISTORY_BUCKETS = 1000
+
+
+def check_username(username):
+    """
+    Check if a username in a vote request is valid
+    :param username: username
+    :return: True if the username is valid, False otherwise
+    """
+    return bool(re.fullmatch(r"[a-z0-9_\.\-]{3,30}", username))
+
+
+def check_project_and_topic(project, topic):
+    """
+    Check if a project and a topic in a vote request are valid
+    :param project: project
+    :param topic: topic
+    :return: True if both are valid, False otherwise
+    """
+    return bool(re.fullmatch(r"[a-z0-9_\.\-]{1,100}", project)) and bool(
+        re.fullmatch(r"[a-z0-9_\.\-]{1,100}", topic)
+    )
+
+
+@traced("do_vote")
 def do_vote(event, _):
     """
     Post a vote to the database
@@ -24,23 +84,14 @@ def do_vote(event, _):
     log.debug("Voting for: %s, %s, %s", username, project, topic)
 
     # Check all parameters for validity and return if some of them is not valid
-    if not re.fullmatch(r"[a-z0-9_\.\-]{3,30}", username):
-        return
-
-    if not re.fullmatch(r"[a-z0-9_\.\-]{1,100}", project):
-        return
-
-    if not re.fullmatch(r"[a-z0-9_\.\-]{1,100}", topic):
-        return
+    with span("validate vote"):
+        if not check_username(username) or not check_project_and_topic(
+            project, topic
+        ):
+            return
 
-    # Check if this IP address already voted for this topic
-    log.debug(f"Event: {event}")
     ip_address = get_ip_address(event)
 
-    vote_history = VoteHistory()
-    if vote_history.check_ip_voted(username, get_topic_key(project, topic), ip_address):
-        return
-
     # Check if the user has multiple voting for a project disabled
     user = User()
     user_data = user.get_user_by_username(username)
@@ -50,19 +101,22 @@ def do_vote(event, _):
         return
 
     # Stop ff the project is a single voting and the user already voted
-    if (
-        "single_voting_projects" in user_data
-        and project in user_data["single_voting_projects"]
-        and vote_history.check_ip_voted_project(username, project, ip_address)
-    ):
-        return
-
-    # Do the voting
-    vote = Vote()
-    vote.add_vote(username, project, topic)
-    vote_history.add_vote_history(username, project, topic, ip_address)
-
-
+    with span("check single voting"):
+        if (
+            "single_voting_projects" in user_data
+            and project in user_data["single_voting_projects"]
+            and VoteHistory().check_ip_voted_project(username, project, ip_address)
+        ):
+            return
+
+    # Do the voting. The vote and the vote history are written in one transaction, which is rejected if this IP
+    # address already voted for this topic.
+    vote_admission = VoteAdmission()
+    vote_admission.admit_vote(username, project, topic, ip_address)
+
+
+@instrumented
+@request_scoped
 def add_vote(event, _):
     """
     Handle add vote requests
@@ -76,6 +130,74 @@ def add_vote(event, _):
     return create_response(200, "POST")
 
 
+@instrumented
+@request_scoped
+def add_votes_batch(event, _):
+    """
+    Handle requests adding votes for several topics at once. The body is a JSON object with a list of votes, each of
+    them containing a project and a topic.
+    :param event: event
+    :return: JSON response with the outcome of each vote
+    """
+    username = event["pathParameters"]["user"].lower()
+
+    # Parse the list of votes
+    try:
+        votes = json.loads(event.get("body") or "")["votes"]
+        votes = [
+            (str(vote["project"]).lower(), str(vote["topic"]).lower()) for vote in votes
+        ]
+    except (ValueError, KeyError, TypeError):
+        return create_response(400, "POST", "Invalid votes")
+
+    if not 1 <= len(votes) <= MAX_BATCH_VOTES:
+        return create_response(400, "POST", "Invalid votes")
+
+    user_data = User().get_user_by_username(username) if check_username(username) else None
+    if not user_data:
+        return create_response(400, "POST", "Invalid user")
+
+    ip_address = get_ip_address(event)
+    vote_history = VoteHistory()
+    single_voting_projects = user_data.get("single_voting_projects") or []
+    voted_projects = dict()
+
+    # Check which votes can be admitted. Only one vote per single voting project is allowed.
+    outcomes = [None] * len(votes)
+    for i, (project, topic) in enumerate(votes):
+        if not check_project_and_topic(project, topic):
+            outcomes[i] = VOTE_INVALID
+        elif project in single_voting_projects:
+            if project not in voted_projects:
+                voted_projects[project] = vote_history.check_ip_voted_project(
+                    username, project, ip_address
+                )
+
+            if voted_projects[project]:
+                outcomes[i] = VOTE_REJECTED
+            voted_projects[project] = True
+
+    # Admit the remaining votes
+    admitted = [i for i, outcome in enumerate(outcomes) if outcome is None]
+    if admitted:
+        admitted_outcomes = VoteAdmission().admit_votes(
+            username, [votes[i] for i in admitted], ip_address
+        )
+        for i, outcome in zip(admitted, admitted_outcomes):
+            outcomes[i] = outcome
+
+    result = dict(
+        votes=[
+            dict(project=project, topic=topic, result=outcome)
+            for (project, topic), outcome in zip(votes, outcomes)
+        ]
+    )
+
+    return create_response(200, "POST", json.dumps(result))
+
+
+@instrumented
+@request_scoped
 def add_vote_and_redirect(event, _):
     """
     Handle add vote requests and redirect to a info page
@@ -103,6 +225,159 @@ def add_vote_and_redirect(event, _):
     return create_response(302, additional_headers={"Location": redirect_url})
 
 
+def check_count_parameter(count):
+    """
+    Check if a query parameter specifying a number of votes is valid
+    :param count: value of the query parameter
+    :return: True if the value is a number between 1 and MAX_VOTES_PAGE_SIZE, False otherwise
+    """
+    return bool(re.fullmatch(r"[0-9]{1,3}", count)) and 1 <= int(count) <= MAX_VOTES_PAGE_SIZE
+
+
+@traced("get_ordered_votes_response")
+def get_ordered_votes_response(event, result, username, project=None, headers=None):
+    """
+    Create the response to a get votes request returning the votes ordered by their count or, if the order query
+    parameter is "recent", by the time of their last vote. The top query parameter limits the number of votes.
+    :param event: event
+    :param result: response data to which the votes should be added
+    :param username: user whose votes are requested
+    :param project: project for which the votes are requested or None for all projects
+    :param headers: additional headers of the response
+    :return: votes data as JSON
+    """
+    vote = Vote()
+
+    order = get_query_parameter(event, "order") or "votes"
+    if order not in VOTES_ORDERS:
+        return create_response(400, "GET", "Invalid order")
+
+    top = get_query_parameter(event, "top")
+    if top is not None and not check_count_parameter(top):
+        return create_response(400, "GET", "Invalid top")
+
+    top = int(top) if top is not None else None
+
+    if order == "recent" and project is None:
+        result["votes"] = vote.get_recent_votes_for_user(username, top)
+    elif order == "recent":
+        result["votes"] = vote.get_recent_votes_for_project(username, project, top)
+    elif project is None:
+        result["votes"] = vote.get_votes_for_user(username, top)
+    else:
+        result["votes"] = vote.get_votes_for_project(username, project, top)
+
+    return create_response(200, body=json.dumps(result), additional_headers=headers)
+
+
+def get_votes_etag(event, user_data, project=None, from_index=False):
+    """
+    Compute the ETag of a get votes response. The votes version of the user is incremented on every vote, hide and
+    delete, so the ETag changes with the votes, but can be computed without reading them. The ETag of votes read from an
+    index is weak and also changes every INDEX_ETAG_PERIOD seconds, since the index may not contain the latest votes yet.
+    :param event: event
+    :param user_data: data of the user whose votes are requested
+    :param project: project for which the votes are requested or None for all projects
+    :param from_index: True if the votes are read from an eventually consistent index
+    :return: strong ETag, or weak ETag if the votes are read from an index
+    """
+    query_parameters = sorted((event.get("queryStringParameters") or dict()).items())
+    etag_data = json.dumps(
+        [
+            user_data["user"],
+            project,
+            user_data.get("votes_version", 0),
+            user_data.get("single_voting_projects"),
+            query_parameters,
+            int(time.time() // INDEX_ETAG_PERIOD) if from_index else None,
+        ]
+    )
+    etag = '"' + hashlib.sha256(etag_data.encode()).hexdigest()[:32] + '"'
+
+    return "W/" + etag if from_index else etag
+
+
+def get_votes_cache_control(user_data, logged_in_user):
+    """
+    Get the Cache-Control header of a get votes response. The votes of public accounts are the same for every anonymous
+    visitor, so they can be cached by the browsers and the CDN for PUBLIC_CACHE_MAX_AGE seconds (60 by default) and
+    served stale while being revalidated for PUBLIC_CACHE_STALE_WHILE_REVALIDATE seconds (300 by default). Hidden or
+    deleted topics can therefore still be shown to anonymous visitors until the cached copies expire.
+    :param user_data: data of the user whose votes are requested
+    :param logged_in_user: currently logged in user or None
+    :return: value of the Cache-Control header
+    """
+    if not user_data["is_public"] or logged_in_user == user_data["user"]:
+        return "private, no-store"
+
+    max_age = int(os.environ.get("PUBLIC_CACHE_MAX_AGE", "60"))
+    stale_while_revalidate = int(
+        os.environ.get("PUBLIC_CACHE_STALE_WHILE_REVALIDATE", "300")
+    )
+
+    return f"public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}"
+
+
+@traced("get_votes_response")
+def get_votes_response(event, user_data, project=None, logged_in_user=None):
+    """
+    Create the response to a get votes request. If the limit or cursor query parameters are set, a single page of votes
+    is returned together with a cursor for the next page. Otherwise all votes are returned in the requested order.
+    :param event: event
+    :param user_data: data of the user whose votes are requested
+    :param project: project for which the votes are requested or None for all projects
+    :param logged_in_user: currently logged in user or None
+    :return: votes data as JSON
+    """
+    username = user_data["user"]
+    result = dict(single_voting_projects=user_data.get("single_voting_projects"))
+
+    limit = get_query_parameter(event, "limit")
+    cursor = get_query_parameter(event, "cursor")
+    paginated = limit is not None or cursor is not None
+
+    etag = get_votes_etag(event, user_data, project, from_index=not paginated)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": get_votes_cache_control(user_data, logged_in_user),
+        "Vary": "Cookie",
+    }
+
+    # Answer conditional requests without reading the votes
+    if check_etag_matches(event, etag):
+        return create_response(304, additional_headers=headers)
+
+    if not paginated:
+        return get_ordered_votes_response(event, result, username, project, headers)
+
+    # Check the pagination parameters
+    if limit is None:
+        limit = DEFAULT_VOTES_PAGE_SIZE
+    elif check_count_parameter(limit):
+        limit = int(limit)
+    else:
+        return create_response(400, "GET", "Invalid limit")
+
+    cursor_scope = f"votes/{username}/{project or ''}"
+    try:
+        start_topic_key = decode_cursor(cursor_scope, cursor) if cursor else None
+    except ValueError as error:
+        return create_response(400, "GET", str(error))
+
+    # Get the page of votes
+    vote = Vote()
+    result["votes"], next_topic_key = vote.get_votes_page(
+        username, project, limit, start_topic_key
+    )
+    result["next_cursor"] = (
+        encode_cursor(cursor_scope, next_topic_key) if next_topic_key else None
+    )
+
+    return create_response(200, body=json.dumps(result), additional_headers=headers)
+
+
+@instrumented
+@request_scoped
 def get_votes_for_user(event, _):
     """
     Handle get votes request for a user
@@ -115,19 +390,18 @@ def get_votes_for_user(event, _):
     # Check if the user stats are public or the user is logged in
     user = User()
     user_data = user.get_user_by_username(username)
+    logged_in_user = get_logged_in_user(event)
 
-    if user_data and (user_data["is_public"] or username == get_logged_in_user(event)):
-        vote = Vote()
-        votes_data = vote.get_votes_for_user(username)
-        result = dict(
-            single_voting_projects=user_data.get("single_voting_projects"),
-            votes=votes_data,
+    if user_data and (user_data["is_public"] or username == logged_in_user):
+        return get_votes_response(
+            event, dict(user_data, user=username), logged_in_user=logged_in_user
         )
-        return create_response(200, body=json.dumps(result))
     else:
         return create_response(400, "GET", "Invalid user")
 
 
+@instrumented
+@request_scoped
 def get_votes_for_project(event, _):
     """
     Handle get votes request for a project
@@ -141,19 +415,18 @@ def get_votes_for_project(event, _):
     # Check if the user stats are public or the user is logged in
     user = User()
     user_data = user.get_user_by_username(username)
+    logged_in_user = get_logged_in_user(event)
 
-    if user_data and (user_data["is_public"] or username == get_logged_in_user(event)):
-        vote = Vote()
-        votes_data = vote.get_votes_for_project(username, project)
-        result = dict(
-            single_voting_projects=user_data.get("single_voting_projects"),
-            votes=votes_data,
+    if user_data and (user_data["is_public"] or username == logged_in_user):
+        return get_votes_response(
+            event, dict(user_data, user=username), project, logged_in_user
         )
-        return create_response(200, body=json.dumps(result))
     else:
         return create_response(400, "GET", "Invalid user")
 
 
+@instrumented
+@request_scoped
 def set_vote_hidden(event, _):
     """
     Handle changing the hidden state of a vote
@@ -175,11 +448,14 @@ def set_vote_hidden(event, _):
     # Check if the topic exists
     if vote.get_vote_count(user, get_topic_key(project, topic)) > 0:
         vote.set_vote_hidden(user, project, topic, hidden)
+        User().increment_votes_version(user)
         return create_response(200, "POST")
     else:
         return create_response(400, "POST", "Topic doesn't exist")
 
 
+@instrumented
+@request_scoped
 def delete_vote(event, _):
     """
     Delete a vote
@@ -200,6 +476,69 @@ def delete_vote(event, _):
     # Check if the topic exists
     if vote.get_vote_count(user, get_topic_key(project, topic)) > 0:
         vote.delete_vote(user, project, topic)
+        User().increment_votes_version(user)
         return create_response(200, "POST")
     else:
         return create_response(400, "POST", "Topic doesn't exist")
+
+
+@instrumented
+@request_scoped
+def get_vote_history(event, _):
+    """
+    Handle get vote history requests for a topic. The resolution query parameter selects hourly, daily or weekly
+    buckets (daily by default) and the since and until query parameters limit the time range, as timestamps in seconds.
+    Only the buckets with votes are returned.
+    :param event: event
+    :return: vote counts per bucket as JSON
+    """
+    # Get all parameters
+    username = event["pathParameters"]["user"]
+    project = event["pathParameters"]["project"]
+    topic = event["pathParameters"]["topic"]
+
+    resolution = get_query_parameter(event, "resolution") or "day"
+    if resolution not in BUCKET_RESOLUTIONS:
+        return create_response(400, "GET", "Invalid resolution")
+
+    since = get_query_parameter(event, "since")
+    until = get_query_parameter(event, "until")
+    if any(
+        value is not None and not re.fullmatch(r"[0-9]{1,12}", value)
+        for value in (since, until)
+    ):
+        return create_response(400, "GET", "Invalid time range")
+
+    bucket_length = BUCKET_RESOLUTIONS[resolution]
+    until = int(until) if until is not None else int(time.time())
+    since = (
+        int(since)
+        if since is not None
+        else until - DEFAULT_HISTORY_BUCKETS[resolution] * bucket_length
+    )
+    if not 0 <= until - since <= MAX_HISTORY_BUCKETS * bucket_length:
+        return create_response(400, "GET", "Invalid time range")
+
+    # Check if the user stats are public or the user is logged in
+    user_data = User().get_user_by_username(username)
+    logged_in_user = get_logged_in_user(event)
+
+    if not user_data or not (user_data["is_public"] or username == logged_in_user):
+        return create_response(400, "GET", "Invalid user")
+
+    result = dict(
+        resolution=resolution,
+        since=since,
+        until=until,
+        buckets=VoteBuckets().get_vote_buckets(
+            username, project, topic, resolution, since, until
+        ),
+    )
+    headers = {
+        "Cache-Control": get_votes_cache_control(
+            dict(user_data, user=username), logged_in_user
+        ),
+        "Vary": "Cookie",
+    }
+
+    return create_response(200, body=json.dumps(result), additional_headers=headers)
@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import contextvars
+
+# Logger of the package. The modules log to its children (logging.getLogger(__name__)), so the level and the output
+# are configured in one place without touching the root logger of the Lambda runtime.
+PACKAGE_LOGGER = "iwanttoreadmore"
+
+# Headers which are never written to the logs
+REDACTED_HEADERS = {"cookie", "authorization"}
+
+# Id of the request handled by the current invocation, added to every log line
+_request_id = contextvars.ContextVar("request_id", default=None)
+_logging_configured = False
+
+
+def get_log_level():
+    """
+    Get the log level, configured per stage with the LOG_LEVEL environment variable
+    :return: name of the log level, INFO by default
+    """
+    return os.environ.get("LOG_LEVEL", "INFO").upper()
+
+
+def get_event_log_sample_rate():
+    """
+    Get the fraction of the requests whose full event is logged, configured with the EVENT_LOG_SAMPLE_RATE environment
+    variable
+    :return: sample rate between 0 and 1, 0.01 by default
+    """
+    try:
+        return min(max(float(os.environ.get("EVENT_LOG_SAMPLE_RATE", "0.01")), 0), 1)
+    except ValueError:
+        return 0.01
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format log records as single line JSON objects with the id of the current request
+    """
+
+    converter = time.gmtime
+
+    def format(self, record):
+        """
+        Format a log record. The message is only formatted here, so the arguments of the records filtered out by the
+        log level are never formatted.
+        :param record: log record
+        :return: JSON string
+        """
+        entry = dict(
+            timestamp=self.formatTime(record, "%Y-%m-%dT%H:%M:%S")
+            + f".{int(record.msecs):03d}Z",
+            level=record.levelname,
+            logger=record.name,
+            request_id=_request_id.get(),
+            message=record.getMessage(),
+        )
+
+        # Additional fields can be passed with extra=dict(fields=...)
+        entry.update(getattr(record, "fields", dict()))
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+class StderrHandler(logging.StreamHandler):
+    """
+    Handler writing to the current standard error, even if it is replaced after the handler was created. Lambda sends
+    the standard error to CloudWatch Logs, while the standard output is kept for the embedded metrics and the traces.
+    """
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
+def configure_logging(stream=None):
+    """
+    Configure the logger of the package to write JSON lines with the configured log level
+    :param stream: stream to write to, the standard error by default
+    """
+    global _logging_configured
+
+    logger = logging.getLogger(PACKAGE_LOGGER)
+    logger.setLevel(get_log_level())
+    logger.propagate = False
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    handler = logging.StreamHandler(stream) if stream else StderrHandler()
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+
+    _logging_configured = True
+
+
+def ensure_logging_configured():
+    """
+    Configure the logging on the first invocation of the Lambda container
+    """
+    if not _logging_configured:
+        configure_logging()
+
+
+def get_request_id(event, context):
+    """
+    Get the id of a request
+    :param event: event
+    :param context: Lambda context
+    :return: id of the Lambda invocation, or of the API Gateway request if there is no context, or None
+    """
+    request_id = getattr(context, "aws_request_id", None)
+    if request_id:
+        return request_id
+
+    return ((event or dict()).get("requestContext") or dict()).get("requestId")
+
+
+def set_request_id(request_id):
+    """
+    Set the id of the request handled by the current invocation
+    :param request_id: id of the request
+    :return: token to restore the previous id with reset_request_id
+    """
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token):
+    """
+    Restore the request id which was set before set_request_id
+    :param token: token returned by set_request_id
+    """
+    _request_id.reset(token)
+
+
+def get_loggable_event(event):
+    """
+    Get a copy of an event without the headers and bodies containing credentials
+    :param event: event
+    :return: event for the logs
+    """
+    loggable_event = dict(event)
+
+    if "password" in (loggable_event.get("body") or "").lower():
+        loggable_event["body"] = "<redacted>"
+
+    for key in ["headers", "multiValueHeaders"]:
+        if loggable_event.get(key):
+            loggable_event[key] = {
+                header: "<redacted>" if header.lower() in REDACTED_HEADERS else value
+                for header, value in loggable_event[key].items()
+            }
+
+    return loggable_event
+
+
+def log_sampled_event(logger, event):
+    """
+    Log the full event for a sample of the requests. Dumping every event costs CPU time on every invocation, while a
+    small sample is enough to debug the shape of the requests.
+    :param logger: logger
+    :param event: event
+    :return: True if the event was logged, False otherwise
+    """
+    sample_rate = get_event_log_sample_rate()
+    if not sample_rate or random.random() >= sample_rate:
+        return False
+
+    logger.info(
+        "Sampled event", extra=dict(fields=dict(event=get_loggable_event(event)))
+    )
+    return True
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+
+METRICS_NAMESPACE = "IWantToReadMore"
+
+# DynamoDB requests of the current invocation by (operation, table). They are collected by the botocore event hooks of
+# the shared DynamoDB client, reset at the start of every invocation and emitted at its end.
+_dynamodb_requests = dict()
+
+
+def metrics_enabled():
+    """
+    Check if the invocation metrics should be emitted, configured with the INVOCATION_METRICS environment variable
+    :return: True if the metrics are emitted, False otherwise
+    """
+    return os.environ.get("INVOCATION_METRICS", "1") == "1"
+
+
+def get_request_tables(params):
+    """
+    Get the names of the tables accessed by a DynamoDB request
+    :param params: parameters of the request
+    :return: sorted list of table names
+    """
+    if "TableName" in params:
+        return [params["TableName"]]
+
+    if "RequestItems" in params:
+        return sorted(params["RequestItems"])
+
+    if "TransactItems" in params:
+        return sorted(
+            {
+                operation["TableName"]
+                for item in params["TransactItems"]
+                for operation in item.values()
+            }
+        )
+
+    return []
+
+
+def prepare_dynamodb_request(params, model, context, **_):
+    """
+    Hook called before a DynamoDB request is built. It asks DynamoDB to return the capacity consumed by the request and
+    remembers the accessed tables.
+    :param params: parameters of the request
+    :param model: model of the operation
+    :param context: context of the request, shared by all hooks
+    """
+    if "ReturnConsumedCapacity" in model.input_shape.members:
+        params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+    context["metrics_table"] = ",".join(get_request_tables(params))
+
+
+def start_dynamodb_request(context, **_):
+    """
+    Hook called before a DynamoDB request is sent
+    :param context: context of the request, shared by all hooks
+    """
+    context["metrics_start"] = time.perf_counter()
+
+
+def record_dynamodb_request(parsed, model, context, **_):
+    """
+    Hook called after a DynamoDB request returned. It records the request, its latency (including the retries) and the
+    capacity it consumed.
+    :param parsed: parsed response
+    :param model: model of the operation
+    :param context: context of the request, shared by all hooks
+    """
+    start = context.get("metrics_start", time.perf_counter())
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    consumed_capacity = parsed.get("ConsumedCapacity") or []
+    if isinstance(consumed_capacity, dict):
+        consumed_capacity = [consumed_capacity]
+
+    request = _dynamodb_requests.setdefault(
+        (model.name, context.get("metrics_table", "")),
+        dict(requests=0, consumed_capacity=0.0, latency_ms=0.0),
+    )
+    request["requests"] += 1
+    request["consumed_capacity"] += sum(
+        capacity.get("CapacityUnits", 0) for capacity in consumed_capacity
+    )
+    request["latency_ms"] += latency_ms
+
+
+def install_dynamodb_instrumentation(client):
+    """
+    Register the hooks collecting the invocation metrics on a DynamoDB client
+    :param client: DynamoDB client
+    """
+    client.meta.events.register(
+        "before-parameter-build.dynamodb", prepare_dynamodb_request
+    )
+    client.meta.events.register("before-call.dynamodb", start_dynamodb_request)
+    client.meta.events.register("after-call.dynamodb", record_dynamodb_request)
+
+
+def reset_invocation_metrics():
+    """
+    Forget the DynamoDB requests recorded so far
+    """
+    _dynamodb_requests.clear()
+
+
+def get_invocation_metrics():
+    """
+    Get the totals of the DynamoDB requests of the current invocation
+    :return: dict with the number of requests, the consumed capacity and the latency in milliseconds, in total and by
+    operation and table
+    """
+    return dict(
+        requests=sum(request["requests"] for request in _dynamodb_requests.values()),
+        consumed_capacity=sum(
+            request["consumed_capacity"] for request in _dynamodb_requests.values()
+        ),
+        latency_ms=sum(
+            request["latency_ms"] for request in _dynamodb_requests.values()
+        ),
+        operations={
+            f"{operation} {table}".strip(): dict(request)
+            for (operation, table), request in sorted(_dynamodb_requests.items())
+        },
+    )
+
+
+def emit_invocation_metrics(handler_name):
+    """
+    Write the metrics of the current invocation as a single log line in the CloudWatch Embedded Metric Format. The
+    totals become metrics with the handler name as dimension, the breakdown by operation and table is kept as a log
+    property for CloudWatch Logs Insights.
+    :param handler_name: name of the handler
+    """
+    if not metrics_enabled():
+        return
+
+    metrics = get_invocation_metrics()
+
+    print(
+        json.dumps(
+            {
+                "_aws": {
+                    "Timestamp": int(time.time() * 1000),
+                    "CloudWatchMetrics": [
+                        {
+                            "Namespace": METRICS_NAMESPACE,
+                            "Dimensions": [["Handler"]],
+                            "Metrics": [
+                                {"Name": "DynamoDBRequests", "Unit": "Count"},
+                                {"Name": "DynamoDBConsumedCapacity", "Unit": "Count"},
+                                {"Name": "DynamoDBLatency", "Unit": "Milliseconds"},
+                            ],
+                        }
+                    ],
+                },
+                "Handler": handler_name,
+                "DynamoDBRequests": metrics["requests"],
+                "DynamoDBConsumedCapacity": metrics["consumed_capacity"],
+                "DynamoDBLatency": round(metrics["latency_ms"], 3),
+                "DynamoDBOperations": metrics["operations"],
+            }
+        ),
+        flush=True,
+    )
@@ -0,0 +1,104 @@
+"""
+Create the EMail global secondary index on an existing users table and wait until DynamoDB has backfilled it with the
+existing users. Running the migration again is safe - an existing index is left unchanged.
+
+    USERS_TABLE=iwanttoreadmore-users-dev python -m iwanttoreadmore.migrations.email_index
+"""
+import os
+import time
+from iwanttoreadmore.connections import get_table
+
+EMAIL_INDEX_NAME = "EMailIndex"
+
+
+def get_index_status(table, index_name):
+    """
+    Get the status of a global secondary index
+    :param table: DynamoDB table object
+    :param index_name: name of the index
+    :return: status of the index or None if the index doesn't exist
+    """
+    table.reload()
+
+    for index in table.global_secondary_indexes or []:
+        if index["IndexName"] == index_name:
+            return index["IndexStatus"]
+
+    return None
+
+
+def create_email_index(table, wait=True, poll_interval=10):
+    """
+    Create the EMail index if it doesn't exist yet
+    :param table: users table object
+    :param wait: wait until the index is created and backfilled
+    :param poll_interval: time in seconds between two checks of the index status
+    :return: True if the index was created, False if it already existed
+    """
+    created = False
+
+    if get_index_status(table, EMAIL_INDEX_NAME) is None:
+        table.meta.client.update_table(
+            TableName=table.name,
+            AttributeDefinitions=[{"AttributeName": "EMail", "AttributeType": "S"}],
+            GlobalSecondaryIndexUpdates=[
+                {
+                    "Create": {
+                        "IndexName": EMAIL_INDEX_NAME,
+                        "KeySchema": [{"AttributeName": "EMail", "KeyType": "HASH"}],
+                        "Projection": {"ProjectionType": "ALL"},
+                        "ProvisionedThroughput": {
+                            "ReadCapacityUnits": 1,
+                            "WriteCapacityUnits": 1,
+                        },
+                    }
+                }
+            ],
+        )
+        created = True
+
+    while wait and get_index_status(table, EMAIL_INDEX_NAME) != "ACTIVE":
+        time.sleep(poll_interval)
+
+    return created
+
+
+def find_unindexed_users(table):
+    """
+    Find the users which cannot be found by their e-mail, because their EMail attribute is missing or not a string
+    :param table: users table object
+    :return: list of usernames
+    """
+    scan_args = dict(
+        ProjectionExpression="#User, EMail", ExpressionAttributeNames={"#User": "User"}
+    )
+    unindexed_users = []
+
+    while True:
+        response = table.scan(**scan_args)
+        unindexed_users += [
+            user["User"]
+            for user in response["Items"]
+            if not isinstance(user.get("EMail"), str)
+        ]
+
+        if "LastEvaluatedKey" not in response:
+            return unindexed_users
+
+        scan_args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def main():
+    table = get_table(os.environ["USERS_TABLE"])
+
+    if create_email_index(table):
+        print(f"Created index {EMAIL_INDEX_NAME} on {table.name}")
+    else:
+        print(f"Index {EMAIL_INDEX_NAME} already exists on {table.name}")
+
+    for user in find_unindexed_users(table):
+        print(f"User {user} has no valid e-mail and cannot log in with it")
+
+
+if __name__ == "__main__":
+    main()
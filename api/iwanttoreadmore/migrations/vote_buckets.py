@@ -0,0 +1,115 @@
+"""
+Fill the vote buckets with the votes from the vote history which were admitted before the buckets were maintained.
+The votes admitted since the deployment of the buckets are already counted, so the migration only counts the votes
+before the timestamp passed in BACKFILL_UNTIL, which should be the time of the deployment. Each bucket is marked when
+it is backfilled, so running the migration again is safe - backfilled buckets are left unchanged. Hourly buckets older
+than their retention are skipped.
+
+    VOTES_HISTORY_TABLE=iwanttoreadmore-votes-history-dev VOTES_BUCKETS_TABLE=iwanttoreadmore-votes-buckets-dev \\
+        BACKFILL_UNTIL=1600000000 python -m iwanttoreadmore.migrations.vote_buckets
+"""
+import os
+import time
+from collections import Counter
+from botocore.exceptions import ClientError
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.models.vote_buckets import (
+    BUCKET_RESOLUTIONS,
+    HOUR_BUCKETS_RETENTION,
+    get_bucket_key,
+    get_bucket_start,
+)
+
+
+def count_history_votes(history_table, until):
+    """
+    Count the votes in the vote history per bucket
+    :param history_table: vote history table object
+    :param until: timestamp in seconds until which the votes are counted
+    :return: Counter of the votes by (bucket key, bucket start, resolution)
+    """
+    scan_args = dict(
+        ProjectionExpression="#User, TopicKey, VoteTimestamp",
+        ExpressionAttributeNames={"#User": "User"},
+    )
+    counts = Counter()
+
+    while True:
+        response = history_table.scan(**scan_args)
+
+        for vote in response["Items"]:
+            if float(vote["VoteTimestamp"]) >= until:
+                continue
+
+            project_name, topic = vote["TopicKey"].split("/", 1)
+            for resolution in BUCKET_RESOLUTIONS:
+                bucket_start = get_bucket_start(vote["VoteTimestamp"], resolution)
+                counts[
+                    (
+                        get_bucket_key(vote["User"], project_name, topic, resolution),
+                        bucket_start,
+                        resolution,
+                    )
+                ] += 1
+
+        if "LastEvaluatedKey" not in response:
+            return counts
+
+        scan_args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def backfill_vote_buckets(history_table, buckets_table, until):
+    """
+    Add the votes from the vote history to the buckets which were not backfilled yet
+    :param history_table: vote history table object
+    :param buckets_table: vote buckets table object
+    :param until: timestamp in seconds until which the votes are counted
+    :return: number of backfilled buckets
+    """
+    backfilled_buckets = 0
+
+    for (bucket_key, bucket_start, resolution), count in sorted(
+        count_history_votes(history_table, until).items()
+    ):
+        update_expression = "SET #Backfilled = :Backfilled"
+        attribute_names = {"#Backfilled": "Backfilled", "#VoteCount": "VoteCount"}
+        attribute_values = {":Backfilled": True, ":VoteCount": count}
+
+        if resolution == "hour":
+            expires_at = bucket_start + HOUR_BUCKETS_RETENTION
+            if expires_at <= time.time():
+                continue
+
+            update_expression += ", #ExpiresAt = :ExpiresAt"
+            attribute_names["#ExpiresAt"] = "ExpiresAt"
+            attribute_values[":ExpiresAt"] = expires_at
+
+        try:
+            buckets_table.update_item(
+                Key={"BucketKey": bucket_key, "BucketStart": bucket_start},
+                ExpressionAttributeNames=attribute_names,
+                ExpressionAttributeValues=attribute_values,
+                UpdateExpression=update_expression + " ADD #VoteCount :VoteCount",
+                ConditionExpression="attribute_not_exists(#Backfilled)",
+            )
+        except ClientError as error:
+            if error.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                continue
+            raise
+
+        backfilled_buckets += 1
+
+    return backfilled_buckets
+
+
+def main():
+    history_table = get_table(os.environ["VOTES_HISTORY_TABLE"])
+    buckets_table = get_table(os.environ["VOTES_BUCKETS_TABLE"])
+    until = float(os.environ["BACKFILL_UNTIL"])
+
+    backfilled_buckets = backfill_vote_buckets(history_table, buckets_table, until)
+    print(f"Backfilled {backfilled_buckets} buckets in {buckets_table.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Store the timestamps of the existing vote history entries as numbers and create the global secondary indexes ordering
+the votes of a topic and of a user by their timestamp. The entries written before used string timestamps and had no
+UserTopic attribute, so they are missing from the indexes until they are converted. The entries are converted before the
+indexes are created, since DynamoDB skips the entries whose key attributes have the wrong type when it backfills a new
+index. Running the migration again is safe - converted entries and existing indexes are left unchanged.
+
+The indexes are not part of serverless.yml. The VoteTimestamp key of the indexes is a number, so the template would
+create them before the existing string timestamps are converted. Old code still running during the deployment would
+then have its string timestamps rejected. CloudFormation also creates only one index per stack update. The rollout is
+therefore done in this order:
+
+1. Deploy the code writing numeric timestamps and the UserTopic attribute. It reads string and numeric timestamps, and
+   nothing reads the new indexes yet.
+2. Run the migration once the old code is no longer running. It converts the remaining string timestamps first, and
+   then creates the indexes one after another.
+
+New stages run the migration right after their first deployment:
+
+    VOTES_HISTORY_TABLE=iwanttoreadmore-votes-history-dev python -m iwanttoreadmore.migrations.vote_history_timestamps
+"""
+import os
+import time
+from decimal import Decimal
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.migrations.email_index import get_index_status
+from iwanttoreadmore.models.vote_history import (
+    USER_TOPIC_TIMESTAMP_INDEX,
+    USER_TIMESTAMP_INDEX,
+    get_user_topic_key,
+)
+
+# Name, partition key, sort key and projected attributes of each index
+VOTE_HISTORY_INDEXES = [
+    (USER_TOPIC_TIMESTAMP_INDEX, "UserTopic", "VoteTimestamp", []),
+    (USER_TIMESTAMP_INDEX, "User", "VoteTimestamp", ["TopicKey"]),
+]
+
+VOTE_HISTORY_INDEX_ATTRIBUTE_TYPES = dict(User="S", UserTopic="S", VoteTimestamp="N")
+
+# Every vote history entry is written once and never updated, so each index needs the write capacity of the table
+VOTE_HISTORY_INDEX_WRITE_CAPACITY_UNITS = 2
+
+
+def get_vote_history_index_definition(index_name, partition_key, sort_key, attributes):
+    """
+    Get the definition of a vote history index as used in the CreateTable and UpdateTable requests
+    :param index_name: name of the index
+    :param partition_key: partition key attribute of the index
+    :param sort_key: sort key attribute of the index
+    :param attributes: list of the projected attributes besides the keys
+    :return: dict with the index definition
+    """
+    return {
+        "IndexName": index_name,
+        "KeySchema": [
+            {"AttributeName": partition_key, "KeyType": "HASH"},
+            {"AttributeName": sort_key, "KeyType": "RANGE"},
+        ],
+        "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": attributes}
+        if attributes
+        else {"ProjectionType": "KEYS_ONLY"},
+        "ProvisionedThroughput": {
+            "ReadCapacityUnits": 1,
+            "WriteCapacityUnits": VOTE_HISTORY_INDEX_WRITE_CAPACITY_UNITS,
+        },
+    }
+
+
+def convert_vote_timestamps(table):
+    """
+    Store the timestamps of the vote history entries which have a string timestamp as numbers and set their UserTopic
+    attribute
+    :param table: vote history table object
+    :return: number of converted entries
+    """
+    scan_args = dict(
+        ProjectionExpression="IPHash, #User, TopicKey, UserTopic, VoteTimestamp",
+        ExpressionAttributeNames={"#User": "User"},
+    )
+    converted_votes = 0
+
+    while True:
+        response = table.scan(**scan_args)
+
+        for vote in response["Items"]:
+            if isinstance(vote["VoteTimestamp"], Decimal) and "UserTopic" in vote:
+                continue
+
+            table.update_item(
+                Key={"IPHash": vote["IPHash"]},
+                ExpressionAttributeNames={
+                    "#UserTopic": "UserTopic",
+                    "#VoteTimestamp": "VoteTimestamp",
+                },
+                ExpressionAttributeValues={
+                    ":UserTopic": get_user_topic_key(vote["User"], vote["TopicKey"]),
+                    ":VoteTimestamp": Decimal(str(vote["VoteTimestamp"])),
+                },
+                UpdateExpression="SET #UserTopic = :UserTopic, "
+                "#VoteTimestamp = :VoteTimestamp",
+            )
+            converted_votes += 1
+
+        if "LastEvaluatedKey" not in response:
+            return converted_votes
+
+        scan_args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def create_vote_history_indexes(table, wait=True, poll_interval=10):
+    """
+    Create the vote history indexes which don't exist yet. DynamoDB creates only one index per request, so the migration
+    waits until each index is active before creating the next one.
+    :param table: vote history table object
+    :param wait: wait until the last index is created and backfilled
+    :param poll_interval: time in seconds between two checks of the index status
+    :return: list with the names of the created indexes
+    """
+    created_indexes = []
+
+    for index_name, partition_key, sort_key, attributes in VOTE_HISTORY_INDEXES:
+        if get_index_status(table, index_name) is not None:
+            continue
+
+        # The table can only be updated when the previously created index is ready
+        for previous_index in created_indexes:
+            while get_index_status(table, previous_index) != "ACTIVE":
+                time.sleep(poll_interval)
+
+        table.meta.client.update_table(
+            TableName=table.name,
+            AttributeDefinitions=[
+                {
+                    "AttributeName": attribute,
+                    "AttributeType": VOTE_HISTORY_INDEX_ATTRIBUTE_TYPES[attribute],
+                }
+                for attribute in (partition_key, sort_key)
+            ],
+            GlobalSecondaryIndexUpdates=[
+                {
+                    "Create": get_vote_history_index_definition(
+                        index_name, partition_key, sort_key, attributes
+                    )
+                }
+            ],
+        )
+        created_indexes.append(index_name)
+
+    while wait and any(
+        get_index_status(table, index_name) != "ACTIVE" for index_name in created_indexes
+    ):
+        time.sleep(poll_interval)
+
+    return created_indexes
+
+
+def main():
+    table = get_table(os.environ["VOTES_HISTORY_TABLE"])
+
+    print(f"Converted the timestamps of {convert_vote_timestamps(table)} votes")
+
+    for index_name in create_vote_history_indexes(table):
+        print(f"Created index {index_name} on {table.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Create the global secondary indexes ordering the votes by their vote count and by the time of their last vote on the
+votes table. The topics created before the per project indexes existed don't have the UserProject attribute, so the
+migration backfills it - until then they are missing from the per project indexes. Running the migration again is
+safe - existing indexes and attributes are left unchanged.
+
+The indexes are not part of serverless.yml. CloudFormation creates only one index per stack update, so adding all four
+to the template would fail to deploy, and an index created by the template would collide with this migration. The
+migration is therefore the only way the indexes are created - for new stages right after their first deployment. On an
+existing stage it runs before the code reading the indexes is deployed, and once more afterwards to backfill the topics
+created by the old code in the meantime:
+
+    VOTES_TABLE=iwanttoreadmore-votes-dev python -m iwanttoreadmore.migrations.vote_indexes
+"""
+import os
+import time
+from boto3.dynamodb.conditions import Attr
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.migrations.email_index import get_index_status
+from iwanttoreadmore.models.vote import (
+    USER_VOTE_COUNT_INDEX,
+    USER_LAST_VOTE_INDEX,
+    USER_PROJECT_VOTE_COUNT_INDEX,
+    USER_PROJECT_LAST_VOTE_INDEX,
+    get_user_project_key,
+)
+
+# Name, partition key and sort key of each index
+VOTE_INDEXES = [
+    (USER_VOTE_COUNT_INDEX, "User", "VoteCount"),
+    (USER_LAST_VOTE_INDEX, "User", "LastVote"),
+    (USER_PROJECT_VOTE_COUNT_INDEX, "UserProject", "VoteCount"),
+    (USER_PROJECT_LAST_VOTE_INDEX, "UserProject", "LastVote"),
+]
+
+VOTE_INDEX_ATTRIBUTE_TYPES = dict(User="S", UserProject="S", VoteCount="N", LastVote="S")
+
+# Every vote changes VoteCount and LastVote, which are sort keys of all indexes. DynamoDB writes such a change as a delete
+# and a put, so each index needs twice the write capacity of the votes table or it throttles the votes.
+VOTE_INDEX_WRITE_CAPACITY_UNITS = 2
+
+# Attributes needed to return the votes from the indexes without reading the table
+VOTE_INDEX_PROJECTED_ATTRIBUTES = [
+    "ProjectName",
+    "Topic",
+    "VoteCount",
+    "LastVote",
+    "VoteHidden",
+]
+
+
+def get_vote_index_definition(index_name, partition_key, sort_key):
+    """
+    Get the definition of a votes index as used in the CreateTable and UpdateTable requests
+    :param index_name: name of the index
+    :param partition_key: partition key attribute of the index
+    :param sort_key: sort key attribute of the index
+    :return: dict with the index definition
+    """
+    return {
+        "IndexName": index_name,
+        "KeySchema": [
+            {"AttributeName": partition_key, "KeyType": "HASH"},
+            {"AttributeName": sort_key, "KeyType": "RANGE"},
+        ],
+        "Projection": {
+            "ProjectionType": "INCLUDE",
+            "NonKeyAttributes": [
+                attribute
+                for attribute in VOTE_INDEX_PROJECTED_ATTRIBUTES
+                if attribute not in (partition_key, sort_key)
+            ],
+        },
+        "ProvisionedThroughput": {
+            "ReadCapacityUnits": 1,
+            "WriteCapacityUnits": VOTE_INDEX_WRITE_CAPACITY_UNITS,
+        },
+    }
+
+
+def get_vote_index_attribute_definitions(partition_key, sort_key):
+    """
+    Get the attribute definitions of the keys of a votes index
+    :param partition_key: partition key attribute of the index
+    :param sort_key: sort key attribute of the index
+    :return: list of attribute definitions
+    """
+    return [
+        {"AttributeName": attribute, "AttributeType": VOTE_INDEX_ATTRIBUTE_TYPES[attribute]}
+        for attribute in (partition_key, sort_key)
+    ]
+
+
+def create_vote_indexes(table, wait=True, poll_interval=10):
+    """
+    Create the votes indexes which don't exist yet. DynamoDB creates only one index per request, so the migration waits
+    until each index is active before creating the next one.
+    :param table: votes table object
+    :param wait: wait until the last index is created and backfilled
+    :param poll_interval: time in seconds between two checks of the index status
+    :return: list with the names of the created indexes
+    """
+    created_indexes = []
+
+    for index_name, partition_key, sort_key in VOTE_INDEXES:
+        if get_index_status(table, index_name) is not None:
+            continue
+
+        # The table can only be updated when the previously created index is ready
+        for previous_index in created_indexes:
+            while get_index_status(table, previous_index) != "ACTIVE":
+                time.sleep(poll_interval)
+
+        table.meta.client.update_table(
+            TableName=table.name,
+            AttributeDefinitions=get_vote_index_attribute_definitions(
+                partition_key, sort_key
+            ),
+            GlobalSecondaryIndexUpdates=[
+                {"Create": get_vote_index_definition(index_name, partition_key, sort_key)}
+            ],
+        )
+        created_indexes.append(index_name)
+
+    while wait and any(
+        get_index_status(table, index_name) != "ACTIVE" for index_name in created_indexes
+    ):
+        time.sleep(poll_interval)
+
+    return created_indexes
+
+
+def backfill_user_project(table):
+    """
+    Set the UserProject attribute of all topics which don't have it yet, so that they appear in the per project indexes
+    :param table: votes table object
+    :return: number of updated topics
+    """
+    scan_args = dict(
+        ProjectionExpression="#User, TopicKey, ProjectName",
+        ExpressionAttributeNames={"#User": "User"},
+        FilterExpression=Attr("UserProject").not_exists(),
+    )
+    updated_topics = 0
+
+    while True:
+        response = table.scan(**scan_args)
+
+        for vote in response["Items"]:
+            table.update_item(
+                Key={"User": vote["User"], "TopicKey": vote["TopicKey"]},
+                ExpressionAttributeNames={"#UserProject": "UserProject"},
+                ExpressionAttributeValues={
+                    ":UserProject": get_user_project_key(
+                        vote["User"], vote["ProjectName"]
+                    )
+                },
+                UpdateExpression="SET #UserProject = if_not_exists(#UserProject, :UserProject)",
+            )
+            updated_topics += 1
+
+        if "LastEvaluatedKey" not in response:
+            return updated_topics
+
+        scan_args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def main():
+    table = get_table(os.environ["VOTES_TABLE"])
+
+    for index_name in create_vote_indexes(table):
+        print(f"Created index {index_name} on {table.name}")
+
+    print(f"Set the UserProject attribute of {backfill_user_project(table)} topics")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import time
+import random
+
+# Retries of the unprocessed keys of batch requests, with an exponential backoff starting at BATCH_RETRY_DELAY seconds
+BATCH_MAX_RETRIES = 5
+BATCH_RETRY_DELAY = 0.05
+
+# Maximal number of keys of a BatchGetItem request
+BATCH_GET_SIZE = 100
+
+# Retries of the transactions cancelled because of a conflict with a concurrent request on the same items, with a
+# jittered exponential backoff, so that the conflicting requests don't collide again
+TRANSACTION_MAX_RETRIES = 3
+
+
+def query_all(table, **query_args):
+    """
+    Query a table following the pagination. The pages are requested lazily, only when the previous one was consumed.
+    :param table: DynamoDB table object
+    :param query_args: arguments of the query request
+    :return: generator of the items matching the query
+    """
+    while True:
+        response = table.query(**query_args)
+        yield from response["Items"]
+
+        if "LastEvaluatedKey" not in response:
+            return
+
+        query_args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def has_transaction_cancellation_reason(error, code):
+    """
+    Check if a failed transaction was cancelled for the given reason
+    :param error: ClientError raised by a TransactWriteItems request
+    :param code: code of the cancellation reason, e.g. ConditionalCheckFailed or TransactionConflict
+    :return: True if one of the items of the transaction was cancelled for this reason, False otherwise
+    """
+    if error.response["Error"]["Code"] != "TransactionCanceledException":
+        return False
+
+    if "CancellationReasons" in error.response:
+        return any(
+            reason.get("Code") == code
+            for reason in error.response["CancellationReasons"]
+        )
+
+    return code in error.response["Error"]["Message"]
+
+
+def is_transaction_condition_failure(error):
+    """
+    Check if a failed transaction was cancelled because of a failed condition
+    :param error: ClientError raised by a TransactWriteItems request
+    :return: True if a condition of the transaction failed, False otherwise
+    """
+    return has_transaction_cancellation_reason(error, "ConditionalCheckFailed")
+
+
+def is_transaction_conflict(error):
+    """
+    Check if a failed transaction was cancelled because of a conflict with another request on one of its items. Such
+    transactions can be retried.
+    :param error: ClientError raised by a TransactWriteItems request
+    :return: True if the transaction conflicted with another request, False otherwise
+    """
+    return has_transaction_cancellation_reason(error, "TransactionConflict")
+
+
+def get_retry_delay(attempt):
+    """
+    Get the delay before retrying the unprocessed items of a batch request, doubling with every attempt
+    :param attempt: number of the retry, starting at 0
+    :return: delay in seconds
+    """
+    return BATCH_RETRY_DELAY * 2 ** attempt
+
+
+def get_jittered_retry_delay(attempt):
+    """
+    Get a random delay before retrying a request which conflicted with other requests, between 0 and the delay of
+    get_retry_delay
+    :param attempt: number of the retry, starting at 0
+    :return: delay in seconds
+    """
+    return random.uniform(0, get_retry_delay(attempt))
+
+
+def batch_get_all(table, keys, **request_args):
+    """
+    Get items by their keys with BatchGetItem requests, retrying the unprocessed keys with an exponential backoff
+    :param table: DynamoDB table object
+    :param keys: list of item keys
+    :param request_args: additional arguments for the table, e.g. ProjectionExpression
+    :return: list of the found items in no particular order
+    """
+    items = []
+
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request_items = {
+            table.name: dict(request_args, Keys=keys[start : start + BATCH_GET_SIZE])
+        }
+
+        for attempt in range(BATCH_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(get_retry_delay(attempt - 1))
+
+            response = table.meta.client.batch_get_item(RequestItems=request_items)
+            items += response["Responses"].get(table.name, [])
+
+            request_items = response.get("UnprocessedKeys")
+            if not request_items:
+                break
+        else:
+            raise RuntimeError(f"Unprocessed keys remaining in {table.name}")
+
+    return items
+
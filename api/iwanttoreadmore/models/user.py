@@ -1,6 +1,10 @@
 import os
-import boto3
-from boto3.dynamodb.conditions import Key
+import copy
+from contextlib import contextmanager
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.tracing import trace_methods
 from iwanttoreadmore.common import (
     get_current_timestamp,
     check_password,
@@ -12,6 +16,50 @@ from iwanttoreadmore.common import (
     check_url,
 )
 
+# Users loaded during the current request, by username. The identity map exists only inside user_request_scope, so
+# users are never shared between requests. Users which don't exist are stored as None.
+_loaded_users = None
+
+
+@contextmanager
+def user_request_scope():
+    """
+    Context manager in which every user is read from the table at most once. The loaded users are forgotten when the
+    context is left. Nested scopes share the identity map of the outermost one.
+    """
+    global _loaded_users
+
+    if _loaded_users is not None:
+        yield
+        return
+
+    _loaded_users = dict()
+    try:
+        yield
+    finally:
+        _loaded_users = None
+
+
+def forget_loaded_user(user):
+    """
+    Remove a user from the identity map of the current request after the user was changed, so that the changed data is
+    read on the next access
+    :param user: username
+    """
+    if _loaded_users is not None:
+        _loaded_users.pop(user, None)
+
+
+def update_loaded_user(user, changes):
+    """
+    Apply changes which were already written to the table to a user in the identity map of the current request, so that
+    the next access sees them without reading the user again. Users which were not loaded are left unchanged.
+    :param user: username
+    :param changes: dict with the changed fields of the user dict
+    """
+    if _loaded_users is not None and _loaded_users.get(user) is not None:
+        _loaded_users[user].update(copy.deepcopy(changes))
+
 
 def get_user_dict_from_table(user_from_query):
     """
@@ -33,9 +81,40 @@ def get_user_dict_from_table(user_from_query):
     if "SingleVotingProjects" in user_from_query:
         user_data["single_voting_projects"] = user_from_query["SingleVotingProjects"]
 
+    if "VotesVersion" in user_from_query:
+        user_data["votes_version"] = int(user_from_query["VotesVersion"])
+
     return user_data
 
 
+def increment_votes_version(users_table, user):
+    """
+    Increment the version counter of the votes of a user. The counter changes every time the votes of the user change,
+    so clients can check if their copy of the votes is still up to date. Nothing is changed if the user doesn't exist.
+    :param users_table: users table object
+    :param user: username
+    """
+    try:
+        response = users_table.update_item(
+            Key={"User": user},
+            ExpressionAttributeNames={"#User": "User", "#VotesVersion": "VotesVersion"},
+            ExpressionAttributeValues={":One": 1},
+            UpdateExpression="ADD #VotesVersion :One",
+            ConditionExpression="attribute_exists(#User)",
+            ReturnValues="UPDATED_NEW",
+        )
+    except ClientError as error:
+        if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return
+
+    # The loaded user is updated with the new version instead of being read again
+    update_loaded_user(
+        user, dict(votes_version=int(response["Attributes"]["VotesVersion"]))
+    )
+
+
+@trace_methods
 class User:
     """
     This class contains the logic for retrieving and modifying users data
@@ -45,7 +124,7 @@ class User:
         """
         Initialize a new User object, containing a reference to the votes DynamoDB table
         """
-        self.users_table = boto3.resource("dynamodb").Table(os.environ["USERS_TABLE"])
+        self.users_table = get_table(os.environ["USERS_TABLE"])
 
     def create_user(self, user, email, password):
         """
@@ -81,6 +160,27 @@ class User:
                 "VotedRedirect": None,
             }
         )
+        forget_loaded_user(user)
+
+    def update_existing_user(self, user, **update_args):
+        """
+        Update a user with a single conditional write instead of reading it first to check if it exists. The function
+        will raise an exception if the user doesn't exist.
+        :param user: existing username
+        :param update_args: ExpressionAttributeNames, ExpressionAttributeValues and UpdateExpression of the update
+        """
+        try:
+            self.users_table.update_item(
+                Key={"User": user},
+                ConditionExpression=Attr("User").exists(),
+                **update_args,
+            )
+        except ClientError as error:
+            if error.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                raise ValueError(f"Cannot find user {user}")
+            raise
+        finally:
+            forget_loaded_user(user)
 
     def update_user_email(self, user, email):
         """
@@ -91,11 +191,8 @@ class User:
         if not check_email(email):
             raise ValueError(f"Invalid e-mail")
 
-        if not self.get_user_by_username(user):
-            raise ValueError(f"Cannot find user {user}")
-
-        self.users_table.update_item(
-            Key={"User": user},
+        self.update_existing_user(
+            user,
             ExpressionAttributeNames={"#EMail": "EMail",},
             ExpressionAttributeValues={":EMail": email},
             UpdateExpression="SET #EMail = :EMail",
@@ -110,11 +207,8 @@ class User:
         if not check_password(password):
             raise ValueError(f"Invalid password")
 
-        if not self.get_user_by_username(user):
-            raise ValueError(f"Cannot find user {user}")
-
-        self.users_table.update_item(
-            Key={"User": user},
+        self.update_existing_user(
+            user,
             ExpressionAttributeNames={"#PasswordHash": "PasswordHash",},
             ExpressionAttributeValues={":PasswordHash": create_password_hash(password)},
             UpdateExpression="SET #PasswordHash = :PasswordHash",
@@ -125,11 +219,8 @@ class User:
         Update a user's last active time with the current time. The function will raise an exception if the user doesn't exist.
         :param user: existing username
         """
-        if not self.get_user_by_username(user):
-            raise ValueError(f"Cannot find user {user}")
-
-        self.users_table.update_item(
-            Key={"User": user},
+        self.update_existing_user(
+            user,
             ExpressionAttributeNames={"#LastActive": "LastActive",},
             ExpressionAttributeValues={":LastActive": get_current_timestamp()},
             UpdateExpression="SET #LastActive = :LastActive",
@@ -137,20 +228,26 @@ class User:
 
     def get_user_by_username(self, username):
         """
-        Retrieves a user from the database by its username. If the user is not found, None will be returned.
+        Retrieves a user from the database by its username. If the user is not found, None will be returned. Inside a
+        user_request_scope the user is read from the table only once.
         :param user: username
         :return: dict containing the user's data
         """
+        if _loaded_users is not None and username in _loaded_users:
+            return copy.deepcopy(_loaded_users[username])
+
         user = self.users_table.query(
-            ProjectionExpression="#User, EMail, PasswordHash, Registered, LastActive, IsPublic, VotedMessage, VotedRedirect, SingleVotingProjects",
+            ProjectionExpression="#User, EMail, PasswordHash, Registered, LastActive, IsPublic, VotedMessage, VotedRedirect, SingleVotingProjects, VotesVersion",
             ExpressionAttributeNames={"#User": "User"},
             KeyConditionExpression=Key("User").eq(username),
         )
 
-        if user["Items"]:
-            return get_user_dict_from_table(user["Items"][0])
-        else:
-            return None
+        user_data = get_user_dict_from_table(user["Items"][0]) if user["Items"] else None
+
+        if _loaded_users is not None:
+            _loaded_users[username] = copy.deepcopy(user_data)
+
+        return user_data
 
     def get_user_by_email(self, email):
         """
@@ -158,18 +255,23 @@ class User:
         :param email: e-mail of the user
         :return: dict containing the user's data
         """
-        user = self.users_table.scan(
-            ProjectionExpression="#User, EMail, PasswordHash, Registered, LastActive, IsPublic, VotedMessage, VotedRedirect, SingleVotingProjects",
-            ExpressionAttributeNames={"#EMail": "EMail", "#User": "User"},
-            ExpressionAttributeValues={":EMail": email,},
-            FilterExpression="#EMail = :EMail",
+        user = self.users_table.query(
+            IndexName="EMailIndex",
+            ProjectionExpression="#User, EMail, PasswordHash, Registered, LastActive, IsPublic, VotedMessage, VotedRedirect, SingleVotingProjects, VotesVersion",
+            ExpressionAttributeNames={"#User": "User"},
+            KeyConditionExpression=Key("EMail").eq(email),
         )
 
-        if user["Items"]:
-            return get_user_dict_from_table(user["Items"][0])
-        else:
+        if not user["Items"]:
             return None
 
+        user_data = get_user_dict_from_table(user["Items"][0])
+
+        if _loaded_users is not None:
+            _loaded_users[user_data["user"]] = copy.deepcopy(user_data)
+
+        return user_data
+
     def login_user(self, identifier, password):
         """
         Checks if the provided login information corresponds to an existing user.
@@ -210,14 +312,16 @@ class User:
         :param user: user to check
         :param is_publuc: new value
         """
-        if not self.get_user_by_username(user):
-            raise ValueError(f"Cannot find user {user}")
-
-        self.users_table.update_item(
-            Key={"User": user},
-            ExpressionAttributeNames={"#IsPublic": "IsPublic",},
-            ExpressionAttributeValues={":IsPublic": is_publuc},
-            UpdateExpression="SET #IsPublic = :IsPublic",
+        # Copies of the votes must not be confirmed as up to date after the account is made private, so the votes version
+        # is incremented with the same update
+        self.update_existing_user(
+            user,
+            ExpressionAttributeNames={
+                "#IsPublic": "IsPublic",
+                "#VotesVersion": "VotesVersion",
+            },
+            ExpressionAttributeValues={":IsPublic": is_publuc, ":One": 1},
+            UpdateExpression="SET #IsPublic = :IsPublic ADD #VotesVersion :One",
         )
 
     def set_voted_message_and_redirect(self, user, voted_message, voted_redirect):
@@ -227,17 +331,14 @@ class User:
         :param voted_message: new voted message
         :param voted_redirect: new voted redirect
         """
-        if not self.get_user_by_username(user):
-            raise ValueError(f"Cannot find user {user}")
-
         if not check_voted_message(voted_message):
             raise ValueError(f"Invalid voted massage (don't use HTML tags)")
 
         if not check_url(voted_redirect):
             raise ValueError(f"Invalid URL")
 
-        self.users_table.update_item(
-            Key={"User": user},
+        self.update_existing_user(
+            user,
             ExpressionAttributeNames={
                 "#VotedMessage": "VotedMessage",
                 "#VotedRedirect": "VotedRedirect",
@@ -255,12 +356,16 @@ class User:
         :param user: username
         :param single_voting_projects: list of strings defining the single voting projects
         """
-        if not self.get_user_by_username(user):
-            raise ValueError(f"Cannot find user {user}")
-
-        self.users_table.update_item(
-            Key={"User": user},
+        self.update_existing_user(
+            user,
             ExpressionAttributeNames={"#SingleVotingProjects": "SingleVotingProjects",},
             ExpressionAttributeValues={":SingleVotingProjects": single_voting_projects},
             UpdateExpression="SET #SingleVotingProjects = :SingleVotingProjects",
         )
+
+    def increment_votes_version(self, user):
+        """
+        Increment the version counter of the votes of a user
+        :param user: username
+        """
+        increment_votes_version(self.users_table, user)
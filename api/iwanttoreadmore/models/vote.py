@@ -1,8 +1,18 @@
 import os
-import boto3
+import itertools
 from boto3.dynamodb.conditions import Key
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.tracing import trace_methods
+from iwanttoreadmore.models.model_helpers import query_all
 from iwanttoreadmore.common import get_current_timestamp
 
+# Global secondary indexes ordering the topics of a user, or of a project of a user, by their vote count or by the time
+# of their last vote. The per project indexes are partitioned by the UserProject attribute.
+USER_VOTE_COUNT_INDEX = "UserVoteCountIndex"
+USER_LAST_VOTE_INDEX = "UserLastVoteIndex"
+USER_PROJECT_VOTE_COUNT_INDEX = "UserProjectVoteCountIndex"
+USER_PROJECT_LAST_VOTE_INDEX = "UserProjectLastVoteIndex"
+
 
 def get_topic_key(project_name, topic):
     """
@@ -14,6 +24,49 @@ def get_topic_key(project_name, topic):
     return f"{project_name}/{topic}"
 
 
+def get_user_project_key(user, project_name):
+    """
+    Get the key of the per project indexes for a user and a project name
+    :param user: user
+    :param project_name: project name
+    :return: user project key
+    """
+    return f"{user}/{project_name}"
+
+
+def get_vote_increment_update(user, project_name, topic, count=1):
+    """
+    Get the parameters of an update request increasing the vote count of a topic. The topic is created if it doesn't
+    exist yet. The parameters can be used both in a single UpdateItem request and in a transaction.
+    :param user: user which the topic belongs to
+    :param project_name: project name
+    :param topic: topic
+    :param count: number of votes to add
+    :return: dict with the update request parameters
+    """
+    return dict(
+        Key={"User": user, "TopicKey": get_topic_key(project_name, topic)},
+        ExpressionAttributeNames={
+            "#ProjectName": "ProjectName",
+            "#Topic": "Topic",
+            "#UserProject": "UserProject",
+            "#LastVote": "LastVote",
+            "#VoteCount": "VoteCount",
+        },
+        ExpressionAttributeValues={
+            ":ProjectName": project_name,
+            ":Topic": topic,
+            ":UserProject": get_user_project_key(user, project_name),
+            ":LastVote": get_current_timestamp(),
+            ":VoteCount": count,
+        },
+        UpdateExpression="SET #ProjectName = if_not_exists(#ProjectName, :ProjectName), "
+        "#Topic = if_not_exists(#Topic, :Topic), "
+        "#UserProject = if_not_exists(#UserProject, :UserProject), #LastVote = :LastVote "
+        "ADD #VoteCount :VoteCount",
+    )
+
+
 def get_vote_dict_from_table(vote_from_query):
     """
     Returns a dict representation of a vote given a result from the table query
@@ -33,6 +86,7 @@ def get_vote_dict_from_table(vote_from_query):
     return result
 
 
+@trace_methods
 class Vote:
     """
     This class contains the logic for retrieving and modifying votes data
@@ -42,42 +96,125 @@ class Vote:
         """
         Initialize a new Vote object, containing a reference to the votes DynamoDB table
         """
-        self.votes_table = boto3.resource("dynamodb").Table(os.environ["VOTES_TABLE"])
+        self.votes_table = get_table(os.environ["VOTES_TABLE"])
 
-    def get_votes_for_user(self, user):
+    def get_votes_page(self, user, project_name=None, limit=50, start_topic_key=None):
         """
-        Retrieves all votes (topic, project, votes) for the specified user.
+        Retrieves one page of votes (topic, project, votes) for the specified user and optionally project. The votes are
+        ordered by their topic key and not by their count, so that the page boundaries don't move when new votes arrive.
+        The page is read with a strongly consistent read, so it contains every vote admitted before the request.
         :param user: user for which the votes should be retrieved
-        :return: List of dictionaries describing the votes
+        :param project_name: project for which the votes should be retrieved or None for all projects
+        :param limit: maximal number of votes on the page
+        :param start_topic_key: topic key after which the page starts or None for the first page
+        :return: List of dictionaries describing the votes and the topic key after which the next page starts or None
+        if there are no more pages
         """
-        votes = self.votes_table.query(
+        key_condition = Key("User").eq(user)
+        if project_name is not None:
+            key_condition = key_condition & Key("TopicKey").begins_with(
+                get_topic_key(project_name, "")
+            )
+
+        query_args = dict(
             ProjectionExpression="Topic, ProjectName, VoteCount, LastVote, VoteHidden",
-            KeyConditionExpression=Key("User").eq(user),
+            KeyConditionExpression=key_condition,
+            Limit=limit,
+            ConsistentRead=True,
         )
+        if start_topic_key is not None:
+            query_args["ExclusiveStartKey"] = {
+                "User": user,
+                "TopicKey": start_topic_key,
+            }
+
+        votes = self.votes_table.query(**query_args)
 
         votes_data = [get_vote_dict_from_table(vote) for vote in votes["Items"]]
+        next_topic_key = votes.get("LastEvaluatedKey", dict()).get("TopicKey")
+
+        return votes_data, next_topic_key
+
+    def iterate_votes_from_index(self, index_name, key_condition, limit=None):
+        """
+        Lazily iterate over the votes in an index in descending order of its sort key
+        :param index_name: name of the index
+        :param key_condition: key condition selecting the user or the project of a user
+        :param limit: if set, only the first limit votes are read from the index
+        :return: generator of dictionaries describing the votes
+        """
+        # The indexes contain only the attributes needed for the votes, so no projection expression is necessary
+        query_args = dict(
+            IndexName=index_name,
+            KeyConditionExpression=key_condition,
+            ScanIndexForward=False,
+        )
+        if limit is not None:
+            query_args["Limit"] = limit
+
+        votes = itertools.islice(query_all(self.votes_table, **query_args), limit)
+
+        for vote in votes:
+            yield get_vote_dict_from_table(vote)
 
-        return sorted(votes_data, key=lambda x: x["vote_count"], reverse=True)
+    def get_votes_for_user(self, user, top_n=None):
+        """
+        Retrieves all votes (topic, project, votes) for the specified user, sorted by their vote count.
+        :param user: user for which the votes should be retrieved
+        :param top_n: if set, only the top_n votes with the highest count are read
+        :return: List of dictionaries describing the votes
+        """
+        return list(
+            self.iterate_votes_from_index(
+                USER_VOTE_COUNT_INDEX, Key("User").eq(user), top_n
+            )
+        )
 
-    def get_votes_for_project(self, user, project_name):
+    def get_votes_for_project(self, user, project_name, top_n=None):
         """
-        Retrieves all votes (topic, project, votes) for the specified user and project.
+        Retrieves all votes (topic, project, votes) for the specified user and project, sorted by their vote count.
         :param user: user for which the votes should be retrieved
         :param project_name: project for which the votes should be retrieved
+        :param top_n: if set, only the top_n votes with the highest count are read
         :return: List of dictionaries describing the votes
         """
-        votes = self.votes_table.query(
-            ProjectionExpression="Topic, ProjectName, VoteCount, LastVote, VoteHidden",
-            KeyConditionExpression=Key("User").eq(user),
+        return list(
+            self.iterate_votes_from_index(
+                USER_PROJECT_VOTE_COUNT_INDEX,
+                Key("UserProject").eq(get_user_project_key(user, project_name)),
+                top_n,
+            )
         )
 
-        votes_data = [
-            get_vote_dict_from_table(vote)
-            for vote in votes["Items"]
-            if vote["ProjectName"] == project_name
-        ]
+    def get_recent_votes_for_user(self, user, limit=None):
+        """
+        Retrieves the votes (topic, project, votes) for the specified user, starting with the most recently voted one.
+        :param user: user for which the votes should be retrieved
+        :param limit: if set, only the limit most recently voted topics are read
+        :return: List of dictionaries describing the votes
+        """
+        return list(
+            self.iterate_votes_from_index(
+                USER_LAST_VOTE_INDEX, Key("User").eq(user), limit
+            )
+        )
 
-        return sorted(votes_data, key=lambda x: x["vote_count"], reverse=True)
+    def get_recent_votes_for_project(self, user, project_name, limit=None):
+        """
+        Retrieves the votes (topic, project, votes) for the specified user and project, starting with the most recently
+        voted one.
+        :param user: user for which the votes should be retrieved
+        :param project_name: project for which the votes should be retrieved
+        :param limit: if set, only the limit most recently voted topics are read
+        :return: List of dictionaries describing the votes
+        """
+        return list(
+            self.iterate_votes_from_index(
+                USER_PROJECT_LAST_VOTE_INDEX,
+                Key("UserProject").eq(get_user_project_key(user, project_name)),
+                limit,
+            )
+        )
 
     def get_vote_count(self, user, topic_key):
         """
@@ -93,60 +230,22 @@ class Vote:
 
         return int(vote["Items"][0]["VoteCount"]) if vote["Count"] else 0
 
-    def set_vote_count(self, user, topic_key, vote_count):
+    def add_vote(self, user, project_name, topic, count=1):
         """
-        Set the vote count for a topic key
-        :param user: user to which the topic key belongs
-        :param topic_key: topic key for which the vote count should be set
-        :param vote_count: new vote count
-        """
-        self.votes_table.update_item(
-            Key={"User": user, "TopicKey": topic_key},
-            ExpressionAttributeNames={
-                "#VoteCount": "VoteCount",
-                "#LastVote": "LastVote",
-            },
-            ExpressionAttributeValues={
-                ":VoteCount": vote_count,
-                ":LastVote": get_current_timestamp(),
-            },
-            UpdateExpression="SET #VoteCount = :VoteCount, #LastVote = :LastVote",
-        )
-
-    def create_topic(self, user, topic, project_name):
-        """
-        Create a new topic
-        :param user: user for which a new topic should be created
-        :param topic: name of the topic
-        :param project_name: project name for which the topic should be created
-        :return:
-        """
-        self.votes_table.put_item(
-            Item={
-                "User": user,
-                "TopicKey": get_topic_key(project_name, topic),
-                "ProjectName": project_name,
-                "Topic": topic,
-                "LastVote": get_current_timestamp(),
-                "VoteCount": 1,
-            }
-        )
-
-    def add_vote(self, user, project_name, topic):
-        """
-        Increase the vote count by 1 for a specified topic
+        Increase the vote count for a specified topic. The topic is created if it doesn't exist yet. The increment is
+        done atomically in a single request, so concurrent votes for the same topic are never lost.
         :param user: user which the topic belongs to
         :param project_name: project name
         :param topic: topic
+        :param count: number of votes to add
+        :return: new vote count
         """
-        topic_key = get_topic_key(project_name, topic)
-
-        vote_count = self.get_vote_count(user, topic_key)
+        response = self.votes_table.update_item(
+            **get_vote_increment_update(user, project_name, topic, count),
+            ReturnValues="UPDATED_NEW",
+        )
 
-        if vote_count > 0:
-            self.set_vote_count(user, topic_key, vote_count + 1)
-        else:
-            self.create_topic(user, topic, project_name)
+        return int(response["Attributes"]["VoteCount"])
 
     def set_vote_hidden(self, user, project_name, topic, hidden):
         """
@@ -0,0 +1,187 @@
+import os
+import time
+import logging
+from botocore.exceptions import ClientError
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.models.model_helpers import (
+    is_transaction_condition_failure,
+    is_transaction_conflict,
+    get_jittered_retry_delay,
+    batch_get_all,
+    TRANSACTION_MAX_RETRIES,
+)
+from iwanttoreadmore.models.vote import get_vote_increment_update
+from iwanttoreadmore.models.vote_history import get_vote_history_item
+from iwanttoreadmore.models.vote_buckets import get_bucket_increment_updates
+from iwanttoreadmore.models.user import increment_votes_version
+from iwanttoreadmore.tracing import span, trace_methods
+
+log = logging.getLogger(__name__)
+
+# Outcomes of the votes in a batch
+VOTE_ADDED = "added"
+VOTE_DUPLICATE = "duplicate"
+VOTE_FAILED = "failed"
+
+
+@trace_methods
+class VoteAdmission:
+    """
+    This class contains the logic for admitting new votes, updating the votes and the vote history data together
+    """
+
+    def __init__(self):
+        """
+        Initialize a new VoteAdmission object, containing a reference to the votes, vote history, vote buckets and
+        users tables
+        """
+        self.votes_table = get_table(os.environ["VOTES_TABLE"])
+        self.votes_history_table = get_table(os.environ["VOTES_HISTORY_TABLE"])
+        self.votes_buckets_table = get_table(os.environ["VOTES_BUCKETS_TABLE"])
+        self.users_table = get_table(os.environ["USERS_TABLE"])
+
+    def _get_vote_increment_items(self, user, project_name, topic, timestamp):
+        """
+        Get the transaction items increasing the vote count of a topic and its vote buckets
+        :param user: user which the topic belongs to
+        :param project_name: project name
+        :param topic: topic
+        :param timestamp: time of the vote in seconds
+        :return: list of transaction items
+        """
+        return [
+            {
+                "Update": dict(
+                    TableName=self.votes_table.name,
+                    **get_vote_increment_update(user, project_name, topic),
+                )
+            }
+        ] + [
+            {"Update": dict(TableName=self.votes_buckets_table.name, **update)}
+            for update in get_bucket_increment_updates(
+                user, project_name, topic, timestamp
+            )
+        ]
+
+    def _write_vote(self, user, project_name, topic, history_item):
+        """
+        Write the vote history entry of a vote together with the increments of the vote count and the vote buckets in a
+        single transaction, which is rejected if the vote history entry already exists. A transaction cancelled because
+        of a conflict with concurrent votes is retried a few times, before its error is raised.
+        :param user: user which the topic belongs to
+        :param project_name: project name
+        :param topic: topic
+        :param history_item: vote history entry of the vote
+        :return: True if the vote was written, False if it was a duplicate
+        """
+        transact_items = [
+            {
+                "Put": {
+                    "TableName": self.votes_history_table.name,
+                    "Item": history_item,
+                    "ExpressionAttributeNames": {"#IPHash": "IPHash"},
+                    "ConditionExpression": "attribute_not_exists(#IPHash)",
+                }
+            }
+        ] + self._get_vote_increment_items(
+            user, project_name, topic, history_item["VoteTimestamp"]
+        )
+
+        # Concurrent votes for the same topic update the same vote and bucket items, so their transactions can be
+        # cancelled because of a conflict. Only these are retried - a duplicate vote stays rejected.
+        for attempt in range(TRANSACTION_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(get_jittered_retry_delay(attempt - 1))
+
+            try:
+                self.votes_table.meta.client.transact_write_items(
+                    TransactItems=transact_items
+                )
+            except ClientError as error:
+                if is_transaction_condition_failure(error):
+                    return False
+                if is_transaction_conflict(error) and attempt < TRANSACTION_MAX_RETRIES:
+                    continue
+                raise
+
+            return True
+
+    def admit_vote(self, user, project_name, topic, ip_address):
+        """
+        Add a vote for a topic, the corresponding vote history entry and the vote to the vote buckets in a single
+        transaction. The vote is rejected if the IP address already voted for this topic.
+        :param user: user which the topic belongs to
+        :param project_name: project name
+        :param topic: topic
+        :param ip_address: IP address of the user that voted
+        :return: True if the vote was added, False if it was a duplicate
+        """
+        history_item = get_vote_history_item(user, project_name, topic, ip_address)
+        if not self._write_vote(user, project_name, topic, history_item):
+            return False
+
+        # The version is incremented after the vote is written, so the consistently read votes pages contain every vote
+        # the version announces. The ordered votes are read from eventually consistent indexes, which can still lag
+        # behind for a moment - their ETags are weak and expire after INDEX_ETAG_PERIOD seconds for this reason.
+        # It is not part of the transaction, because concurrent votes for any topic of the user would then conflict on
+        # the user item and be cancelled. The increment costs one more write per vote and is not atomic with the vote -
+        # if it fails, the vote is counted, but the ETags of the votes only change with the next vote, hide or delete.
+        with span("increment votes version"):
+            increment_votes_version(self.users_table, user)
+
+        return True
+
+    def admit_votes(self, user, votes, ip_address):
+        """
+        Add several votes of one IP address at once. The already existing vote history entries are read with a single
+        BatchGetItem request, so the duplicates are rejected without any writes. Each new vote is then written like in
+        admit_vote - its vote history entry, vote count and vote buckets in one transaction. A vote whose transaction
+        fails is reported as failed and leaves nothing behind, so it can be sent again.
+        :param user: user which the topics belong to
+        :param votes: list of (project name, topic) pairs
+        :param ip_address: IP address of the user that voted
+        :return: list with the outcome of each vote - VOTE_ADDED, VOTE_DUPLICATE or VOTE_FAILED
+        """
+        history_items = [
+            get_vote_history_item(user, project_name, topic, ip_address)
+            for project_name, topic in votes
+        ]
+        ip_hashes = list(dict.fromkeys(item["IPHash"] for item in history_items))
+
+        existing_ip_hashes = {
+            item["IPHash"]
+            for item in batch_get_all(
+                self.votes_history_table,
+                [{"IPHash": ip_hash} for ip_hash in ip_hashes],
+                ProjectionExpression="IPHash",
+            )
+        }
+
+        # Only the first vote for each topic is admitted
+        outcomes = []
+        new_items = []
+        for item in history_items:
+            if item["IPHash"] in existing_ip_hashes:
+                outcomes.append(VOTE_DUPLICATE)
+            else:
+                outcomes.append(VOTE_ADDED)
+                new_items.append(item)
+                existing_ip_hashes.add(item["IPHash"])
+
+        for i, (project_name, topic) in enumerate(votes):
+            if outcomes[i] != VOTE_ADDED:
+                continue
+
+            try:
+                if not self._write_vote(user, project_name, topic, history_items[i]):
+                    outcomes[i] = VOTE_DUPLICATE
+            except ClientError:
+                log.warning(
+                    "Failed to admit a vote for %s/%s", project_name, topic, exc_info=True
+                )
+                outcomes[i] = VOTE_FAILED
+
+        if VOTE_ADDED in outcomes:
+            increment_votes_version(self.users_table, user)
+
+        return outcomes
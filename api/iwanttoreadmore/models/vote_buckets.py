@@ -0,0 +1,137 @@
+import os
+from boto3.dynamodb.conditions import Key
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.tracing import trace_methods
+from iwanttoreadmore.models.model_helpers import query_all
+from iwanttoreadmore.models.vote import get_topic_key
+
+# Length of the buckets in seconds for each resolution
+BUCKET_RESOLUTIONS = dict(hour=3600, day=86400, week=604800)
+
+# The weekly buckets start on Monday. The epoch was a Thursday, so the first Monday is four days later.
+WEEK_START_OFFSET = 4 * 86400
+
+# Time in seconds for which the hourly buckets are kept. DynamoDB deletes them afterwards, since they would otherwise
+# grow without bounds. The daily and weekly buckets are kept forever.
+HOUR_BUCKETS_RETENTION = 90 * 86400
+
+
+def get_bucket_key(user, project_name, topic, resolution):
+    """
+    Get the partition key of the vote buckets of a topic with a given resolution
+    :param user: user which the topic belongs to
+    :param project_name: project name
+    :param topic: topic
+    :param resolution: resolution of the buckets, one of BUCKET_RESOLUTIONS
+    :return: bucket key
+    """
+    return f"{user}/{get_topic_key(project_name, topic)}/{resolution}"
+
+
+def get_bucket_start(timestamp, resolution):
+    """
+    Get the start of the bucket containing a timestamp
+    :param timestamp: timestamp in seconds
+    :param resolution: resolution of the buckets, one of BUCKET_RESOLUTIONS
+    :return: start of the bucket in seconds
+    """
+    length = BUCKET_RESOLUTIONS[resolution]
+    offset = WEEK_START_OFFSET if resolution == "week" else 0
+
+    return int((float(timestamp) - offset) // length * length + offset)
+
+
+def get_bucket_increment_updates(user, project_name, topic, timestamp, count=1):
+    """
+    Get the parameters of the update requests adding votes to the buckets of all resolutions containing a timestamp.
+    The buckets are created if they don't exist yet. The parameters can be used both in single UpdateItem requests and
+    in a transaction.
+    :param user: user which the topic belongs to
+    :param project_name: project name
+    :param topic: topic
+    :param timestamp: time of the votes in seconds
+    :param count: number of votes to add
+    :return: list of dicts with the update request parameters, one for each resolution
+    """
+    updates = []
+
+    for resolution in BUCKET_RESOLUTIONS:
+        bucket_start = get_bucket_start(timestamp, resolution)
+        update = dict(
+            Key={
+                "BucketKey": get_bucket_key(user, project_name, topic, resolution),
+                "BucketStart": bucket_start,
+            },
+            ExpressionAttributeNames={"#VoteCount": "VoteCount"},
+            ExpressionAttributeValues={":VoteCount": count},
+            UpdateExpression="ADD #VoteCount :VoteCount",
+        )
+
+        if resolution == "hour":
+            update["ExpressionAttributeNames"]["#ExpiresAt"] = "ExpiresAt"
+            update["ExpressionAttributeValues"][":ExpiresAt"] = (
+                bucket_start + HOUR_BUCKETS_RETENTION
+            )
+            update["UpdateExpression"] = (
+                "SET #ExpiresAt = :ExpiresAt " + update["UpdateExpression"]
+            )
+
+        updates.append(update)
+
+    return updates
+
+
+@trace_methods
+class VoteBuckets:
+    """
+    This class contains the logic for retrieving and modifying the vote counts of the topics per hour, day and week.
+    The buckets are updated together with the votes, so the history of a topic can be read with a single small query,
+    no matter how many votes it has.
+    """
+
+    def __init__(self):
+        """
+        Initialize a new VoteBuckets object, containing a reference to the vote buckets DynamoDB table
+        """
+        self.votes_buckets_table = get_table(os.environ["VOTES_BUCKETS_TABLE"])
+
+    def add_votes(self, user, project_name, topic, timestamp, count=1):
+        """
+        Add votes to the buckets of all resolutions
+        :param user: user which the topic belongs to
+        :param project_name: project name
+        :param topic: topic
+        :param timestamp: time of the votes in seconds
+        :param count: number of votes to add
+        """
+        for update in get_bucket_increment_updates(
+            user, project_name, topic, timestamp, count
+        ):
+            self.votes_buckets_table.update_item(**update)
+
+    def get_vote_buckets(self, user, project_name, topic, resolution, start, end):
+        """
+        Get the vote counts of a topic per bucket. Only the buckets with votes are returned.
+        :param user: user which the topic belongs to
+        :param project_name: project name
+        :param topic: topic
+        :param resolution: resolution of the buckets, one of BUCKET_RESOLUTIONS
+        :param start: timestamp in seconds from which the buckets are returned
+        :param end: timestamp in seconds until which the buckets are returned
+        :return: list of dicts with the start of each bucket and its vote count, ordered by the start
+        """
+        buckets = query_all(
+            self.votes_buckets_table,
+            ProjectionExpression="BucketStart, VoteCount",
+            KeyConditionExpression=Key("BucketKey").eq(
+                get_bucket_key(user, project_name, topic, resolution)
+            )
+            & Key("BucketStart").between(
+                get_bucket_start(start, resolution), get_bucket_start(end, resolution)
+            ),
+        )
+
+        return [
+            dict(start=int(bucket["BucketStart"]), votes=int(bucket["VoteCount"]))
+            for bucket in buckets
+        ]
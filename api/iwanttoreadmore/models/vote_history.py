@@ -1,11 +1,93 @@
 import os
 from decimal import Decimal
-import boto3
 from boto3.dynamodb.conditions import Key
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.tracing import trace_methods
 from iwanttoreadmore.common import get_current_timestamp, hash_string
 from iwanttoreadmore.models.vote import get_topic_key
 
+# Global secondary indexes ordering the votes of a topic, or of all topics of a user, by their timestamp. The per topic
+# index is partitioned by the UserTopic attribute.
+USER_TOPIC_TIMESTAMP_INDEX = "UserTopicTimestampIndex"
+USER_TIMESTAMP_INDEX = "UserTimestampIndex"
 
+
+def get_user_topic_key(user, topic_key):
+    """
+    Get the key of the per topic timestamp index for a user and a topic key
+    :param user: username
+    :param topic_key: topic key
+    :return: user topic key
+    """
+    return f"{user}/{topic_key}"
+
+
+def get_vote_history_item(user, project, topic, ip_address):
+    """
+    Create a new vote history entry. The timestamp is stored as a number, so that the votes can be selected by time
+    ranges in the timestamp indexes.
+    :param user: username
+    :param project: project
+    :param topic: topic
+    :param ip_address: IP address of the user that voted
+    :return: dict representing the vote history entry in the table
+    """
+    topic_key = get_topic_key(project, topic)
+
+    return {
+        "User": user,
+        "TopicKey": topic_key,
+        "UserTopic": get_user_topic_key(user, topic_key),
+        "VoteTimestamp": Decimal(get_current_timestamp()),
+        "IPHash": hash_string(user + topic_key + ip_address),
+        "IPHashProject": hash_string(user + project + ip_address),
+    }
+
+
+def get_timestamp_condition(key_condition, start=None, end=None):
+    """
+    Limit the key condition of a query on a timestamp index to a time range
+    :param key_condition: key condition selecting the partition of the index
+    :param start: timestamp from which the votes are selected or None for no lower bound
+    :param end: timestamp until which the votes are selected or None for no upper bound
+    :return: key condition
+    """
+    timestamp = Key("VoteTimestamp")
+
+    if start is not None and end is not None:
+        return key_condition & timestamp.between(Decimal(str(start)), Decimal(str(end)))
+    if start is not None:
+        return key_condition & timestamp.gte(Decimal(str(start)))
+    if end is not None:
+        return key_condition & timestamp.lte(Decimal(str(end)))
+
+    return key_condition
+
+
+def encode_history_position(key):
+    """
+    Encode the last evaluated key of a query on a timestamp index as a position after which the next page starts
+    :param key: last evaluated key or None
+    :return: position string or None if there are no more pages
+    """
+    return f"{key['VoteTimestamp']}/{key['IPHash']}" if key else None
+
+
+def decode_history_position(position):
+    """
+    Decode a position created by encode_history_position. A ValueError is raised if the position is invalid.
+    :param position: position string
+    :return: tuple with the timestamp and the IP hash of the last vote of the previous page
+    """
+    timestamp, _, ip_hash = position.partition("/")
+
+    try:
+        return Decimal(timestamp), ip_hash
+    except ArithmeticError:
+        raise ValueError("Invalid position")
+
+
+@trace_methods
 class VoteHistory:
     """
     This class contains the logic for retrieving and modifying vote history data
@@ -15,9 +97,7 @@ class VoteHistory:
         """
         Initialize a new VoteHistory object, containing a reference to the vote history DynamoDB table
         """
-        self.votes_history_table = boto3.resource("dynamodb").Table(
-            os.environ["VOTES_HISTORY_TABLE"]
-        )
+        self.votes_history_table = get_table(os.environ["VOTES_HISTORY_TABLE"])
 
     def add_vote_history(self, user, project, topic, ip_address):
         """
@@ -31,13 +111,7 @@ class VoteHistory:
 
         if not self.check_ip_voted(user, topic_key, ip_address):
             self.votes_history_table.put_item(
-                Item={
-                    "User": user,
-                    "TopicKey": topic_key,
-                    "VoteTimestamp": get_current_timestamp(),
-                    "IPHash": hash_string(user + topic_key + ip_address),
-                    "IPHashProject": hash_string(user + project + ip_address),
-                }
+                Item=get_vote_history_item(user, project, topic, ip_address)
             )
 
     def get_vote_history(self, user, topic_key):
@@ -51,7 +125,7 @@ class VoteHistory:
             IndexName="UserTopicKey",
             ProjectionExpression="VoteTimestamp",
             KeyConditionExpression=Key("User").eq(user)
-            & Key("Topic_Key").eq(topic_key),
+            & Key("TopicKey").eq(topic_key),
         )
 
         timestamps = [Decimal(vote["VoteTimestamp"]) for vote in votes["Items"]]
@@ -91,3 +165,83 @@ class VoteHistory:
         )
 
         return len(vote["Items"]) > 0
+
+    def _query_timestamp_index_page(
+        self, index_name, partition_key, key_condition, limit, start_position
+    ):
+        """
+        Query one page of votes from a timestamp index in ascending order of their timestamps
+        :param index_name: name of the index
+        :param partition_key: dict with the partition key attribute of the index and its value
+        :param key_condition: key condition of the query
+        :param limit: maximal number of votes on the page
+        :param start_position: position after which the page starts or None for the first page
+        :return: list of the votes and the position after which the next page starts or None if there are no more pages
+        """
+        query_args = dict(
+            IndexName=index_name, KeyConditionExpression=key_condition, Limit=limit
+        )
+        if start_position is not None:
+            timestamp, ip_hash = decode_history_position(start_position)
+            query_args["ExclusiveStartKey"] = dict(
+                partition_key, VoteTimestamp=timestamp, IPHash=ip_hash
+            )
+
+        votes = self.votes_history_table.query(**query_args)
+
+        return votes["Items"], encode_history_position(votes.get("LastEvaluatedKey"))
+
+    def get_topic_votes_page(
+        self, user, topic_key, start=None, end=None, limit=100, start_position=None
+    ):
+        """
+        Get one page of the vote timestamps of a topic within a time range
+        :param user: username
+        :param topic_key: topic key
+        :param start: timestamp from which the votes are returned or None for no lower bound
+        :param end: timestamp until which the votes are returned or None for no upper bound
+        :param limit: maximal number of votes on the page
+        :param start_position: position after which the page starts or None for the first page
+        :return: sorted list of vote timestamps and the position after which the next page starts or None if there are no
+        more pages
+        """
+        user_topic_key = get_user_topic_key(user, topic_key)
+
+        votes, next_position = self._query_timestamp_index_page(
+            USER_TOPIC_TIMESTAMP_INDEX,
+            dict(UserTopic=user_topic_key),
+            get_timestamp_condition(Key("UserTopic").eq(user_topic_key), start, end),
+            limit,
+            start_position,
+        )
+
+        return [vote["VoteTimestamp"] for vote in votes], next_position
+
+    def get_user_votes_page(
+        self, user, start=None, end=None, limit=100, start_position=None
+    ):
+        """
+        Get one page of the votes for all topics of a user within a time range
+        :param user: username
+        :param start: timestamp from which the votes are returned or None for no lower bound
+        :param end: timestamp until which the votes are returned or None for no upper bound
+        :param limit: maximal number of votes on the page
+        :param start_position: position after which the page starts or None for the first page
+        :return: list of dicts with the topic key and the timestamp of each vote, sorted by the timestamp, and the position
+        after which the next page starts or None if there are no more pages
+        """
+        votes, next_position = self._query_timestamp_index_page(
+            USER_TIMESTAMP_INDEX,
+            dict(User=user),
+            get_timestamp_condition(Key("User").eq(user), start, end),
+            limit,
+            start_position,
+        )
+
+        return (
+            [
+                dict(topic_key=vote["TopicKey"], timestamp=vote["VoteTimestamp"])
+                for vote in votes
+            ],
+            next_position,
+        )
@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import time
+import functools
+import contextvars
+from contextlib import contextmanager
+
+# Span which is currently open. Spans are only recorded inside a trace, so the spans of the models cost a single lookup
+# when tracing is disabled.
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def get_trace_export():
+    """
+    Get the destination of the traces, configured with the TRACE_EXPORT environment variable. Traces are exported to
+    the standard output if it is "stdout", appended to a JSONL file if it is a path and not recorded if it is empty,
+    which is the default.
+    :return: destination of the traces
+    """
+    return os.environ.get("TRACE_EXPORT", "")
+
+
+def export_trace(spans, destination):
+    """
+    Write the spans of a trace as JSON lines
+    :param spans: list of spans, ordered by their start
+    :param destination: "stdout" or the path of a JSONL file
+    """
+    lines = "".join(json.dumps(span) + "\n" for span in spans)
+
+    if destination == "stdout":
+        sys.stdout.write(lines)
+        sys.stdout.flush()
+    else:
+        with open(destination, "a") as file:
+            file.write(lines)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Context manager recording a span, which is a child of the currently open span. Nothing is recorded outside of a
+    trace.
+    :param name: name of the span
+    :param attributes: additional attributes of the span
+    :return: dict with the span data or None if no trace is recorded
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    current = dict(
+        trace_id=parent["trace_id"],
+        span_id=os.urandom(8).hex(),
+        parent_id=parent["span_id"],
+        name=name,
+        start=time.time(),
+        duration_ms=None,
+        attributes=attributes,
+        error=None,
+    )
+    with record_span(current, parent["spans"]):
+        yield current
+
+
+@contextmanager
+def trace(name, **attributes):
+    """
+    Context manager recording a trace with a root span. The trace is exported when the root span ends. Inside another
+    trace, it records a normal span instead.
+    :param name: name of the root span
+    :param attributes: additional attributes of the root span
+    :return: dict with the span data or None if tracing is disabled
+    """
+    destination = get_trace_export()
+
+    if _current_span.get() is not None or not destination:
+        with span(name, **attributes) as current:
+            yield current
+        return
+
+    spans = []
+    root = dict(
+        trace_id=os.urandom(16).hex(),
+        span_id=os.urandom(8).hex(),
+        parent_id=None,
+        name=name,
+        start=time.time(),
+        duration_ms=None,
+        attributes=attributes,
+        error=None,
+    )
+    try:
+        with record_span(root, spans):
+            yield root
+    finally:
+        export_trace(spans, destination)
+
+
+@contextmanager
+def record_span(current, spans):
+    """
+    Add a span to the spans of its trace, make it the currently open one and measure its duration
+    :param current: dict with the span data
+    :param spans: list of the spans of the trace
+    """
+    spans.append(current)
+
+    # The spans of the trace are shared with the children, but not exported with the span itself
+    token = _current_span.set(dict(current, spans=spans))
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as error:
+        current["error"] = type(error).__name__
+        raise
+    finally:
+        current["duration_ms"] = (time.perf_counter() - start) * 1000
+        _current_span.reset(token)
+
+
+def traced(name):
+    """
+    Decorator recording a span around each call of a function
+    :param name: name of the span
+    :return: decorator
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def traced_function(*args, **kwargs):
+            if _current_span.get() is None:
+                return function(*args, **kwargs)
+
+            with span(name):
+                return function(*args, **kwargs)
+
+        return traced_function
+
+    return decorator
+
+
+def trace_methods(cls):
+    """
+    Class decorator recording a span named Class.method around each call of the public methods of a class. Generator
+    methods are left unchanged, since their work is done while the caller iterates over them.
+    :param cls: class
+    :return: the same class
+    """
+    # Imported here, since it is only needed when the models are loaded
+    import inspect
+
+    for name, method in list(vars(cls).items()):
+        if (
+            name.startswith("_")
+            or not inspect.isfunction(method)
+            or inspect.isgeneratorfunction(method)
+        ):
+            continue
+
+        setattr(cls, name, traced(f"{cls.__name__}.{name}")(method))
+
+    return cls
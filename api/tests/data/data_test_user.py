@@ -11,7 +11,21 @@ def create_users_table(table_name):
     return dynamodb.create_table(
         TableName=table_name,
         KeySchema=[{"AttributeName": "User", "KeyType": "HASH"},],
-        AttributeDefinitions=[{"AttributeName": "User", "AttributeType": "S"},],
+        AttributeDefinitions=[
+            {"AttributeName": "User", "AttributeType": "S"},
+            {"AttributeName": "EMail", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "EMailIndex",
+                "KeySchema": [{"AttributeName": "EMail", "KeyType": "HASH"}],
+                "Projection": {"ProjectionType": "ALL"},
+                "ProvisionedThroughput": {
+                    "ReadCapacityUnits": 1,
+                    "WriteCapacityUnits": 1,
+                },
+            },
+        ],
         ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
     )
 
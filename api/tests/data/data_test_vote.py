@@ -1,4 +1,8 @@
 import boto3
+from iwanttoreadmore.migrations.vote_indexes import (
+    VOTE_INDEXES,
+    get_vote_index_definition,
+)
 
 
 def create_votes_table(table_name):
@@ -17,8 +21,14 @@ def create_votes_table(table_name):
         AttributeDefinitions=[
             {"AttributeName": "User", "AttributeType": "S"},
             {"AttributeName": "TopicKey", "AttributeType": "S"},
+            {"AttributeName": "UserProject", "AttributeType": "S"},
+            {"AttributeName": "VoteCount", "AttributeType": "N"},
+            {"AttributeName": "LastVote", "AttributeType": "S"},
         ],
         ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
+        GlobalSecondaryIndexes=[
+            get_vote_index_definition(*index) for index in VOTE_INDEXES
+        ],
     )
 
 
@@ -31,6 +41,7 @@ def create_test_votes_data(votes_table):
         Item={
             "User": "user_1",
             "TopicKey": "project_a/topic_aaa",
+            "UserProject": "user_1/project_a",
             "ProjectName": "project_a",
             "Topic": "topic_aaa",
             "LastVote": "1111",
@@ -41,6 +52,7 @@ def create_test_votes_data(votes_table):
         Item={
             "User": "user_1",
             "TopicKey": "project_a/topic_bbb",
+            "UserProject": "user_1/project_a",
             "ProjectName": "project_a",
             "Topic": "topic_bbb",
             "LastVote": "2222",
@@ -51,6 +63,7 @@ def create_test_votes_data(votes_table):
         Item={
             "User": "user_1",
             "TopicKey": "project_b/topic_ccc",
+            "UserProject": "user_1/project_b",
             "ProjectName": "project_b",
             "Topic": "topic_ccc",
             "LastVote": "3333",
@@ -62,6 +75,7 @@ def create_test_votes_data(votes_table):
         Item={
             "User": "user_2",
             "TopicKey": "project_c/topic_ddd",
+            "UserProject": "user_2/project_c",
             "ProjectName": "project_c",
             "Topic": "topic_ddd",
             "LastVote": "4444",
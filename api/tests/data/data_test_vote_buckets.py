@@ -0,0 +1,22 @@
+import boto3
+
+
+def create_vote_buckets_table(table_name):
+    """
+    Create test vote buckets table
+    :param table_name: name of the table
+    :return: the table object
+    """
+    dynamodb = boto3.resource("dynamodb")
+    return dynamodb.create_table(
+        TableName=table_name,
+        KeySchema=[
+            {"AttributeName": "BucketKey", "KeyType": "HASH"},
+            {"AttributeName": "BucketStart", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "BucketKey", "AttributeType": "S"},
+            {"AttributeName": "BucketStart", "AttributeType": "N"},
+        ],
+        ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
+    )
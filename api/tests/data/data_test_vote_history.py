@@ -1,6 +1,10 @@
 import boto3
 from decimal import Decimal
 from iwanttoreadmore.common import hash_string
+from iwanttoreadmore.migrations.vote_history_timestamps import (
+    VOTE_HISTORY_INDEXES,
+    get_vote_history_index_definition,
+)
 
 
 def create_vote_history_table(table_name):
@@ -13,7 +17,14 @@ def create_vote_history_table(table_name):
     return dynamodb.create_table(
         TableName=table_name,
         KeySchema=[{"AttributeName": "IPHash", "KeyType": "HASH"},],
-        AttributeDefinitions=[{"AttributeName": "User", "AttributeType": "S"},],
+        AttributeDefinitions=[
+            {"AttributeName": "IPHash", "AttributeType": "S"},
+            {"AttributeName": "User", "AttributeType": "S"},
+            {"AttributeName": "TopicKey", "AttributeType": "S"},
+            {"AttributeName": "IPHashProject", "AttributeType": "S"},
+            {"AttributeName": "UserTopic", "AttributeType": "S"},
+            {"AttributeName": "VoteTimestamp", "AttributeType": "N"},
+        ],
         GlobalSecondaryIndexes=[
             {
                 "IndexName": "UserTopicKey",
@@ -39,7 +50,8 @@ def create_vote_history_table(table_name):
                     "WriteCapacityUnits": 1,
                 },
             },
-        ],
+        ]
+        + [get_vote_history_index_definition(*index) for index in VOTE_HISTORY_INDEXES],
         ProvisionedThroughput={"ReadCapacityUnits": 2, "WriteCapacityUnits": 2},
     )
 
@@ -53,6 +65,7 @@ def create_test_vote_history_data(votes_table):
         Item={
             "User": "user_1",
             "TopicKey": "project_a/topic_aaa",
+            "UserTopic": "user_1/project_a/topic_aaa",
             "ProjectName": "project_a",
             "Topic": "topic_aaa",
             "VoteTimestamp": Decimal(1111),
@@ -64,6 +77,7 @@ def create_test_vote_history_data(votes_table):
         Item={
             "User": "user_1",
             "TopicKey": "project_a/topic_aaa",
+            "UserTopic": "user_1/project_a/topic_aaa",
             "ProjectName": "project_a",
             "Topic": "topic_aaa",
             "VoteTimestamp": Decimal(2222),
@@ -75,6 +89,7 @@ def create_test_vote_history_data(votes_table):
         Item={
             "User": "user_1",
             "TopicKey": "project_a/topic_bbb",
+            "UserTopic": "user_1/project_a/topic_bbb",
             "ProjectName": "project_a",
             "Topic": "topic_bbb",
             "VoteTimestamp": Decimal(3333),
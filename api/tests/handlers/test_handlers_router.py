@@ -0,0 +1,134 @@
+import re
+import unittest
+from unittest import mock
+from iwanttoreadmore.handlers.handlers_router import (
+    ROUTES,
+    compile_resource_path,
+    match_route,
+    get_route_handler,
+    route_request,
+)
+
+
+def get_serverless_routes(serverless_file="serverless.yml"):
+    with open(serverless_file) as file:
+        routes = re.findall(
+            r"handler: iwanttoreadmore/handlers/(\S+)\n.*?path: (\S+)\n\s+method: (\w+)",
+            file.read(),
+            re.DOTALL,
+        )
+
+    return sorted(
+        (method.upper(), "/" + path, handler) for handler, path, method in routes
+    )
+
+
+class RouterHandlersTestCase(unittest.TestCase):
+    def test_routes(self):
+        # The router serves the same routes as the single functions
+        self.assertEqual(get_serverless_routes(), sorted(ROUTES))
+
+        for _, _, handler in ROUTES:
+            self.assertTrue(callable(get_route_handler(handler)))
+
+    def test_compile_resource_path(self):
+        path = compile_resource_path("/votes/{user}/{project}")
+        self.assertEqual(
+            dict(user="user_1", project="project_a"),
+            path.fullmatch("/votes/user_1/project_a").groupdict(),
+        )
+        self.assertTrue(path.fullmatch("/votes/user_1/project_a/"))
+        self.assertFalse(path.fullmatch("/votes/user_1"))
+        self.assertFalse(path.fullmatch("/votes/user_1/project_a/topic_a"))
+        self.assertFalse(path.fullmatch("/vote/user_1/project_a"))
+
+    def test_match_route(self):
+        self.assertEqual(
+            ("/votes/{user}", dict(user="user_1")), match_route("/votes/user_1")
+        )
+        self.assertEqual(
+            (
+                "/votes/hidden/{user}/{project}/{topic}",
+                dict(user="user_1", project="project_a", topic="topic a"),
+            ),
+            match_route("/votes/hidden/user_1/project_a/topic%20a"),
+        )
+        self.assertEqual(
+            ("/vote/{user}/batch", dict(user="user_1")), match_route("/vote/user_1/batch")
+        )
+        self.assertEqual(("/user/login", dict()), match_route("/user/login"))
+
+        # Fixed segments take precedence over path parameters at the same position
+        self.assertEqual(
+            (
+                "/votes/hidden/{user}/{project}/{topic}",
+                dict(user="user_1", project="project_a", topic="history"),
+            ),
+            match_route("/votes/hidden/user_1/project_a/history"),
+        )
+        self.assertEqual(
+            "/votes/delete/{user}/{project}/{topic}",
+            match_route("/votes/delete/user_1/project_a/history")[0],
+        )
+        self.assertEqual(
+            "/votes/{user}/{project}/{topic}/history",
+            match_route("/votes/user_1/project_a/topic_a/history")[0],
+        )
+        self.assertEqual((None, None), match_route("/user"))
+        self.assertEqual((None, None), match_route("/votes/user_1/project_a/topic_a"))
+
+    @mock.patch("iwanttoreadmore.handlers.handlers_vote.add_vote_and_redirect")
+    @mock.patch("iwanttoreadmore.handlers.handlers_vote.add_vote")
+    @mock.patch.dict("iwanttoreadmore.handlers.handlers_router._loaded_handlers", clear=True)
+    def test_route_request(self, add_vote, add_vote_and_redirect):
+        add_vote.return_value = dict(statusCode=200)
+        add_vote_and_redirect.return_value = dict(statusCode=302)
+
+        # Deployment behind the resources of the single functions
+        event = dict(
+            httpMethod="POST",
+            resource="/vote/{user}/{project}/{topic}",
+            path="/vote/user_1/project_a/topic_a",
+            pathParameters=dict(user="user_1", project="project_a", topic="topic_a"),
+        )
+        self.assertEqual(dict(statusCode=200), route_request(event, None))
+        add_vote.assert_called_once_with(event, None)
+
+        # Deployment behind a greedy proxy resource
+        event = dict(
+            httpMethod="GET",
+            resource="/{proxy+}",
+            path="/vote/user_1/project_a/topic_a",
+            pathParameters=dict(proxy="vote/user_1/project_a/topic_a"),
+        )
+        self.assertEqual(dict(statusCode=302), route_request(event, None))
+        add_vote_and_redirect.assert_called_once_with(
+            dict(
+                event,
+                resource="/vote/{user}/{project}/{topic}",
+                pathParameters=dict(user="user_1", project="project_a", topic="topic_a"),
+            ),
+            None,
+        )
+
+        # Unknown resource
+        event = dict(httpMethod="GET", resource="/{proxy+}", path="/unknown")
+        self.assertEqual(404, route_request(event, None)["statusCode"])
+
+        # Unsupported method
+        event = dict(httpMethod="DELETE", resource="/{proxy+}", path="/user/login")
+        response = route_request(event, None)
+        self.assertEqual(405, response["statusCode"])
+        self.assertEqual("POST", response["headers"]["Allow"])
+
+    def test_route_request_handler(self):
+        # The routed handlers behave exactly like the single functions
+        response = route_request(
+            dict(httpMethod="GET", resource="/{proxy+}", path="/user/logout"), None
+        )
+        self.assertEqual(302, response["statusCode"])
+        self.assertEqual("/", response["headers"]["Location"])
+
+
+if __name__ == "__main__":
+    unittest.main()
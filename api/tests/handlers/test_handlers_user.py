@@ -1,6 +1,8 @@
 import unittest
 import os
+import sys
 import json
+import subprocess
 from unittest import mock
 import boto3
 from moto import mock_dynamodb2
@@ -18,6 +20,7 @@ from iwanttoreadmore.handlers.handlers_user import (
     remove_single_voting_project,
 )
 from iwanttoreadmore.handlers.handler_helpers import create_response
+from iwanttoreadmore.common import sign_cookie, check_cookie_signature
 from tests.data.data_test_user import (
     create_users_table,
     create_test_users_data,
@@ -55,7 +58,7 @@ class UserHandlersTestCase(unittest.TestCase):
         "iwanttoreadmore.handlers.handlers_user.get_cookie_date",
         return_value="Fri, 31 Jan 2020 01:23:34 GMT",
     )
-    @mock.patch("bcrypt.gensalt", return_value=b"$2b$12$oGAaQWkNrjCWI0ugg8Go8u")
+    @mock.patch("time.time", return_value=1000)
     def test_login_user(self, _, __):
         # Test successful login
         event_1 = dict(body="identifier=user_1@gmail.com;password=test")
@@ -65,7 +68,7 @@ class UserHandlersTestCase(unittest.TestCase):
             body="user_1",
             additional_headers={
                 "Access-Control-Allow-Credentials": "true",
-                "Set-Cookie": "user=user_1&signature=$2b$12$oGAaQWkNrjCWI0ugg8Go8uZ1ld2828dTeTk2cE/WZAO2yOB4aUxQm;SameSite=Strict;Path=/;Expires=Fri, 31 Jan 2020 01:23:34 GMT;HttpOnly",
+                "Set-Cookie": "user=user_1&expires=2593000&version=2&signature=b8cd9e7328d3594facf6fc2dc139072817ff22ec52f4a257a4c044c6959c336a;SameSite=Strict;Path=/;Expires=Fri, 31 Jan 2020 01:23:34 GMT;HttpOnly",
             },
         )
         self.assertEqual(response_1, login_user(event_1, None))
@@ -86,7 +89,14 @@ class UserHandlersTestCase(unittest.TestCase):
                 Cookie="user=user_1&signature=$2b$12$oGAaQWkNrjCWI0ugg8Go8uZ1ld2828dTeTk2cE/WZAO2yOB4aUxQm"
             )
         )
-        self.assertEqual(200, check_user_logged_in(event_1, None)["statusCode"])
+        response_1 = check_user_logged_in(event_1, None)
+        self.assertEqual(200, response_1["statusCode"])
+        self.assertIn("Set-Cookie", response_1["headers"])
+
+        event_new = dict(headers=dict(Cookie=sign_cookie("user=user_1")))
+        response_new = check_user_logged_in(event_new, None)
+        self.assertEqual(200, response_new["statusCode"])
+        self.assertNotIn("Set-Cookie", response_new["headers"])
 
         event_2 = dict(
             headers=dict(
@@ -154,13 +164,23 @@ class UserHandlersTestCase(unittest.TestCase):
 
     def test_get_user_data(self):
         # Positive case
-        event_1 = dict(
+        event_1 = dict(headers=dict(Cookie=sign_cookie("user=user_1")))
+        response_1 = create_response(200, body=json.dumps(self.get_user_data("user_1")))
+        self.assertEqual(response_1, get_user_data(event_1, None))
+
+        # Legacy cookie, which is re-issued in the new format
+        event_legacy = dict(
             headers=dict(
                 Cookie="user=user_1&signature=$2b$12$oGAaQWkNrjCWI0ugg8Go8uZ1ld2828dTeTk2cE/WZAO2yOB4aUxQm"
             ),
         )
-        response_1 = create_response(200, body=json.dumps(self.get_user_data("user_1")))
-        self.assertEqual(response_1, get_user_data(event_1, None))
+        response_legacy = get_user_data(event_legacy, None)
+        self.assertEqual(response_1["body"], response_legacy["body"])
+        self.assertEqual(
+            "user_1",
+            check_cookie_signature(response_legacy["headers"]["Set-Cookie"]),
+        )
+        self.assertIn("version=2", response_legacy["headers"]["Set-Cookie"])
 
         # Wrong cookie
         event_2 = dict(
@@ -330,6 +350,34 @@ class UserHandlersTestCase(unittest.TestCase):
             user.get_user_by_username("user_1")["single_voting_projects"],
         )
 
+    def test_user_read_once_per_request(self):
+        cookie = "user=user_1&signature=$2b$12$oGAaQWkNrjCWI0ugg8Go8uZ1ld2828dTeTk2cE/WZAO2yOB4aUxQm"
+        client = User().users_table.meta.client
+
+        # The handler and the model both need the user, but it is read only once
+        with mock.patch.object(client, "query", wraps=client.query) as query:
+            event = dict(headers=dict(Cookie=cookie), body="project_c")
+            self.assertEqual(200, add_single_voting_project(event, None)["statusCode"])
+            self.assertEqual(1, query.call_count)
+
+        with mock.patch.object(client, "query", wraps=client.query) as query:
+            event = dict(headers=dict(Cookie=cookie), body="project_c")
+            self.assertEqual(200, remove_single_voting_project(event, None)["statusCode"])
+            self.assertEqual(1, query.call_count)
+
+        with mock.patch.object(client, "query", wraps=client.query) as query:
+            event = dict(headers=dict(Cookie=cookie), body="0")
+            self.assertEqual(200, change_account_public(event, None)["statusCode"])
+            self.assertEqual(0, query.call_count)
+
+        # The loaded users are not kept between requests
+        with mock.patch.object(client, "query", wraps=client.query) as query:
+            event = dict(headers=dict(Cookie=cookie))
+            self.assertEqual(200, get_user_data(event, None)["statusCode"])
+            self.assertEqual(1, query.call_count)
+            self.assertFalse(json.loads(get_user_data(event, None)["body"])["is_public"])
+            self.assertEqual(2, query.call_count)
+
     def test_remove_single_voting_project(self):
         cookie = "user=user_1&signature=$2b$12$oGAaQWkNrjCWI0ugg8Go8uZ1ld2828dTeTk2cE/WZAO2yOB4aUxQm"
 
@@ -390,6 +438,21 @@ class UserHandlersTestCase(unittest.TestCase):
             [], user.get_user_by_username("user_1")["single_voting_projects"],
         )
 
+    def test_lazy_imports(self):
+        # boto3 and bcrypt are loaded on first use, not when the handlers module is imported on a cold start
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, iwanttoreadmore.handlers.handlers_user; "
+                "print(sorted({'boto3', 'botocore', 'bcrypt'} & set(sys.modules)))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual("[]", result.stdout.strip())
+
 
 if __name__ == "__main__":
     unittest.main()
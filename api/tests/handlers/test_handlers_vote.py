@@ -1,50 +1,85 @@
 import unittest
 import os
+import io
+import re
 import json
 from unittest import mock
 from unittest.mock import MagicMock
+from contextlib import redirect_stdout
 from moto import mock_dynamodb2
+from moto import mock_ssm
 from iwanttoreadmore.handlers.handlers_vote import (
     add_vote,
     add_vote_and_redirect,
+    add_votes_batch,
     get_votes_for_user,
     get_votes_for_project,
     set_vote_hidden,
     delete_vote,
+    get_vote_history,
+    INDEX_ETAG_PERIOD,
 )
 from tests.data.data_test_vote import (
     create_votes_table,
     create_test_votes_data,
     get_expected_votes_data,
 )
+from tests.data.data_test_vote_history import create_vote_history_table
 from iwanttoreadmore.models.user import User
 from iwanttoreadmore.models.vote import Vote
-from iwanttoreadmore.models.vote_history import VoteHistory
+from tests.data.data_test_vote_buckets import create_vote_buckets_table
+from tests.data.data_test_user import create_users_table, create_test_users_data
 from tests.helpers import remove_table, create_cookie_parameter, delete_cookie_parameter
 from iwanttoreadmore.handlers.handler_helpers import create_response
+from iwanttoreadmore.common import sign_cookie
 
 
-def add_ip_address(event):
+def add_ip_address(event, ip_address="192.168.0.1"):
     if "headers" not in event:
         event["headers"] = dict()
-    event["headers"]["Client-Ip"] = "192.168.0.1"
+    event["headers"]["Client-Ip"] = ip_address
     return event
 
 
+def without_cache_headers(response):
+    etag = response["headers"].pop("ETag")
+    assert re.fullmatch(r'(W/)?"[0-9a-f]{32}"', etag)
+
+    for header in ["Cache-Control", "Vary"]:
+        response["headers"].pop(header)
+
+    return response
+
+
 @mock_dynamodb2
+@mock_ssm
 class VoteHandlersTestCase(unittest.TestCase):
     def setUp(self):
         """
         Create a votes table and populate it with example data
         """
         os.environ["VOTES_TABLE"] = "iwanttoreadmore-votes-test"
+        os.environ["VOTES_HISTORY_TABLE"] = "iwanttoreadmore-votes-history-test"
+        os.environ["VOTES_BUCKETS_TABLE"] = "iwanttoreadmore-votes-buckets-test"
+        os.environ["USERS_TABLE"] = "iwanttoreadmore-users-test"
 
         self.votes_table = create_votes_table(os.environ["VOTES_TABLE"])
         create_test_votes_data(self.votes_table)
+        self.vote_history_table = create_vote_history_table(
+            os.environ["VOTES_HISTORY_TABLE"]
+        )
+        self.vote_buckets_table = create_vote_buckets_table(
+            os.environ["VOTES_BUCKETS_TABLE"]
+        )
+        self.users_table = create_users_table(os.environ["USERS_TABLE"])
+        create_test_users_data(self.users_table)
         create_cookie_parameter()
 
     def tearDown(self):
         remove_table(os.environ["VOTES_TABLE"])
+        remove_table(os.environ["VOTES_HISTORY_TABLE"])
+        remove_table(os.environ["VOTES_BUCKETS_TABLE"])
+        remove_table(os.environ["USERS_TABLE"])
         delete_cookie_parameter()
 
     @mock.patch.object(User, "__init__", lambda _: None)
@@ -64,13 +99,24 @@ class VoteHandlersTestCase(unittest.TestCase):
             is_public=True, single_voting_projects=["project_a"]
         )
         self.assertEqual(
-            response("user_1", ["project_a"]), get_votes_for_user(event("user_1"), None)
+            response("user_1", ["project_a"]),
+            without_cache_headers(get_votes_for_user(event("user_1"), None)),
         )
 
         # Good case #2 (without svp)
         get_user_mock.return_value = dict(is_public=True, single_voting_projects=[])
         self.assertEqual(
-            response("user_2", []), get_votes_for_user(event("user_2"), None)
+            response("user_2", []),
+            without_cache_headers(get_votes_for_user(event("user_2"), None)),
+        )
+
+        # Invalid cookies don't prevent reading public votes
+        garbage_cookie_event = dict(
+            event("user_2"), headers=dict(Cookie="user=x&signature=garbage")
+        )
+        self.assertEqual(
+            response("user_2", []),
+            without_cache_headers(get_votes_for_user(garbage_cookie_event, None)),
         )
 
         # Invalid user
@@ -99,7 +145,9 @@ class VoteHandlersTestCase(unittest.TestCase):
 
         # Logged in user
         get_user_mock.return_value = dict(is_public=False, single_voting_projects=[])
-        self.assertEqual(response("user_1"), get_votes_for_user(event("user_1"), None))
+        self.assertEqual(
+            response("user_1"), without_cache_headers(get_votes_for_user(event("user_1"), None))
+        )
 
         # Not logged in user
         get_user_mock.return_value = dict(is_public=False, single_voting_projects=[])
@@ -131,20 +179,20 @@ class VoteHandlersTestCase(unittest.TestCase):
         )
         self.assertEqual(
             response("user_1", "project_a", ["project_a"]),
-            get_votes_for_project(event("user_1", "project_a"), None),
+            without_cache_headers(get_votes_for_project(event("user_1", "project_a"), None)),
         )
 
         # Good case #2 (without svp)
         get_user_mock.return_value = dict(is_public=True, single_voting_projects=[])
         self.assertEqual(
             response("user_1", "project_b", []),
-            get_votes_for_project(event("user_1", "project_b"), None),
+            without_cache_headers(get_votes_for_project(event("user_1", "project_b"), None)),
         )
 
         # Invalid project
         self.assertEqual(
             response("user_1", "project_X", []),
-            get_votes_for_project(event("user_1", "project_X"), None),
+            without_cache_headers(get_votes_for_project(event("user_1", "project_X"), None)),
         )
 
         # Invalid user
@@ -154,6 +202,378 @@ class VoteHandlersTestCase(unittest.TestCase):
             get_votes_for_project(event("user_X", "project_X"), None),
         )
 
+    @mock.patch("time.time", return_value=1000)
+    def test_get_votes_etag(self, time_mock):
+        cookie = "user=user_1&signature=$2b$12$oGAaQWkNrjCWI0ugg8Go8uZ1ld2828dTeTk2cE/WZAO2yOB4aUxQm"
+        event = lambda etag=None, project=None, **params: dict(
+            pathParameters=dict(user="user_1", project=project, topic="topic_aaa"),
+            queryStringParameters=params,
+            headers={"if-none-match": etag, "Cookie": cookie} if etag else dict(),
+        )
+
+        response = get_votes_for_user(event(), None)
+        etag = response["headers"]["ETag"]
+        self.assertEqual(200, response["statusCode"])
+
+        # The votes are not read if the client's copy is up to date
+        with mock.patch.object(Vote, "get_votes_for_user") as get_votes_mock:
+            response = get_votes_for_user(event(etag), None)
+            self.assertEqual(304, response["statusCode"])
+            self.assertEqual("", response["body"])
+            self.assertEqual(etag, response["headers"]["ETag"])
+            self.assertEqual(
+                304, get_votes_for_user(event(f'"other", {etag}'), None)["statusCode"]
+            )
+            self.assertEqual(304, get_votes_for_user(event("*"), None)["statusCode"])
+            get_votes_mock.assert_not_called()
+
+        # The ordered votes are read from eventually consistent indexes, so their weak ETags change every
+        # INDEX_ETAG_PERIOD seconds, while the paginated votes are read consistently and have strong ETags
+        self.assertTrue(etag.startswith('W/"'))
+        page_etag = get_votes_for_user(event(limit="2"), None)["headers"]["ETag"]
+        self.assertTrue(page_etag.startswith('"'))
+
+        time_mock.return_value = 1000 + INDEX_ETAG_PERIOD
+        self.assertEqual(200, get_votes_for_user(event(etag), None)["statusCode"])
+        self.assertEqual(
+            304, get_votes_for_user(event(page_etag, limit="2"), None)["statusCode"]
+        )
+        etag = get_votes_for_user(event(), None)["headers"]["ETag"]
+
+        # Other representations have other ETags
+        self.assertEqual(200, get_votes_for_user(event(etag, top="1"), None)["statusCode"])
+        self.assertEqual(
+            200, get_votes_for_project(event(etag, "project_a"), None)["statusCode"]
+        )
+
+        # Votes, hiding and deleting change the ETag
+        add_vote(add_ip_address(event(project="project_a")), None)
+        response = get_votes_for_user(event(etag), None)
+        self.assertEqual(200, response["statusCode"])
+        self.assertNotEqual(etag, response["headers"]["ETag"])
+
+        etag = response["headers"]["ETag"]
+        set_vote_hidden(dict(event(etag, "project_a"), body="1"), None)
+        response = get_votes_for_user(event(etag), None)
+        self.assertEqual(200, response["statusCode"])
+
+        etag = response["headers"]["ETag"]
+        delete_vote(event(etag, "project_a"), None)
+        response = get_votes_for_user(event(etag), None)
+        self.assertEqual(200, response["statusCode"])
+        self.assertEqual(
+            304,
+            get_votes_for_user(event(response["headers"]["ETag"]), None)["statusCode"],
+        )
+
+    @mock.patch.dict(
+        "os.environ",
+        {"PUBLIC_CACHE_MAX_AGE": "30", "PUBLIC_CACHE_STALE_WHILE_REVALIDATE": "120"},
+    )
+    def test_get_votes_cache_control(self):
+        owner_cookie = "user=user_1&signature=$2b$12$oGAaQWkNrjCWI0ugg8Go8uZ1ld2828dTeTk2cE/WZAO2yOB4aUxQm"
+        event = lambda user="user_1", cookie=None, project=None, **params: dict(
+            pathParameters=dict(user=user, project=project, topic="topic_aaa"),
+            queryStringParameters=params,
+            headers=dict(Cookie=cookie) if cookie else None,
+        )
+        get_headers = lambda response: response["headers"]
+
+        # Anonymous requests for public accounts can be cached
+        headers = get_headers(get_votes_for_user(event(), None))
+        self.assertEqual(
+            "public, max-age=30, stale-while-revalidate=120", headers["Cache-Control"]
+        )
+        self.assertEqual("Cookie", headers["Vary"])
+        self.assertEqual(
+            "public, max-age=30, stale-while-revalidate=120",
+            get_headers(get_votes_for_project(event(project="project_a"), None))[
+                "Cache-Control"
+            ],
+        )
+
+        # The owner's and private responses must not be stored
+        self.assertEqual(
+            "private, no-store",
+            get_headers(get_votes_for_user(event(cookie=owner_cookie), None))[
+                "Cache-Control"
+            ],
+        )
+        self.assertEqual(
+            "private, no-store",
+            get_headers(
+                get_votes_for_user(
+                    event("user_2", cookie=sign_cookie("user=user_2")),
+                    None,
+                )
+            )["Cache-Control"],
+        )
+
+    @mock.patch.object(User, "__init__", lambda _: None)
+    @mock.patch.object(
+        User,
+        "get_user_by_username",
+        lambda _, __: dict(is_public=True, single_voting_projects=[]),
+    )
+    def test_get_votes_for_user_paginated(self):
+        event = lambda user, **params: dict(
+            pathParameters=dict(user=user), queryStringParameters=params
+        )
+
+        # Read all votes page by page
+        votes = []
+        cursor = None
+        while True:
+            params = dict(limit="1", cursor=cursor) if cursor else dict(limit="1")
+            response = get_votes_for_user(event("user_1", **params), None)
+            self.assertEqual(200, response["statusCode"])
+
+            result = json.loads(response["body"])
+            self.assertLessEqual(len(result["votes"]), 1)
+            votes += result["votes"]
+            cursor = result["next_cursor"]
+            if not cursor:
+                break
+
+        self.assertEqual(
+            sorted(get_expected_votes_data("user_1"), key=lambda x: x["topic"]), votes,
+        )
+
+        # Page boundaries don't change when new votes arrive
+        first_page = json.loads(
+            get_votes_for_user(event("user_1", limit="2"), None)["body"]
+        )
+        Vote().add_vote("user_1", "project_a", "topic_bbb")
+        Vote().add_vote("user_1", "project_a", "topic_aab")
+        second_page = json.loads(
+            get_votes_for_user(
+                event("user_1", limit="2", cursor=first_page["next_cursor"]), None
+            )["body"]
+        )
+        self.assertEqual(["topic_ccc"], [x["topic"] for x in second_page["votes"]])
+
+        # Invalid parameters
+        for limit in ["0", "101", "abc", "-1"]:
+            self.assertEqual(
+                create_response(400, "GET", "Invalid limit"),
+                get_votes_for_user(event("user_1", limit=limit), None),
+            )
+
+        cursor = first_page["next_cursor"]
+        for invalid_cursor in [cursor[:-1], "abc", "." + cursor.split(".")[1]]:
+            self.assertEqual(
+                create_response(400, "GET", "Invalid cursor"),
+                get_votes_for_user(event("user_1", cursor=invalid_cursor), None),
+            )
+
+        # Cursors cannot be used for other users or projects
+        self.assertEqual(
+            create_response(400, "GET", "Invalid cursor"),
+            get_votes_for_user(event("user_2", cursor=cursor), None),
+        )
+        self.assertEqual(
+            create_response(400, "GET", "Invalid cursor"),
+            get_votes_for_project(
+                dict(
+                    pathParameters=dict(user="user_1", project="project_a"),
+                    queryStringParameters=dict(cursor=cursor),
+                ),
+                None,
+            ),
+        )
+
+    @mock.patch.object(User, "__init__", lambda _: None)
+    @mock.patch.object(
+        User,
+        "get_user_by_username",
+        lambda _, __: dict(is_public=True, single_voting_projects=[]),
+    )
+    def test_get_votes_for_project_paginated(self):
+        event = lambda **params: dict(
+            pathParameters=dict(user="user_1", project="project_a"),
+            queryStringParameters=params,
+        )
+
+        first_page = json.loads(get_votes_for_project(event(limit="1"), None)["body"])
+        self.assertEqual(["topic_aaa"], [x["topic"] for x in first_page["votes"]])
+
+        second_page = json.loads(
+            get_votes_for_project(
+                event(limit="5", cursor=first_page["next_cursor"]), None
+            )["body"]
+        )
+        self.assertEqual(["topic_bbb"], [x["topic"] for x in second_page["votes"]])
+        self.assertEqual(None, second_page["next_cursor"])
+
+    @mock.patch.object(User, "__init__", lambda _: None)
+    @mock.patch.object(
+        User,
+        "get_user_by_username",
+        lambda _, __: dict(is_public=True, single_voting_projects=[]),
+    )
+    def test_get_votes_ordered(self):
+        event = lambda project=None, **params: dict(
+            pathParameters=dict(user="user_1", project=project),
+            queryStringParameters=params,
+        )
+        get_topics = lambda response: [
+            x["topic"] for x in json.loads(response["body"])["votes"]
+        ]
+
+        with mock.patch("time.time", return_value=9999):
+            Vote().add_vote("user_1", "project_a", "topic_aaa")
+
+        self.assertEqual(
+            ["topic_ccc", "topic_bbb"],
+            get_topics(get_votes_for_user(event(top="2"), None)),
+        )
+        self.assertEqual(
+            ["topic_aaa", "topic_ccc", "topic_bbb"],
+            get_topics(get_votes_for_user(event(order="recent"), None)),
+        )
+        self.assertEqual(
+            ["topic_aaa"],
+            get_topics(
+                get_votes_for_project(event("project_a", order="recent", top="1"), None)
+            ),
+        )
+        self.assertEqual(
+            ["topic_bbb", "topic_aaa"],
+            get_topics(get_votes_for_project(event("project_a", order="votes"), None)),
+        )
+
+        # Invalid parameters
+        self.assertEqual(
+            create_response(400, "GET", "Invalid order"),
+            get_votes_for_user(event(order="topic"), None),
+        )
+        for top in ["0", "101", "abc"]:
+            self.assertEqual(
+                create_response(400, "GET", "Invalid top"),
+                get_votes_for_project(event("project_a", top=top), None),
+            )
+
+    def test_get_vote_history(self):
+        event = lambda user="user_1", cookie=None, **params: dict(
+            pathParameters=dict(user=user, project="project_a", topic="topic_aaa"),
+            queryStringParameters=params,
+            headers=dict(Cookie=cookie) if cookie else dict(),
+        )
+        get_buckets = lambda response: json.loads(response["body"])["buckets"]
+
+        # Votes at 10:00 on day 0, at 11:30 on day 0 and at 10:00 on day 1
+        for i, timestamp in enumerate([36000, 41400, 122400]):
+            with mock.patch("time.time", return_value=timestamp):
+                add_vote(add_ip_address(event(), f"10.0.1.{i}"), None)
+
+        # By default the buckets of the last 30 days are returned
+        with mock.patch("time.time", return_value=122400):
+            response = get_vote_history(event(), None)
+
+        self.assertEqual(200, response["statusCode"])
+        self.assertEqual(
+            dict(
+                resolution="day",
+                since=122400 - 30 * 86400,
+                until=122400,
+                buckets=[dict(start=0, votes=2), dict(start=86400, votes=1)],
+            ),
+            json.loads(response["body"]),
+        )
+        self.assertEqual("Cookie", response["headers"]["Vary"])
+
+        self.assertEqual(
+            [dict(start=36000, votes=1), dict(start=39600, votes=1)],
+            get_buckets(
+                get_vote_history(event(resolution="hour", since="0", until="86399"), None)
+            ),
+        )
+        self.assertEqual(
+            [dict(start=-259200, votes=3)],
+            get_buckets(
+                get_vote_history(event(resolution="week", since="0", until="122400"), None)
+            ),
+        )
+
+        # Invalid parameters
+        for params, message in [
+            (dict(resolution="minute"), "Invalid resolution"),
+            (dict(since="-1"), "Invalid time range"),
+            (dict(since="200", until="100"), "Invalid time range"),
+            (dict(resolution="hour", since="0", until="3600001"), "Invalid time range"),
+        ]:
+            self.assertEqual(
+                create_response(400, "GET", message),
+                get_vote_history(event(**params), None),
+            )
+
+        # The history of private accounts is only returned to the owner
+        self.assertEqual(
+            create_response(400, "GET", "Invalid user"),
+            get_vote_history(event("user_2"), None),
+        )
+        self.assertEqual(
+            200,
+            get_vote_history(
+                event("user_2", cookie=sign_cookie("user=user_2")), None
+            )["statusCode"],
+        )
+        self.assertEqual(
+            create_response(400, "GET", "Invalid user"),
+            get_vote_history(event("user_x"), None),
+        )
+
+    def test_add_vote_trace(self):
+        event = add_ip_address(
+            dict(
+                pathParameters=dict(
+                    user="user_1", project="project_a", topic="topic_aaa"
+                )
+            ),
+            "192.168.0.100",
+        )
+
+        output = io.StringIO()
+        with mock.patch.dict(
+            "os.environ", {"TRACE_EXPORT": "stdout", "INVOCATION_METRICS": "0"}
+        ):
+            with redirect_stdout(output):
+                self.assertEqual(200, add_vote(event, None)["statusCode"])
+
+        spans = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(
+            [
+                "add_vote",
+                "do_vote",
+                "validate vote",
+                "User.get_user_by_username",
+                "check single voting",
+                "VoteHistory.check_ip_voted_project",
+                "VoteAdmission.admit_vote",
+                "increment votes version",
+            ],
+            [span["name"] for span in spans],
+        )
+
+        # Each step can be attributed to its parent stage
+        names = {span["span_id"]: span["name"] for span in spans}
+        self.assertEqual(
+            {
+                "do_vote": "add_vote",
+                "validate vote": "do_vote",
+                "User.get_user_by_username": "do_vote",
+                "check single voting": "do_vote",
+                "VoteHistory.check_ip_voted_project": "check single voting",
+                "VoteAdmission.admit_vote": "do_vote",
+                "increment votes version": "VoteAdmission.admit_vote",
+            },
+            {
+                span["name"]: names[span["parent_id"]]
+                for span in spans
+                if span["parent_id"] is not None
+            },
+        )
+
     def add_vote_helper(self, vote_handler, expected_return_code):
         expected_data_user_2 = get_expected_votes_data("user_2")
         expected_data_user_2[0]["vote_count"] += 1
@@ -215,7 +635,8 @@ class VoteHandlersTestCase(unittest.TestCase):
                 pathParameters=dict(
                     user="UseR_3", project="ProJect_X", topic="ToPiC_xXX"
                 )
-            )
+            ),
+            "192.168.0.2",
         )
         response_5 = vote_handler(event_5, None)
         event_6 = add_ip_address(dict(pathParameters=dict(user="user_3")))
@@ -225,13 +646,15 @@ class VoteHandlersTestCase(unittest.TestCase):
         self.assertEqual(200, response_6["statusCode"])
         self.assertEqual(expected_data_user_4, json.loads(response_6["body"])["votes"])
 
+        # Check duplicate vote from the same IP address
+        response_7 = vote_handler(event_5, None)
+        response_8 = get_votes_for_user(event_6, None)
+
+        self.assertEqual(expected_return_code, response_7["statusCode"])
+        self.assertEqual(expected_data_user_4, json.loads(response_8["body"])["votes"])
+
     @mock.patch.object(User, "__init__", lambda _: None)
     @mock.patch.object(User, "get_user_by_username", lambda _, __: dict(is_public=True))
-    @mock.patch.object(VoteHistory, "__init__", lambda _: None)
-    @mock.patch.object(VoteHistory, "check_ip_voted", lambda _, __, ___, ____: False)
-    @mock.patch.object(
-        VoteHistory, "add_vote_history", lambda _, __, ___, ____, _____: None
-    )
     @mock.patch("time.time", return_value=9999)
     def test_add_vote(self, _):
         self.add_vote_helper(add_vote, 200)
@@ -242,11 +665,6 @@ class VoteHandlersTestCase(unittest.TestCase):
         "get_user_by_username",
         lambda _, __: dict(is_public=True, voted_redirect=None, voted_message=None),
     )
-    @mock.patch.object(VoteHistory, "__init__", lambda _: None)
-    @mock.patch.object(VoteHistory, "check_ip_voted", lambda _, __, ___, ____: False)
-    @mock.patch.object(
-        VoteHistory, "add_vote_history", lambda _, __, ___, ____, _____: None
-    )
     @mock.patch.object(
         User,
         "get_user_by_username",
@@ -256,6 +674,144 @@ class VoteHandlersTestCase(unittest.TestCase):
     def test_add_vote_and_redirect(self, _):
         self.add_vote_helper(add_vote_and_redirect, 302)
 
+    @mock.patch.object(User, "__init__", lambda _: None)
+    @mock.patch.object(
+        User,
+        "get_user_by_username",
+        lambda _, username: dict(is_public=True, single_voting_projects=["project_s"])
+        if username == "user_1"
+        else None,
+    )
+    def test_add_votes_batch(self):
+        event = lambda votes, user="user_1", ip_address="192.168.0.1": add_ip_address(
+            dict(
+                pathParameters=dict(user=user),
+                body=json.dumps(dict(votes=votes)) if votes is not None else None,
+            ),
+            ip_address,
+        )
+        vote = Vote()
+
+        votes = [
+            dict(project="project_a", topic="topic_aaa"),
+            dict(project="project_a", topic="topic_xxx"),
+            dict(project="project_a", topic="topic_xxx"),
+            dict(project="project_a", topic="topic xxx"),
+            dict(project="Project_S", topic="topic_sss"),
+            dict(project="project_s", topic="topic_ttt"),
+        ]
+        response = add_votes_batch(event(votes), None)
+
+        self.assertEqual(200, response["statusCode"])
+        self.assertEqual(
+            [
+                dict(project="project_a", topic="topic_aaa", result="added"),
+                dict(project="project_a", topic="topic_xxx", result="added"),
+                dict(project="project_a", topic="topic_xxx", result="duplicate"),
+                dict(project="project_a", topic="topic xxx", result="invalid"),
+                dict(project="project_s", topic="topic_sss", result="added"),
+                dict(project="project_s", topic="topic_ttt", result="rejected"),
+            ],
+            json.loads(response["body"])["votes"],
+        )
+        self.assertEqual(11, vote.get_vote_count("user_1", "project_a/topic_aaa"))
+        self.assertEqual(1, vote.get_vote_count("user_1", "project_a/topic_xxx"))
+        self.assertEqual(1, vote.get_vote_count("user_1", "project_s/topic_sss"))
+        self.assertEqual(0, vote.get_vote_count("user_1", "project_s/topic_ttt"))
+
+        # Votes from the same IP address are duplicates or rejected now
+        self.assertEqual(
+            ["duplicate", "rejected"],
+            [
+                x["result"]
+                for x in json.loads(add_votes_batch(event(votes[1:6:4]), None)["body"])[
+                    "votes"
+                ]
+            ],
+        )
+
+        # Invalid requests
+        for invalid_event in [
+            event(None),
+            event([]),
+            event("project_a"),
+            event([dict(project="project_a")]),
+            event([dict(project="project_a", topic="topic_aaa")] * 26),
+        ]:
+            self.assertEqual(
+                create_response(400, "POST", "Invalid votes"),
+                add_votes_batch(invalid_event, None),
+            )
+
+        self.assertEqual(
+            create_response(400, "POST", "Invalid user"),
+            add_votes_batch(event(votes, user="user_x"), None),
+        )
+
+    def test_user_read_once_per_request(self):
+        users_table = User().users_table
+        event = lambda ip_address, **path_parameters: add_ip_address(
+            dict(pathParameters=dict(user="user_1", **path_parameters)), ip_address
+        )
+
+        def count_user_queries(handler, event):
+            client = users_table.meta.client
+            with mock.patch.object(client, "query", wraps=client.query) as query:
+                response = handler(event, None)
+
+            return response, sum(
+                call.kwargs["TableName"] == users_table.name
+                for call in query.call_args_list
+            )
+
+        # The votes version is incremented, but the user is not read again
+        response, user_queries = count_user_queries(
+            add_vote, event("192.168.0.1", project="project_c", topic="topic_xxx")
+        )
+        self.assertEqual(200, response["statusCode"])
+        self.assertEqual(1, user_queries)
+
+        response, user_queries = count_user_queries(
+            add_vote_and_redirect,
+            event("192.168.0.1", project="project_c", topic="topic_yyy"),
+        )
+        self.assertEqual(302, response["statusCode"])
+        self.assertEqual(1, user_queries)
+
+        response, user_queries = count_user_queries(
+            get_votes_for_user, event("192.168.0.1")
+        )
+        self.assertEqual(200, response["statusCode"])
+        self.assertEqual(1, user_queries)
+
+        response, user_queries = count_user_queries(
+            get_votes_for_project, event("192.168.0.1", project="project_c")
+        )
+        self.assertEqual(200, response["statusCode"])
+        self.assertEqual(1, user_queries)
+        self.assertEqual(
+            2, users_table.get_item(Key={"User": "user_1"})["Item"]["VotesVersion"]
+        )
+
+    @mock.patch.object(User, "__init__", lambda _: None)
+    @mock.patch.object(
+        User,
+        "get_user_by_username",
+        lambda _, __: dict(is_public=True, single_voting_projects=["project_x"]),
+    )
+    def test_add_vote_single_voting(self):
+        event = lambda topic: add_ip_address(
+            dict(pathParameters=dict(user="user_3", project="project_x", topic=topic))
+        )
+
+        add_vote(event("topic_xxx"), None)
+        add_vote(event("topic_yyy"), None)
+
+        votes = json.loads(
+            get_votes_for_user(dict(pathParameters=dict(user="user_3")), None)["body"]
+        )["votes"]
+        self.assertEqual(["topic_xxx"], [vote["topic"] for vote in votes])
+
     @mock.patch.object(Vote, "set_vote_hidden")
     def test_set_vote_hidden(self, set_vote_hidden_model):
         # Hide
@@ -1,4 +1,5 @@
 import boto3
+from iwanttoreadmore.common import clear_cookie_secrets_cache
 
 
 def remove_table(table_name):
@@ -14,6 +15,7 @@ def create_cookie_parameter():
     """
     Creates a SSM parameter for the cookie secret
     """
+    clear_cookie_secrets_cache()
     client = boto3.client("ssm")
 
     try:
@@ -0,0 +1,56 @@
+import unittest
+import os
+import boto3
+from moto import mock_dynamodb2
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.models.user import User
+from iwanttoreadmore.migrations.email_index import (
+    get_index_status,
+    create_email_index,
+    find_unindexed_users,
+)
+from tests.data.data_test_user import create_test_users_data
+from tests.helpers import remove_table
+
+
+@mock_dynamodb2
+class EmailIndexMigrationTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Create a users table without the e-mail index and populate it with example data
+        """
+        os.environ["USERS_TABLE"] = "iwanttoreadmore-users-migration-test"
+
+        self.users_table = boto3.resource("dynamodb").create_table(
+            TableName=os.environ["USERS_TABLE"],
+            KeySchema=[{"AttributeName": "User", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "User", "AttributeType": "S"}],
+            ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
+        )
+        create_test_users_data(self.users_table)
+
+    def tearDown(self):
+        remove_table(os.environ["USERS_TABLE"])
+
+    def test_create_email_index(self):
+        table = get_table(os.environ["USERS_TABLE"])
+        self.assertIsNone(get_index_status(table, "EMailIndex"))
+
+        self.assertTrue(create_email_index(table, poll_interval=0))
+        self.assertEqual("ACTIVE", get_index_status(table, "EMailIndex"))
+        self.assertEqual("user_1", User().get_user_by_email("user_1@gmail.com")["user"])
+
+        # Running the migration again doesn't change anything
+        self.assertFalse(create_email_index(table, poll_interval=0))
+        self.assertEqual("ACTIVE", get_index_status(table, "EMailIndex"))
+
+    def test_find_unindexed_users(self):
+        table = get_table(os.environ["USERS_TABLE"])
+        self.assertEqual([], find_unindexed_users(table))
+
+        table.put_item(Item={"User": "user_x"})
+        self.assertEqual(["user_x"], find_unindexed_users(table))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import os
+from unittest import mock
+from decimal import Decimal
+from moto import mock_dynamodb2
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.models.vote_buckets import VoteBuckets
+from iwanttoreadmore.migrations.vote_buckets import backfill_vote_buckets
+from tests.data.data_test_vote_history import (
+    create_vote_history_table,
+    create_test_vote_history_data,
+)
+from tests.data.data_test_vote_buckets import create_vote_buckets_table
+from tests.helpers import remove_table
+
+
+@mock_dynamodb2
+class VoteBucketsMigrationTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Create the vote history table with example data and an empty vote buckets table
+        """
+        os.environ["VOTES_HISTORY_TABLE"] = "iwanttoreadmore-votes-history-migration-test"
+        os.environ["VOTES_BUCKETS_TABLE"] = "iwanttoreadmore-votes-buckets-migration-test"
+
+        self.vote_history_table = create_vote_history_table(
+            os.environ["VOTES_HISTORY_TABLE"]
+        )
+        create_test_vote_history_data(self.vote_history_table)
+        create_vote_buckets_table(os.environ["VOTES_BUCKETS_TABLE"])
+
+    def tearDown(self):
+        remove_table(os.environ["VOTES_HISTORY_TABLE"])
+        remove_table(os.environ["VOTES_BUCKETS_TABLE"])
+
+    @mock.patch("time.time", return_value=4000)
+    def test_backfill_vote_buckets(self, _):
+        history_table = get_table(os.environ["VOTES_HISTORY_TABLE"])
+        buckets_table = get_table(os.environ["VOTES_BUCKETS_TABLE"])
+        vote_buckets = VoteBuckets()
+
+        # A vote admitted after the deployment is already counted in the buckets
+        self.vote_history_table.put_item(
+            Item={
+                "IPHash": "new_vote",
+                "User": "user_1",
+                "TopicKey": "project_a/topic_aaa",
+                "VoteTimestamp": Decimal(3900),
+            }
+        )
+        vote_buckets.add_votes("user_1", "project_a", "topic_aaa", 3900)
+
+        # topic_aaa has votes at 1111 and 2222 and topic_bbb at 3333, each counted in three buckets
+        self.assertEqual(6, backfill_vote_buckets(history_table, buckets_table, 3500))
+
+        self.assertEqual(
+            [dict(start=0, votes=2), dict(start=3600, votes=1)],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_aaa", "hour", 0, 4000
+            ),
+        )
+        self.assertEqual(
+            [dict(start=0, votes=3)],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_aaa", "day", 0, 4000
+            ),
+        )
+        self.assertEqual(
+            [dict(start=-259200, votes=1)],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_bbb", "week", 0, 4000
+            ),
+        )
+
+        # Running the backfill again doesn't change anything
+        self.assertEqual(0, backfill_vote_buckets(history_table, buckets_table, 3500))
+        self.assertEqual(
+            [dict(start=0, votes=3)],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_aaa", "day", 0, 4000
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
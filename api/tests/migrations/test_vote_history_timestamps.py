@@ -0,0 +1,79 @@
+import unittest
+import os
+import boto3
+from decimal import Decimal
+from moto import mock_dynamodb2
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.models.vote_history import VoteHistory
+from iwanttoreadmore.migrations.email_index import get_index_status
+from iwanttoreadmore.migrations.vote_history_timestamps import (
+    VOTE_HISTORY_INDEXES,
+    convert_vote_timestamps,
+    create_vote_history_indexes,
+)
+from tests.helpers import remove_table
+
+
+@mock_dynamodb2
+class VoteHistoryTimestampsMigrationTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Create a vote history table without the timestamp indexes and populate it with entries with string timestamps
+        """
+        os.environ["VOTES_HISTORY_TABLE"] = "iwanttoreadmore-votes-history-migration-test"
+
+        self.vote_history_table = boto3.resource("dynamodb").create_table(
+            TableName=os.environ["VOTES_HISTORY_TABLE"],
+            KeySchema=[{"AttributeName": "IPHash", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "IPHash", "AttributeType": "S"}],
+            ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
+        )
+
+        for ip_hash, topic_key, timestamp in [
+            ("hash_1", "project_a/topic_aaa", "1111.5"),
+            ("hash_2", "project_a/topic_aaa", "999.25"),
+            ("hash_3", "project_a/topic_bbb", "3333"),
+        ]:
+            self.vote_history_table.put_item(
+                Item={
+                    "IPHash": ip_hash,
+                    "User": "user_1",
+                    "TopicKey": topic_key,
+                    "VoteTimestamp": timestamp,
+                }
+            )
+
+    def tearDown(self):
+        remove_table(os.environ["VOTES_HISTORY_TABLE"])
+
+    def test_migration(self):
+        table = get_table(os.environ["VOTES_HISTORY_TABLE"])
+
+        self.assertEqual(3, convert_vote_timestamps(table))
+
+        item = self.vote_history_table.get_item(Key={"IPHash": "hash_1"})["Item"]
+        self.assertEqual(Decimal("1111.5"), item["VoteTimestamp"])
+        self.assertEqual("user_1/project_a/topic_aaa", item["UserTopic"])
+
+        index_names = [index[0] for index in VOTE_HISTORY_INDEXES]
+        self.assertEqual(index_names, create_vote_history_indexes(table, poll_interval=0))
+        for index_name in index_names:
+            self.assertEqual("ACTIVE", get_index_status(table, index_name))
+
+        # The converted entries are ordered numerically in the indexes
+        self.assertEqual(
+            ([Decimal("999.25"), Decimal("1111.5")], None),
+            VoteHistory().get_topic_votes_page("user_1", "project_a/topic_aaa"),
+        )
+        self.assertEqual(
+            [dict(topic_key="project_a/topic_bbb", timestamp=3333)],
+            VoteHistory().get_user_votes_page("user_1", start=2000)[0],
+        )
+
+        # Running the migration again doesn't change anything
+        self.assertEqual(0, convert_vote_timestamps(table))
+        self.assertEqual([], create_vote_history_indexes(table, poll_interval=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
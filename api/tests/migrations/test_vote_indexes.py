@@ -0,0 +1,80 @@
+import unittest
+import os
+import boto3
+from moto import mock_dynamodb2
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.models.vote import Vote
+from iwanttoreadmore.migrations.email_index import get_index_status
+from iwanttoreadmore.migrations.vote_indexes import (
+    VOTE_INDEXES,
+    create_vote_indexes,
+    backfill_user_project,
+)
+from tests.data.data_test_vote import create_test_votes_data, get_expected_votes_data
+from tests.helpers import remove_table
+
+
+@mock_dynamodb2
+class VoteIndexesMigrationTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Create a votes table without the indexes and populate it with example data, which has no UserProject attribute
+        """
+        os.environ["VOTES_TABLE"] = "iwanttoreadmore-votes-migration-test"
+
+        self.votes_table = boto3.resource("dynamodb").create_table(
+            TableName=os.environ["VOTES_TABLE"],
+            KeySchema=[
+                {"AttributeName": "User", "KeyType": "HASH"},
+                {"AttributeName": "TopicKey", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "User", "AttributeType": "S"},
+                {"AttributeName": "TopicKey", "AttributeType": "S"},
+            ],
+            ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
+        )
+        create_test_votes_data(self.votes_table)
+
+        for vote in self.votes_table.scan()["Items"]:
+            self.votes_table.update_item(
+                Key={"User": vote["User"], "TopicKey": vote["TopicKey"]},
+                UpdateExpression="REMOVE UserProject",
+            )
+
+    def tearDown(self):
+        remove_table(os.environ["VOTES_TABLE"])
+
+    def test_create_vote_indexes(self):
+        table = get_table(os.environ["VOTES_TABLE"])
+        index_names = [index_name for index_name, _, _ in VOTE_INDEXES]
+
+        self.assertEqual(index_names, create_vote_indexes(table, poll_interval=0))
+        for index_name in index_names:
+            self.assertEqual("ACTIVE", get_index_status(table, index_name))
+
+        # Running the migration again doesn't change anything
+        self.assertEqual([], create_vote_indexes(table, poll_interval=0))
+
+    def test_backfill_user_project(self):
+        table = get_table(os.environ["VOTES_TABLE"])
+        create_vote_indexes(table, poll_interval=0)
+
+        # The topics are not in the per project indexes before the backfill
+        self.assertEqual([], Vote().get_votes_for_project("user_1", "project_a"))
+
+        self.assertEqual(4, backfill_user_project(table))
+        self.assertEqual(
+            get_expected_votes_data("user_1", "project_a"),
+            Vote().get_votes_for_project("user_1", "project_a"),
+        )
+        self.assertEqual(
+            get_expected_votes_data("user_1"), Vote().get_votes_for_user("user_1"),
+        )
+
+        # Running the backfill again doesn't change anything
+        self.assertEqual(0, backfill_user_project(table))
+
+
+if __name__ == "__main__":
+    unittest.main()
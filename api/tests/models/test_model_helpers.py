@@ -0,0 +1,113 @@
+import unittest
+import os
+from unittest import mock
+from boto3.dynamodb.conditions import Key
+from moto import mock_dynamodb2
+from iwanttoreadmore.connections import get_table
+from iwanttoreadmore.models.model_helpers import (
+    query_all,
+    batch_get_all,
+)
+from tests.data.data_test_vote import create_votes_table, create_test_votes_data
+from tests.helpers import remove_table
+
+
+@mock_dynamodb2
+class ModelHelpersTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Create a votes table and populate it with example data
+        """
+        os.environ["VOTES_TABLE"] = "iwanttoreadmore-votes-test"
+
+        self.votes_table = create_votes_table(os.environ["VOTES_TABLE"])
+        create_test_votes_data(self.votes_table)
+
+    def tearDown(self):
+        remove_table(os.environ["VOTES_TABLE"])
+
+    def test_query_all(self):
+        table = get_table(os.environ["VOTES_TABLE"])
+
+        # All pages are read
+        topic_keys = [
+            item["TopicKey"]
+            for item in query_all(
+                table, KeyConditionExpression=Key("User").eq("user_1"), Limit=1
+            )
+        ]
+        self.assertEqual(
+            ["project_a/topic_aaa", "project_a/topic_bbb", "project_b/topic_ccc"],
+            topic_keys,
+        )
+
+        self.assertEqual(
+            [],
+            list(query_all(table, KeyConditionExpression=Key("User").eq("user_x"))),
+        )
+
+    def test_query_all_lazy(self):
+        table = get_table(os.environ["VOTES_TABLE"])
+
+        with mock.patch.object(table, "query", wraps=table.query) as query_mock:
+            items = query_all(
+                table, KeyConditionExpression=Key("User").eq("user_1"), Limit=1
+            )
+            self.assertEqual(0, query_mock.call_count)
+
+            next(items)
+            self.assertEqual(1, query_mock.call_count)
+
+            next(items)
+            self.assertEqual(2, query_mock.call_count)
+
+    def test_batch_get_all(self):
+        table = get_table(os.environ["VOTES_TABLE"])
+
+        items = batch_get_all(
+            table,
+            [
+                {"User": "user_1", "TopicKey": "project_a/topic_aaa"},
+                {"User": "user_2", "TopicKey": "project_c/topic_ddd"},
+                {"User": "user_x", "TopicKey": "project_x/topic_xxx"},
+            ],
+            ProjectionExpression="TopicKey",
+        )
+        self.assertEqual(
+            ["project_a/topic_aaa", "project_c/topic_ddd"],
+            sorted(item["TopicKey"] for item in items),
+        )
+        self.assertEqual([], batch_get_all(table, []))
+
+    @mock.patch("time.sleep")
+    def test_batch_get_all_unprocessed(self, sleep_mock):
+        table = get_table(os.environ["VOTES_TABLE"])
+        key = {"User": "user_1", "TopicKey": "project_a/topic_aaa"}
+        unprocessed = {table.name: {"Keys": [key]}}
+        responses = [
+            dict(Responses={table.name: []}, UnprocessedKeys=unprocessed),
+            dict(Responses={table.name: []}, UnprocessedKeys=unprocessed),
+            dict(Responses={table.name: [key]}, UnprocessedKeys={}),
+        ]
+
+        with mock.patch.object(
+            table.meta.client, "batch_get_item", side_effect=responses
+        ) as batch_get_mock:
+            self.assertEqual([key], batch_get_all(table, [key]))
+
+        # The unprocessed keys are retried with an exponential backoff
+        self.assertEqual(3, batch_get_mock.call_count)
+        self.assertEqual(unprocessed, batch_get_mock.call_args.kwargs["RequestItems"])
+        self.assertEqual([mock.call(0.05), mock.call(0.1)], sleep_mock.call_args_list)
+
+        # An error is raised if some keys are never processed
+        with mock.patch.object(
+            table.meta.client,
+            "batch_get_item",
+            return_value=dict(Responses={}, UnprocessedKeys=unprocessed),
+        ):
+            self.assertRaises(RuntimeError, batch_get_all, table, [key])
+
+
+if __name__ == "__main__":
+    unittest.main()
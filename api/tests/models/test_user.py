@@ -2,7 +2,7 @@ import unittest
 import os
 from unittest import mock
 from moto import mock_dynamodb2
-from iwanttoreadmore.models.user import User
+from iwanttoreadmore.models.user import User, user_request_scope
 from tests.data.data_test_user import (
     create_users_table,
     create_test_users_data,
@@ -36,6 +36,68 @@ class UserTestCase(unittest.TestCase):
         )
         self.assertFalse(user.get_user_by_username("user_3"))
 
+    def test_increment_votes_version(self):
+        user = User()
+        self.assertNotIn("votes_version", user.get_user_by_username("user_1"))
+
+        user.increment_votes_version("user_1")
+        self.assertEqual(1, user.get_user_by_username("user_1")["votes_version"])
+        user.increment_votes_version("user_1")
+        self.assertEqual(2, user.get_user_by_username("user_1")["votes_version"])
+
+        # Users are not created by the version counter
+        user.increment_votes_version("user_3")
+        self.assertIsNone(user.get_user_by_username("user_3"))
+        self.assertEqual(2, self.users_table.scan()["Count"])
+
+    def test_user_request_scope(self):
+        user = User()
+
+        with mock.patch.object(
+            user.users_table.meta.client, "query", wraps=user.users_table.meta.client.query
+        ) as query:
+            with user_request_scope():
+                self.assertEqual(
+                    self.expected_users_data["user_1"], user.get_user_by_username("user_1")
+                )
+                self.assertIsNone(user.get_user_by_username("user_3"))
+
+                # Repeated reads are served from the identity map
+                user.get_user_by_username("user_1")["email"] = "changed@test.com"
+                self.assertEqual(
+                    self.expected_users_data["user_1"], user.get_user_by_username("user_1")
+                )
+                self.assertIsNone(user.get_user_by_username("user_3"))
+                self.assertEqual(2, query.call_count)
+
+                # Users found by e-mail are stored as well
+                user.get_user_by_email("user_2@gmail.com")
+                user.get_user_by_username("user_2")
+                self.assertEqual(3, query.call_count)
+
+                # Changed users are read again
+                user.update_user_email("user_1", "user_1_new@test.com")
+                self.assertEqual(
+                    "user_1_new@test.com", user.get_user_by_username("user_1")["email"]
+                )
+                self.assertEqual(4, query.call_count)
+
+                # Incremented versions are applied to the loaded user instead of reading it again
+                user.increment_votes_version("user_1")
+                user_1 = user.get_user_by_username("user_1")
+                self.assertEqual(1, user_1["votes_version"])
+                self.assertEqual(4, query.call_count)
+
+                # Nested scopes share the identity map
+                with user_request_scope():
+                    user.get_user_by_username("user_1")
+                self.assertEqual(4, query.call_count)
+
+            # Outside of a scope every read goes to the table
+            user.get_user_by_username("user_1")
+            user.get_user_by_username("user_1")
+            self.assertEqual(6, query.call_count)
+
     def test_get_user_by_email(self):
         user = User()
         self.assertEqual(
@@ -263,6 +325,42 @@ class UserTestCase(unittest.TestCase):
 
         self.assertRaises(ValueError, user.change_single_voting_projects, "user_x", [])
 
+    def test_update_existing_user(self):
+        user = User()
+        client = user.users_table.meta.client
+
+        # Every settings change is a single conditional write without reading the user first
+        with mock.patch.object(client, "query", wraps=client.query) as query:
+            with mock.patch.object(
+                client, "update_item", wraps=client.update_item
+            ) as update_item:
+                user.update_user_email("user_1", "user_1_new@gmail.com")
+                user.update_user_last_active("user_1")
+                user.set_account_public("user_1", False)
+                user.set_voted_message_and_redirect("user_1", "Thanks", None)
+                user.change_single_voting_projects("user_1", ["project_a"])
+
+                self.assertEqual(0, query.call_count)
+                self.assertEqual(5, update_item.call_count)
+
+        user_data = user.get_user_by_username("user_1")
+        self.assertEqual("user_1_new@gmail.com", user_data["email"])
+        self.assertFalse(user_data["is_public"])
+        self.assertEqual("Thanks", user_data["voted_message"])
+        self.assertEqual(["project_a"], user_data["single_voting_projects"])
+
+        # Missing users are not created by the conditional writes
+        self.assertRaises(
+            ValueError,
+            user.update_existing_user,
+            "user_x",
+            ExpressionAttributeValues={":IsPublic": True},
+            UpdateExpression="SET IsPublic = :IsPublic",
+        )
+        self.assertRaises(ValueError, user.set_account_public, "user_x", True)
+        self.assertIsNone(user.get_user_by_username("user_x"))
+        self.assertEqual(2, self.users_table.scan()["Count"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,7 +1,9 @@
 import unittest
+import threading
 import os
 from unittest import mock
 from moto import mock_dynamodb2
+from moto.dynamodb2.models import DynamoDBBackend
 from iwanttoreadmore.models.vote import Vote, get_topic_key
 from tests.data.data_test_vote import (
     create_votes_table,
@@ -55,6 +57,123 @@ class VoteTestCase(unittest.TestCase):
         self.assertEqual([], vote.get_votes_for_project("user_2", "project_y"))
         self.assertEqual([], vote.get_votes_for_project("user_3", "project_z"))
 
+    def test_get_votes_for_project_prefix(self):
+        vote = Vote()
+        vote.add_vote("user_1", "project_a_2", "topic_xxx")
+
+        # Projects whose name starts with the name of another project are not mixed
+        self.assertEqual(
+            get_expected_votes_data("user_1", "project_a"),
+            vote.get_votes_for_project("user_1", "project_a"),
+        )
+        self.assertEqual(
+            ["topic_xxx"],
+            [x["topic"] for x in vote.get_votes_for_project("user_1", "project_a_2")],
+        )
+
+    def test_get_votes_page_reads_only_project(self):
+        vote = Vote()
+        responses = []
+        query = vote.votes_table.query
+
+        def query_and_save_response(**query_args):
+            responses.append(query(**query_args))
+            return responses[-1]
+
+        with mock.patch.object(
+            vote.votes_table, "query", side_effect=query_and_save_response
+        ) as query_mock:
+            votes, _ = vote.get_votes_page("user_1", "project_b")
+
+        self.assertEqual(["topic_ccc"], [x["topic"] for x in votes])
+        self.assertEqual([1], [response["Count"] for response in responses])
+
+        # The page is read consistently, so it contains all admitted votes
+        self.assertTrue(query_mock.call_args.kwargs["ConsistentRead"])
+
+    def test_get_votes_top_n(self):
+        vote = Vote()
+        self.assertEqual(
+            get_expected_votes_data("user_1")[:2],
+            vote.get_votes_for_user("user_1", top_n=2),
+        )
+        self.assertEqual(
+            get_expected_votes_data("user_1", "project_a")[:1],
+            vote.get_votes_for_project("user_1", "project_a", top_n=1),
+        )
+        self.assertEqual(
+            get_expected_votes_data("user_2"),
+            vote.get_votes_for_user("user_2", top_n=10),
+        )
+        self.assertEqual([], vote.get_votes_for_user("user_3", top_n=10))
+
+    def test_get_recent_votes(self):
+        vote = Vote()
+        by_last_vote = lambda votes: sorted(
+            votes, key=lambda x: x["last_vote"], reverse=True
+        )
+
+        self.assertEqual(
+            by_last_vote(get_expected_votes_data("user_1")),
+            vote.get_recent_votes_for_user("user_1"),
+        )
+        self.assertEqual(
+            by_last_vote(get_expected_votes_data("user_1"))[:2],
+            vote.get_recent_votes_for_user("user_1", 2),
+        )
+        self.assertEqual(
+            by_last_vote(get_expected_votes_data("user_1", "project_a")),
+            vote.get_recent_votes_for_project("user_1", "project_a"),
+        )
+        self.assertEqual([], vote.get_recent_votes_for_project("user_3", "project_z"))
+
+        # A new vote moves the topic to the top
+        with mock.patch("time.time", return_value=9999):
+            vote.add_vote("user_1", "project_a", "topic_aaa")
+
+        self.assertEqual(
+            ["topic_aaa"],
+            [x["topic"] for x in vote.get_recent_votes_for_project("user_1", "project_a", 1)],
+        )
+
+    def test_get_votes_top_n_bounded_read(self):
+        vote = Vote()
+        for i in range(20):
+            vote.add_vote("user_3", "project_x", f"topic_{i:02}", count=i + 1)
+
+        # Only the requested number of votes is read from the index
+        client = vote.votes_table.meta.client
+        with mock.patch.object(client, "query", side_effect=client.query) as query_mock:
+            votes = vote.get_votes_for_project("user_3", "project_x", top_n=3)
+
+        self.assertEqual(["topic_19", "topic_18", "topic_17"], [x["topic"] for x in votes])
+        self.assertEqual(1, query_mock.call_count)
+        self.assertEqual(3, query_mock.call_args.kwargs["Limit"])
+        self.assertFalse(query_mock.call_args.kwargs["ScanIndexForward"])
+
+    def test_get_votes_page(self):
+        vote = Vote()
+        expected_votes = sorted(
+            get_expected_votes_data("user_1"), key=lambda x: x["project_name"] + x["topic"]
+        )
+
+        votes_1, next_topic_key = vote.get_votes_page("user_1", limit=2)
+        self.assertEqual(expected_votes[:2], votes_1)
+        self.assertEqual("project_a/topic_bbb", next_topic_key)
+
+        votes_2, next_topic_key = vote.get_votes_page(
+            "user_1", limit=2, start_topic_key=next_topic_key
+        )
+        self.assertEqual(expected_votes[2:], votes_2)
+        self.assertEqual(None, next_topic_key)
+
+        # Project pages
+        self.assertEqual(
+            (get_expected_votes_data("user_1", "project_b"), None),
+            vote.get_votes_page("user_1", "project_b", limit=2),
+        )
+        self.assertEqual(([], None), vote.get_votes_page("user_3", limit=2))
+
     def test_get_vote_count(self):
         vote = Vote()
 
@@ -71,60 +190,73 @@ class VoteTestCase(unittest.TestCase):
         self.assertEqual(0, vote.get_vote_count("user_2", "project_a/topic_aaa"))
         self.assertEqual(0, vote.get_vote_count("user_2", "project_c/topic_aaa"))
 
-    @mock.patch("time.time", return_value=9999)
-    def test_set_vote_count(self, _):
+    def test_add_vote(self):
         vote = Vote()
 
-        # Check votes count set correctly
-        self.assertEqual(10, vote.get_vote_count("user_1", "project_a/topic_aaa"))
-        vote.set_vote_count("user_1", "project_a/topic_aaa", 100)
-        self.assertEqual(100, vote.get_vote_count("user_1", "project_a/topic_aaa"))
+        # Test existing topic
+        self.assertEqual(11, vote.add_vote("user_1", "project_a", "topic_aaa"))
+        self.assertEqual(11, vote.get_vote_count("user_1", "project_a/topic_aaa"))
+        self.assertEqual(12, vote.add_vote("user_1", "project_a", "topic_aaa"))
+        self.assertEqual(12, vote.get_vote_count("user_1", "project_a/topic_aaa"))
 
-        # Check timestamp set correctly
-        votes_user_1 = vote.get_votes_for_user("user_1")
-        self.assertEqual("9999", votes_user_1[0]["last_vote"])
+        # Test new topic
+        self.assertEqual(1, vote.add_vote("user_1", "project_a", "topic_xxx"))
+        self.assertEqual(
+            "user_1/project_a",
+            self.votes_table.get_item(
+                Key={"User": "user_1", "TopicKey": "project_a/topic_xxx"}
+            )["Item"]["UserProject"],
+        )
+        self.assertEqual(1, vote.get_vote_count("user_1", "project_a/topic_xxx"))
+        self.assertEqual(2, vote.add_vote("user_1", "project_a", "topic_xxx"))
+        self.assertEqual(2, vote.get_vote_count("user_1", "project_a/topic_xxx"))
 
     @mock.patch("time.time", return_value=9999)
-    def test_create_topic(self, _):
-        expected_votes_user_2 = get_expected_votes_data("user_2") + [
-            dict(
-                topic="topic_eee",
-                project_name="project_d",
-                vote_count=1,
-                last_vote="9999",
-            ),
-        ]
-
-        expected_votes_user_3 = [
-            dict(
-                topic="topic_fff",
-                project_name="project_e",
-                vote_count=1,
-                last_vote="9999",
-            ),
-        ]
-
+    def test_add_vote_new_topic(self, _):
         vote = Vote()
-        vote.create_topic("user_2", "topic_eee", "project_d")
-        vote.create_topic("user_3", "topic_fff", "project_e")
+        vote.add_vote("user_3", "project_e", "topic_fff")
 
-        self.assertEqual(expected_votes_user_2, vote.get_votes_for_user("user_2"))
-        self.assertEqual(expected_votes_user_3, vote.get_votes_for_user("user_3"))
+        self.assertEqual(
+            [
+                dict(
+                    topic="topic_fff",
+                    project_name="project_e",
+                    vote_count=1,
+                    last_vote="9999",
+                )
+            ],
+            vote.get_votes_for_user("user_3"),
+        )
 
-    def test_add_vote(self):
+    def test_add_vote_concurrent(self):
         vote = Vote()
+        threads_count = 16
+        votes_per_thread = 25
 
-        # Test existing topic
-        vote.add_vote("user_1", "project_a", "topic_aaa")
-        self.assertEqual(11, vote.get_vote_count("user_1", "project_a/topic_aaa"))
-        vote.add_vote("user_1", "project_a", "topic_aaa")
-        self.assertEqual(12, vote.get_vote_count("user_1", "project_a/topic_aaa"))
+        # DynamoDB applies each update request atomically, but the moto backend does not, so its updates are
+        # serialized here. Lost votes can then only be caused by the client doing more than one request per vote.
+        update_item = DynamoDBBackend.update_item
+        update_lock = threading.Lock()
 
-        # Test new topic
-        vote.add_vote("user_1", "project_a", "topic_xxx")
-        self.assertEqual(1, vote.get_vote_count("user_1", "project_a/topic_xxx"))
-        vote.add_vote("user_1", "project_a", "topic_xxx")
-        self.assertEqual(2, vote.get_vote_count("user_1", "project_a/topic_xxx"))
+        def locked_update_item(*args, **kwargs):
+            with update_lock:
+                return update_item(*args, **kwargs)
+
+        def add_votes():
+            for _ in range(votes_per_thread):
+                vote.add_vote("user_1", "project_a", "topic_xxx")
+
+        threads = [threading.Thread(target=add_votes) for _ in range(threads_count)]
+        with mock.patch.object(DynamoDBBackend, "update_item", locked_update_item):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(
+            threads_count * votes_per_thread,
+            vote.get_vote_count("user_1", "project_a/topic_xxx"),
+        )
 
     def test_set_vote_hidden(self):
         vote = Vote()
@@ -0,0 +1,307 @@
+import unittest
+import os
+from decimal import Decimal
+from unittest import mock
+from moto import mock_dynamodb2
+from botocore.exceptions import ClientError
+from iwanttoreadmore.models.vote import Vote
+from iwanttoreadmore.models.vote_history import VoteHistory
+from iwanttoreadmore.models.vote_buckets import VoteBuckets
+from iwanttoreadmore.models.vote_admission import (
+    VoteAdmission,
+    VOTE_ADDED,
+    VOTE_DUPLICATE,
+    VOTE_FAILED,
+)
+from tests.data.data_test_vote import create_votes_table, create_test_votes_data
+from tests.data.data_test_vote_history import (
+    create_vote_history_table,
+    create_test_vote_history_data,
+)
+from tests.data.data_test_vote_buckets import create_vote_buckets_table
+from tests.data.data_test_user import create_users_table, create_test_users_data
+from tests.helpers import remove_table
+
+
+@mock_dynamodb2
+class VoteAdmissionTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Create the votes and vote history tables and populate them with example data
+        """
+        os.environ["VOTES_TABLE"] = "iwanttoreadmore-votes-test"
+        os.environ["VOTES_HISTORY_TABLE"] = "iwanttoreadmore-votes-history-test"
+        os.environ["VOTES_BUCKETS_TABLE"] = "iwanttoreadmore-votes-buckets-test"
+        os.environ["USERS_TABLE"] = "iwanttoreadmore-users-test"
+
+        self.votes_table = create_votes_table(os.environ["VOTES_TABLE"])
+        create_test_votes_data(self.votes_table)
+        self.vote_history_table = create_vote_history_table(
+            os.environ["VOTES_HISTORY_TABLE"]
+        )
+        self.vote_buckets_table = create_vote_buckets_table(
+            os.environ["VOTES_BUCKETS_TABLE"]
+        )
+        self.users_table = create_users_table(os.environ["USERS_TABLE"])
+        create_test_users_data(self.users_table)
+        create_test_vote_history_data(self.vote_history_table)
+
+    def tearDown(self):
+        remove_table(os.environ["VOTES_TABLE"])
+        remove_table(os.environ["VOTES_HISTORY_TABLE"])
+        remove_table(os.environ["VOTES_BUCKETS_TABLE"])
+        remove_table(os.environ["USERS_TABLE"])
+
+    @mock.patch("time.time", return_value=9999)
+    def test_admit_vote(self, _):
+        vote_admission = VoteAdmission()
+        vote = Vote()
+        vote_history = VoteHistory()
+
+        # Valid vote
+        self.assertTrue(
+            vote_admission.admit_vote("user_1", "project_a", "topic_aaa", "192.168.0.3")
+        )
+        self.assertEqual(11, vote.get_vote_count("user_1", "project_a/topic_aaa"))
+        self.assertEqual(
+            [Decimal(1111), Decimal(2222), Decimal(9999)],
+            vote_history.get_vote_history("user_1", "project_a/topic_aaa"),
+        )
+
+        # Duplicate vote
+        self.assertFalse(
+            vote_admission.admit_vote("user_1", "project_a", "topic_aaa", "192.168.0.1")
+        )
+        self.assertFalse(
+            vote_admission.admit_vote("user_1", "project_a", "topic_aaa", "192.168.0.3")
+        )
+        self.assertEqual(11, vote.get_vote_count("user_1", "project_a/topic_aaa"))
+        self.assertEqual(
+            [Decimal(1111), Decimal(2222), Decimal(9999)],
+            vote_history.get_vote_history("user_1", "project_a/topic_aaa"),
+        )
+
+        # New topic
+        self.assertTrue(
+            vote_admission.admit_vote("user_1", "project_a", "topic_xxx", "192.168.0.1")
+        )
+        self.assertEqual(1, vote.get_vote_count("user_1", "project_a/topic_xxx"))
+        self.assertTrue(
+            vote_history.check_ip_voted("user_1", "project_a/topic_xxx", "192.168.0.1")
+        )
+        self.assertEqual(
+            [
+                dict(
+                    topic="topic_xxx",
+                    project_name="project_a",
+                    vote_count=1,
+                    last_vote="9999",
+                )
+            ],
+            [
+                vote_data
+                for vote_data in vote.get_votes_for_project("user_1", "project_a")
+                if vote_data["topic"] == "topic_xxx"
+            ],
+        )
+
+    @mock.patch("time.time", return_value=9999)
+    def test_admit_vote_buckets(self, _):
+        vote_admission = VoteAdmission()
+        vote_buckets = VoteBuckets()
+
+        # The vote is added to the buckets of all resolutions, the duplicate isn't
+        vote_admission.admit_vote("user_1", "project_a", "topic_aaa", "192.168.0.3")
+        vote_admission.admit_vote("user_1", "project_a", "topic_aaa", "192.168.0.3")
+
+        self.assertEqual(
+            [dict(start=7200, votes=1)],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_aaa", "hour", 0, 9999
+            ),
+        )
+        self.assertEqual(
+            [dict(start=0, votes=1)],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_aaa", "day", 0, 9999
+            ),
+        )
+
+        # The votes of a batch are added to the buckets too
+        vote_admission.admit_votes(
+            "user_1",
+            [("project_a", "topic_aaa"), ("project_a", "topic_xxx")],
+            "192.168.0.4",
+        )
+
+        self.assertEqual(
+            [dict(start=0, votes=2)],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_aaa", "day", 0, 9999
+            ),
+        )
+        self.assertEqual(
+            [dict(start=-259200, votes=1)],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_xxx", "week", 0, 9999
+            ),
+        )
+
+    def test_admit_votes(self):
+        vote_admission = VoteAdmission()
+        vote = Vote()
+        vote_history = VoteHistory()
+
+        outcomes = vote_admission.admit_votes(
+            "user_1",
+            [
+                ("project_a", "topic_aaa"),
+                ("project_a", "topic_bbb"),
+                ("project_a", "topic_xxx"),
+                ("project_a", "topic_xxx"),
+            ],
+            "192.168.0.1",
+        )
+
+        self.assertEqual([VOTE_DUPLICATE, VOTE_ADDED, VOTE_ADDED, VOTE_DUPLICATE], outcomes)
+        self.assertEqual(10, vote.get_vote_count("user_1", "project_a/topic_aaa"))
+        self.assertEqual(21, vote.get_vote_count("user_1", "project_a/topic_bbb"))
+        self.assertEqual(1, vote.get_vote_count("user_1", "project_a/topic_xxx"))
+        self.assertTrue(
+            vote_history.check_ip_voted("user_1", "project_a/topic_bbb", "192.168.0.1")
+        )
+        self.assertTrue(
+            vote_history.check_ip_voted("user_1", "project_a/topic_xxx", "192.168.0.1")
+        )
+
+        # The same votes are now all duplicates
+        self.assertEqual(
+            [VOTE_DUPLICATE, VOTE_DUPLICATE],
+            vote_admission.admit_votes(
+                "user_1",
+                [("project_a", "topic_bbb"), ("project_a", "topic_xxx")],
+                "192.168.0.1",
+            ),
+        )
+        self.assertEqual(21, vote.get_vote_count("user_1", "project_a/topic_bbb"))
+
+    def test_admit_votes_failure(self):
+        vote_admission = VoteAdmission()
+        vote = Vote()
+        vote_history = VoteHistory()
+        client = vote_admission.votes_table.meta.client
+        transact_write_items = client.transact_write_items
+        transactions = []
+
+        # The first transaction is cancelled for a reason which isn't retried
+        def failing_transact_write_items(**request_args):
+            transactions.append(request_args)
+            if len(transactions) == 1:
+                raise ClientError(
+                    dict(
+                        Error=dict(Code="TransactionCanceledException", Message=""),
+                        CancellationReasons=[dict(Code="ThrottlingError")],
+                    ),
+                    "TransactWriteItems",
+                )
+            return transact_write_items(**request_args)
+
+        with mock.patch.object(
+            client, "transact_write_items", failing_transact_write_items
+        ):
+            outcomes = vote_admission.admit_votes(
+                "user_1",
+                [("project_a", "topic_xxx"), ("project_a", "topic_yyy")],
+                "192.168.0.1",
+            )
+
+        # The failed vote leaves no vote history entry behind, so it can be sent again
+        self.assertEqual([VOTE_FAILED, VOTE_ADDED], outcomes)
+        self.assertEqual(0, vote.get_vote_count("user_1", "project_a/topic_xxx"))
+        self.assertFalse(
+            vote_history.check_ip_voted("user_1", "project_a/topic_xxx", "192.168.0.1")
+        )
+        self.assertEqual(1, vote.get_vote_count("user_1", "project_a/topic_yyy"))
+
+        self.assertEqual(
+            [VOTE_ADDED],
+            vote_admission.admit_votes(
+                "user_1", [("project_a", "topic_xxx")], "192.168.0.1"
+            ),
+        )
+        self.assertEqual(1, vote.get_vote_count("user_1", "project_a/topic_xxx"))
+
+    @mock.patch("time.sleep")
+    def test_admit_vote_conflict(self, sleep_mock):
+        vote_admission = VoteAdmission()
+        vote = Vote()
+        client = vote_admission.votes_table.meta.client
+        transact_write_items = client.transact_write_items
+        conflict = ClientError(
+            dict(
+                Error=dict(Code="TransactionCanceledException", Message=""),
+                CancellationReasons=[
+                    dict(Code="None"),
+                    dict(Code="TransactionConflict"),
+                ],
+            ),
+            "TransactWriteItems",
+        )
+        transactions = []
+
+        # The transactions cancelled because of a conflict with concurrent votes are retried
+        def conflicting_transact_write_items(**request_args):
+            transactions.append(request_args)
+            if len(transactions) <= 2:
+                raise conflict
+            return transact_write_items(**request_args)
+
+        with mock.patch.object(
+            client, "transact_write_items", conflicting_transact_write_items
+        ):
+            self.assertTrue(
+                vote_admission.admit_vote(
+                    "user_1", "project_a", "topic_xxx", "192.168.0.1"
+                )
+            )
+
+        self.assertEqual(3, len(transactions))
+        self.assertEqual(2, sleep_mock.call_count)
+        self.assertEqual(1, vote.get_vote_count("user_1", "project_a/topic_xxx"))
+
+        # A duplicate vote is still rejected after a conflict
+        transactions.clear()
+        with mock.patch.object(
+            client, "transact_write_items", conflicting_transact_write_items
+        ):
+            self.assertFalse(
+                vote_admission.admit_vote(
+                    "user_1", "project_a", "topic_xxx", "192.168.0.1"
+                )
+            )
+        self.assertEqual(1, vote.get_vote_count("user_1", "project_a/topic_xxx"))
+
+        # The number of retries is bounded
+        sleep_mock.reset_mock()
+        with mock.patch.object(
+            client, "transact_write_items", side_effect=conflict
+        ) as transact_mock:
+            self.assertRaises(
+                ClientError,
+                vote_admission.admit_vote,
+                "user_1",
+                "project_a",
+                "topic_yyy",
+                "192.168.0.1",
+            )
+
+        self.assertEqual(1 + 3, transact_mock.call_count)
+        self.assertEqual(3, sleep_mock.call_count)
+        for (delay,), _ in sleep_mock.call_args_list:
+            self.assertLessEqual(0, delay)
+            self.assertGreaterEqual(0.2, delay)
+        self.assertEqual(0, vote.get_vote_count("user_1", "project_a/topic_yyy"))
+
+
+if __name__ == "__main__":
+    unittest.main()
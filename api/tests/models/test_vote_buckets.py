@@ -0,0 +1,110 @@
+import unittest
+import os
+from moto import mock_dynamodb2
+from iwanttoreadmore.models.vote_buckets import (
+    VoteBuckets,
+    HOUR_BUCKETS_RETENTION,
+    get_bucket_key,
+    get_bucket_start,
+)
+from tests.data.data_test_vote_buckets import create_vote_buckets_table
+from tests.helpers import remove_table
+
+# Monday, 2020-06-01 00:00:00 UTC
+MONDAY = 1590969600
+
+
+@mock_dynamodb2
+class VoteBucketsTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Create the vote buckets table
+        """
+        os.environ["VOTES_BUCKETS_TABLE"] = "iwanttoreadmore-votes-buckets-test"
+        self.vote_buckets_table = create_vote_buckets_table(
+            os.environ["VOTES_BUCKETS_TABLE"]
+        )
+
+    def tearDown(self):
+        remove_table(os.environ["VOTES_BUCKETS_TABLE"])
+
+    def test_get_bucket_key(self):
+        self.assertEqual(
+            "user_1/project_a/topic_aaa/day",
+            get_bucket_key("user_1", "project_a", "topic_aaa", "day"),
+        )
+
+    def test_get_bucket_start(self):
+        timestamp = MONDAY + 2 * 86400 + 5 * 3600 + 59.5
+
+        self.assertEqual(
+            MONDAY + 2 * 86400 + 5 * 3600, get_bucket_start(timestamp, "hour")
+        )
+        self.assertEqual(MONDAY + 2 * 86400, get_bucket_start(timestamp, "day"))
+        self.assertEqual(MONDAY, get_bucket_start(timestamp, "week"))
+        self.assertEqual(MONDAY, get_bucket_start(str(MONDAY + 604799), "week"))
+        self.assertEqual(MONDAY, get_bucket_start(MONDAY, "week"))
+
+    def test_add_votes(self):
+        vote_buckets = VoteBuckets()
+
+        vote_buckets.add_votes("user_1", "project_a", "topic_aaa", MONDAY + 10)
+        vote_buckets.add_votes("user_1", "project_a", "topic_aaa", MONDAY + 20, count=2)
+        vote_buckets.add_votes("user_1", "project_a", "topic_aaa", MONDAY + 3600)
+        vote_buckets.add_votes("user_1", "project_a", "topic_aaa", MONDAY + 86400)
+        vote_buckets.add_votes("user_1", "project_a", "topic_bbb", MONDAY)
+
+        self.assertEqual(
+            [
+                dict(start=MONDAY, votes=3),
+                dict(start=MONDAY + 3600, votes=1),
+                dict(start=MONDAY + 86400, votes=1),
+            ],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_aaa", "hour", MONDAY, MONDAY + 86400
+            ),
+        )
+        self.assertEqual(
+            [dict(start=MONDAY, votes=4), dict(start=MONDAY + 86400, votes=1)],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_aaa", "day", MONDAY, MONDAY + 86400
+            ),
+        )
+        self.assertEqual(
+            [dict(start=MONDAY, votes=5)],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_aaa", "week", MONDAY, MONDAY + 86400
+            ),
+        )
+
+        # The range includes the buckets containing its start and end
+        self.assertEqual(
+            [dict(start=MONDAY + 3600, votes=1)],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_aaa", "hour", MONDAY + 3700, MONDAY + 3800
+            ),
+        )
+        self.assertEqual(
+            [],
+            vote_buckets.get_vote_buckets(
+                "user_1", "project_a", "topic_xxx", "day", MONDAY, MONDAY + 86400
+            ),
+        )
+
+        # Only the hourly buckets expire
+        items = {
+            item["BucketKey"]: item
+            for item in self.vote_buckets_table.scan()["Items"]
+            if item["BucketStart"] == MONDAY
+            and item["BucketKey"].startswith("user_1/project_a/topic_aaa")
+        }
+        self.assertEqual(
+            MONDAY + HOUR_BUCKETS_RETENTION,
+            items["user_1/project_a/topic_aaa/hour"]["ExpiresAt"],
+        )
+        self.assertNotIn("ExpiresAt", items["user_1/project_a/topic_aaa/day"])
+        self.assertNotIn("ExpiresAt", items["user_1/project_a/topic_aaa/week"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -71,6 +71,97 @@ class VoteHistoryTestCase(unittest.TestCase):
             vote_history.get_vote_history("user_1", "project_a/topic_ccc"),
         )
 
+    def test_get_topic_votes_page(self):
+        vote_history = VoteHistory()
+        for i, timestamp in enumerate([9999.5, 3000.25, 5000]):
+            with mock.patch("time.time", return_value=timestamp):
+                vote_history.add_vote_history(
+                    "user_1", "project_a", "topic_aaa", f"10.0.0.{i}"
+                )
+
+        # The votes are returned in the order of their timestamps, numbers with more digits included
+        self.assertEqual(
+            ([1111, 2222, Decimal("3000.25"), 5000, Decimal("9999.5")], None),
+            vote_history.get_topic_votes_page("user_1", "project_a/topic_aaa"),
+        )
+
+        # Time ranges
+        self.assertEqual(
+            ([2222, Decimal("3000.25"), 5000], None),
+            vote_history.get_topic_votes_page(
+                "user_1", "project_a/topic_aaa", start=2000, end=5000
+            ),
+        )
+        self.assertEqual(
+            ([5000, Decimal("9999.5")], None),
+            vote_history.get_topic_votes_page(
+                "user_1", "project_a/topic_aaa", start=4000
+            ),
+        )
+        self.assertEqual(
+            ([1111], None),
+            vote_history.get_topic_votes_page(
+                "user_1", "project_a/topic_aaa", end=2000
+            ),
+        )
+        self.assertEqual(
+            ([], None),
+            vote_history.get_topic_votes_page("user_1", "project_a/topic_ccc"),
+        )
+
+        # Pagination
+        pages = []
+        position = None
+        while True:
+            timestamps, position = vote_history.get_topic_votes_page(
+                "user_1",
+                "project_a/topic_aaa",
+                start=2000,
+                limit=2,
+                start_position=position,
+            )
+            pages.append(timestamps)
+            if position is None:
+                break
+
+        # DynamoDB may return an empty last page
+        self.assertEqual(
+            [[2222, Decimal("3000.25")], [5000, Decimal("9999.5")]],
+            [page for page in pages if page],
+        )
+        self.assertRaises(
+            ValueError,
+            vote_history.get_topic_votes_page,
+            "user_1",
+            "project_a/topic_aaa",
+            start_position="invalid",
+        )
+
+    def test_get_user_votes_page(self):
+        vote_history = VoteHistory()
+        with mock.patch("time.time", return_value=3000):
+            vote_history.add_vote_history("user_1", "project_b", "topic_ccc", "10.0.0.1")
+
+        self.assertEqual(
+            ([dict(topic_key="project_a/topic_bbb", timestamp=3333)], None),
+            vote_history.get_user_votes_page("user_1", start=3100),
+        )
+
+        votes, position = vote_history.get_user_votes_page("user_1", limit=3)
+        self.assertEqual(
+            [
+                dict(topic_key="project_a/topic_aaa", timestamp=1111),
+                dict(topic_key="project_a/topic_aaa", timestamp=2222),
+                dict(topic_key="project_b/topic_ccc", timestamp=3000),
+            ],
+            votes,
+        )
+        self.assertEqual(
+            [dict(topic_key="project_a/topic_bbb", timestamp=3333)],
+            vote_history.get_user_votes_page("user_1", start_position=position)[0],
+        )
+        self.assertEqual(([], None), vote_history.get_user_votes_page("user_2"))
+
     def test_check_ip_voted(self):
         vote_history = VoteHistory()
 
@@ -1,3 +1,4 @@
+import time
 import unittest
 from unittest import mock
 from datetime import datetime
@@ -14,8 +15,15 @@ from iwanttoreadmore.common import (
     check_password_hash,
     get_cookie_date,
     get_cookie_secret,
+    get_cookie_secrets,
+    clear_cookie_secrets_cache,
+    get_cookie_signature,
     sign_cookie,
+    sign_string,
+    check_string_signature,
     check_cookie_signature,
+    check_session_cookie,
+    get_session_cache_stats,
     hash_string,
     get_ip_address,
 )
@@ -24,6 +32,7 @@ from iwanttoreadmore.common import (
 @mock_ssm
 class CommonTestCase(unittest.TestCase):
     def setUp(self):
+        clear_cookie_secrets_cache()
         client = boto3.client("ssm")
         client.put_parameter(
             Name="IWANTTOREADMORE_COOKIE_SECRET",
@@ -34,7 +43,28 @@ class CommonTestCase(unittest.TestCase):
 
     def tearDown(self):
         client = boto3.client("ssm")
-        client.delete_parameter(Name="IWANTTOREADMORE_COOKIE_SECRET")
+        client.delete_parameters(
+            Names=[
+                "IWANTTOREADMORE_COOKIE_SECRET",
+                "IWANTTOREADMORE_COOKIE_SECRET_PREVIOUS",
+            ]
+        )
+        clear_cookie_secrets_cache()
+
+    def rotate_cookie_secret(self, new_secret):
+        client = boto3.client("ssm")
+        client.put_parameter(
+            Name="IWANTTOREADMORE_COOKIE_SECRET_PREVIOUS",
+            Value=get_cookie_secret(),
+            Type="String",
+            Overwrite=True,
+        )
+        client.put_parameter(
+            Name="IWANTTOREADMORE_COOKIE_SECRET",
+            Value=new_secret,
+            Type="String",
+            Overwrite=True,
+        )
 
     @mock.patch("time.time", return_value=9999)
     def test_get_current_timestamp(self, _):
@@ -130,14 +160,95 @@ class CommonTestCase(unittest.TestCase):
     def test_get_cookie_secret(self):
         self.assertEqual("cookiesecret", get_cookie_secret())
 
-    @mock.patch("bcrypt.gensalt", return_value=b"$2b$12$FTU0sMh7DANHArQW1CBGiu")
+    def test_get_cookie_secrets_cache(self):
+        self.assertEqual(["cookiesecret"], get_cookie_secrets())
+
+        # The cached secrets are used until the TTL expires
+        self.rotate_cookie_secret("newcookiesecret")
+        self.assertEqual(["cookiesecret"], get_cookie_secrets())
+
+        with mock.patch("time.time", return_value=time.time() + 301):
+            self.assertEqual(["newcookiesecret", "cookiesecret"], get_cookie_secrets())
+
+    def test_get_cookie_secrets_force_refresh(self):
+        with mock.patch("time.time", return_value=1000):
+            self.assertEqual(["cookiesecret"], get_cookie_secrets())
+            self.rotate_cookie_secret("newcookiesecret")
+
+            # Forced refreshes are rate limited
+            self.assertEqual(["cookiesecret"], get_cookie_secrets(force_refresh=True))
+
+        with mock.patch("time.time", return_value=1031):
+            self.assertEqual(
+                ["newcookiesecret", "cookiesecret"],
+                get_cookie_secrets(force_refresh=True),
+            )
+
+    def test_get_cookie_secrets_missing(self):
+        boto3.client("ssm").delete_parameter(Name="IWANTTOREADMORE_COOKIE_SECRET")
+        with self.assertRaises(ValueError):
+            get_cookie_secrets()
+
+    @mock.patch("time.time", return_value=1000)
     def test_sign_cookie(self, _):
         cookie = "user=haltakov"
         self.assertEqual(
-            "user=haltakov&signature=$2b$12$FTU0sMh7DANHArQW1CBGiuKdkfpeViomU/Smp2TFBwv0wmBhMEizC",
+            "user=haltakov&expires=2593000&version=2&signature=05c0840072a97acf0eb3e20b0285e8fe7aceec9d773888c40c26fcaafe965834",
             sign_cookie(cookie),
         )
 
+    def test_sign_string(self):
+        signature = sign_string("votes/user_1:data", "cursor")
+
+        self.assertTrue(check_string_signature("votes/user_1:data", signature, "cursor"))
+        self.assertFalse(check_string_signature("votes/user_2:data", signature, "cursor"))
+
+        # The key is derived per purpose, so the signature is valid neither for other purposes nor as a cookie signature
+        self.assertFalse(check_string_signature("votes/user_1:data", signature, "other"))
+        self.assertNotEqual(
+            get_cookie_signature("votes/user_1:data", "cookiesecret"), signature
+        )
+
+    def test_check_cookie_signature_hmac(self):
+        cookie = "user=haltakov&expires=2593000&version=2&signature=05c0840072a97acf0eb3e20b0285e8fe7aceec9d773888c40c26fcaafe965834"
+
+        with mock.patch("time.time", return_value=2000):
+            self.assertEqual("haltakov", check_cookie_signature(cookie))
+            self.assertEqual(
+                "haltakov", check_cookie_signature(f"loggedinuser=haltakov; {cookie}")
+            )
+            self.assertEqual(
+                dict(user="haltakov", legacy=False), check_session_cookie(cookie)
+            )
+
+            # Changed content
+            self.assertEqual(
+                None, check_cookie_signature(cookie.replace("haltakov", "otheruser"))
+            )
+            self.assertEqual(
+                None, check_cookie_signature(cookie.replace("2593000", "9593000"))
+            )
+            self.assertEqual(
+                None, check_cookie_signature(cookie.replace("version=2", "version=3"))
+            )
+            self.assertEqual(None, check_cookie_signature(cookie[:-1] + "0"))
+
+        # Expired session
+        with mock.patch("time.time", return_value=2593000):
+            self.assertEqual(None, check_cookie_signature(cookie))
+
+    def test_check_session_cookie_legacy(self):
+        cookie = "user=haltakov&signature=$2b$12$FTU0sMh7DANHArQW1CBGiuKdkfpeViomU/Smp2TFBwv0wmBhMEizC"
+        self.assertEqual(dict(user="haltakov", legacy=True), check_session_cookie(cookie))
+
+        # Signatures which are not bcrypt hashes are invalid
+        self.assertEqual(None, check_session_cookie("user=haltakov&signature=garbage"))
+        self.assertEqual(None, check_session_cookie("user=haltakov&signature="))
+
+        # Legacy cookies are rejected after the migration window
+        with mock.patch.dict("os.environ", {"LEGACY_COOKIES_ACCEPTED_UNTIL": "1000"}):
+            self.assertEqual(None, check_session_cookie(cookie))
+
     def test_check_cookie_signature(self):
         self.assertEqual(
             "haltakov",
@@ -165,6 +276,72 @@ class CommonTestCase(unittest.TestCase):
         )
         self.assertEqual(None, check_cookie_signature("user=haltakov"))
 
+    def test_check_cookie_signature_rotation(self):
+        cookie = "user=haltakov&signature=$2b$12$FTU0sMh7DANHArQW1CBGiuKdkfpeViomU/Smp2TFBwv0wmBhMEizC"
+
+        # Cookies signed with the previous secret are still valid after a rotation
+        self.rotate_cookie_secret("newcookiesecret")
+        clear_cookie_secrets_cache()
+        self.assertEqual("haltakov", check_cookie_signature(cookie))
+
+        # Cookies signed with a new secret force a refresh of the cached secrets
+        cookie_payload = f"user=haltakov&expires={int(time.time()) + 3600}&version=2"
+        new_cookie = f"{cookie_payload}&signature={get_cookie_signature(cookie_payload, 'othercookiesecret')}"
+        self.rotate_cookie_secret("othercookiesecret")
+        self.assertEqual(None, check_cookie_signature(new_cookie))
+        with mock.patch("time.time", return_value=time.time() + 31):
+            self.assertEqual("haltakov", check_cookie_signature(new_cookie))
+
+    def test_check_session_cookie_cache(self):
+        cookie = sign_cookie("user=haltakov")
+        stats = get_session_cache_stats()
+
+        # The second verification is answered from the cache
+        self.assertEqual("haltakov", check_cookie_signature(cookie))
+        with mock.patch("hmac.compare_digest") as compare_digest_mock:
+            self.assertEqual("haltakov", check_cookie_signature(cookie))
+            compare_digest_mock.assert_not_called()
+
+        self.assertEqual(stats["hits"] + 1, get_session_cache_stats()["hits"])
+        self.assertEqual(stats["misses"] + 1, get_session_cache_stats()["misses"])
+        self.assertEqual(1, get_session_cache_stats()["size"])
+
+        # Invalid cookies are not cached
+        changed_character = "1" if cookie[-1] == "0" else "0"
+        self.assertEqual(None, check_cookie_signature(cookie[:-1] + changed_character))
+        self.assertEqual(1, get_session_cache_stats()["size"])
+
+        # Cached sessions expire after the TTL
+        with mock.patch("time.time", return_value=time.time() + 61):
+            with mock.patch("hmac.compare_digest", return_value=False):
+                self.assertEqual(None, check_cookie_signature(cookie))
+
+    def test_check_session_cookie_cache_size(self):
+        with mock.patch.dict("os.environ", {"SESSION_CACHE_SIZE": "2"}):
+            cookies = [sign_cookie(f"user=user_{i}") for i in range(3)]
+            for cookie in cookies:
+                check_cookie_signature(cookie)
+            self.assertEqual(2, get_session_cache_stats()["size"])
+
+            # The least recently used session was evicted
+            hits = get_session_cache_stats()["hits"]
+            check_cookie_signature(cookies[0])
+            self.assertEqual(hits, get_session_cache_stats()["hits"])
+            check_cookie_signature(cookies[2])
+            self.assertEqual(hits + 1, get_session_cache_stats()["hits"])
+
+    def test_check_session_cookie_cache_secret_change(self):
+        check_cookie_signature(sign_cookie("user=haltakov"))
+        self.assertEqual(1, get_session_cache_stats()["size"])
+
+        self.rotate_cookie_secret("newcookiesecret")
+        get_cookie_secrets(force_refresh=True)
+        self.assertEqual(1, get_session_cache_stats()["size"])
+
+        with mock.patch("time.time", return_value=time.time() + 31):
+            get_cookie_secrets(force_refresh=True)
+        self.assertEqual(0, get_session_cache_stats()["size"])
+
     def test_hash_string(self):
         self.assertEqual(
             "67e97cce0420c8def20b568c93e97f86c186b35c", hash_string("test_string_1")
@@ -0,0 +1,55 @@
+import unittest
+from unittest import mock
+from moto import mock_dynamodb2
+from iwanttoreadmore.connections import (
+    get_connection_config,
+    get_session,
+    get_dynamodb_resource,
+    get_table,
+    get_client,
+    reset_connections,
+)
+
+
+@mock_dynamodb2
+class ConnectionsTestCase(unittest.TestCase):
+    def setUp(self):
+        reset_connections()
+
+    def tearDown(self):
+        reset_connections()
+
+    def test_get_session(self):
+        self.assertIs(get_session(), get_session())
+
+    def test_get_dynamodb_resource(self):
+        self.assertIs(get_dynamodb_resource(), get_dynamodb_resource())
+
+    def test_get_table(self):
+        self.assertIs(get_table("table_a"), get_table("table_a"))
+        self.assertIsNot(get_table("table_a"), get_table("table_b"))
+        self.assertEqual("table_a", get_table("table_a").name)
+
+    def test_get_client(self):
+        self.assertIs(get_client("ssm"), get_client("ssm"))
+
+    def test_reset_connections(self):
+        table = get_table("table_a")
+        reset_connections()
+        self.assertIsNot(table, get_table("table_a"))
+
+    def test_get_connection_config(self):
+        with mock.patch.dict(
+            "os.environ", {"CONNECTION_POOL_SIZE": "50", "CONNECTION_TCP_KEEPALIVE": "0"}
+        ):
+            config = get_connection_config()
+            self.assertEqual(50, config.max_pool_connections)
+            self.assertFalse(config.tcp_keepalive)
+
+        config = get_connection_config()
+        self.assertEqual(10, config.max_pool_connections)
+        self.assertTrue(config.tcp_keepalive)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import io
+import json
+import logging
+import unittest
+from unittest import mock
+from types import SimpleNamespace
+from iwanttoreadmore.logs import (
+    configure_logging,
+    get_request_id,
+    get_loggable_event,
+    log_sampled_event,
+    set_request_id,
+    reset_request_id,
+)
+from iwanttoreadmore.handlers.handler_helpers import instrumented, create_response
+
+
+class LogsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.output = io.StringIO()
+        self.logger = logging.getLogger("iwanttoreadmore.test")
+
+    def tearDown(self):
+        configure_logging()
+
+    def configure(self, log_level="INFO", sample_rate="0"):
+        with mock.patch.dict(
+            "os.environ",
+            {"LOG_LEVEL": log_level, "EVENT_LOG_SAMPLE_RATE": sample_rate},
+        ):
+            configure_logging(self.output)
+
+    def read_logs(self):
+        return [json.loads(line) for line in self.output.getvalue().splitlines()]
+
+    def test_json_output(self):
+        self.configure()
+
+        token = set_request_id("request_1")
+        try:
+            self.logger.info("Vote for %s", "topic_a", extra=dict(fields=dict(a=1)))
+        finally:
+            reset_request_id(token)
+        self.logger.info("Outside of a request")
+
+        logs = self.read_logs()
+        self.assertEqual(2, len(logs))
+        self.assertEqual("INFO", logs[0]["level"])
+        self.assertEqual("iwanttoreadmore.test", logs[0]["logger"])
+        self.assertEqual("request_1", logs[0]["request_id"])
+        self.assertEqual("Vote for topic_a", logs[0]["message"])
+        self.assertEqual(1, logs[0]["a"])
+        self.assertIsNone(logs[1]["request_id"])
+
+    def test_lazy_formatting(self):
+        self.configure("INFO")
+
+        argument = mock.MagicMock()
+        self.logger.debug("Event: %s", argument)
+
+        argument.__str__.assert_not_called()
+        self.assertEqual([], self.read_logs())
+
+        self.configure("DEBUG")
+        self.logger.debug("Event: %s", argument)
+
+        argument.__str__.assert_called_once()
+        self.assertEqual(1, len(self.read_logs()))
+
+    def test_get_request_id(self):
+        event = dict(requestContext=dict(requestId="request_1"))
+
+        self.assertEqual(
+            "invocation_1",
+            get_request_id(event, SimpleNamespace(aws_request_id="invocation_1")),
+        )
+        self.assertEqual("request_1", get_request_id(event, None))
+        self.assertIsNone(get_request_id(dict(), None))
+
+    def test_get_loggable_event(self):
+        event = dict(
+            headers={"Cookie": "user=user_1", "Client-Ip": "192.168.0.1"},
+            body="identifier=user_1&password=test",
+        )
+
+        loggable_event = get_loggable_event(event)
+
+        self.assertEqual(
+            {"Cookie": "<redacted>", "Client-Ip": "192.168.0.1"},
+            loggable_event["headers"],
+        )
+        self.assertEqual("<redacted>", loggable_event["body"])
+        self.assertEqual("user=user_1", event["headers"]["Cookie"])
+        self.assertEqual(dict(body="1"), get_loggable_event(dict(body="1")))
+
+    def test_log_sampled_event(self):
+        self.configure()
+        event = dict(pathParameters=dict(user="user_1"), body=None)
+
+        with mock.patch.dict("os.environ", {"EVENT_LOG_SAMPLE_RATE": "0.5"}):
+            with mock.patch("random.random", return_value=0.7):
+                self.assertFalse(log_sampled_event(self.logger, event))
+            with mock.patch("random.random", return_value=0.2):
+                self.assertTrue(log_sampled_event(self.logger, event))
+
+        with mock.patch.dict("os.environ", {"EVENT_LOG_SAMPLE_RATE": "0"}):
+            with mock.patch("random.random", return_value=0.0):
+                self.assertFalse(log_sampled_event(self.logger, event))
+
+        logs = self.read_logs()
+        self.assertEqual(1, len(logs))
+        self.assertEqual("Sampled event", logs[0]["message"])
+        self.assertEqual(event, logs[0]["event"])
+
+    def test_instrumented_handler_logs(self):
+        self.configure()
+
+        @instrumented
+        def handler(event, _):
+            self.logger.info("Handling request")
+            return create_response(200)
+
+        event = dict(requestContext=dict(requestId="request_1"))
+        with mock.patch.dict(
+            "os.environ", {"EVENT_LOG_SAMPLE_RATE": "1", "INVOCATION_METRICS": "0"}
+        ):
+            handler(event, SimpleNamespace(aws_request_id="invocation_1"))
+
+        logs = self.read_logs()
+        self.assertEqual(
+            ["Sampled event", "Handling request"], [log["message"] for log in logs]
+        )
+        self.assertEqual(
+            ["invocation_1", "invocation_1"], [log["request_id"] for log in logs]
+        )
+
+        self.logger.info("After the request")
+        self.assertIsNone(self.read_logs()[-1]["request_id"])
@@ -0,0 +1,141 @@
+import io
+import os
+import json
+import unittest
+from unittest import mock
+from contextlib import redirect_stdout
+from moto import mock_dynamodb2
+from iwanttoreadmore.connections import get_table, reset_connections
+from iwanttoreadmore.metrics import (
+    get_request_tables,
+    get_invocation_metrics,
+    reset_invocation_metrics,
+    emit_invocation_metrics,
+)
+from iwanttoreadmore.handlers.handler_helpers import instrumented
+from tests.data.data_test_user import create_users_table, create_test_users_data
+from tests.helpers import remove_table
+
+
+@mock_dynamodb2
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        os.environ["USERS_TABLE"] = "iwanttoreadmore-users-metrics-test"
+        create_test_users_data(create_users_table(os.environ["USERS_TABLE"]))
+        reset_connections()
+        reset_invocation_metrics()
+
+    def tearDown(self):
+        remove_table(os.environ["USERS_TABLE"])
+        reset_connections()
+        reset_invocation_metrics()
+
+    def test_get_request_tables(self):
+        self.assertEqual(["table_a"], get_request_tables(dict(TableName="table_a")))
+        self.assertEqual(
+            ["table_a", "table_b"],
+            get_request_tables(dict(RequestItems=dict(table_b=[], table_a=[]))),
+        )
+        self.assertEqual(
+            ["table_a", "table_b"],
+            get_request_tables(
+                dict(
+                    TransactItems=[
+                        dict(Put=dict(TableName="table_b")),
+                        dict(Update=dict(TableName="table_a")),
+                        dict(ConditionCheck=dict(TableName="table_b")),
+                    ]
+                )
+            ),
+        )
+        self.assertEqual([], get_request_tables(dict()))
+
+    def test_invocation_metrics(self):
+        table = get_table(os.environ["USERS_TABLE"])
+        table.get_item(Key={"User": "user_1"})
+        table.get_item(Key={"User": "user_2"})
+        table.update_item(
+            Key={"User": "user_1"},
+            ExpressionAttributeValues={":IsPublic": False},
+            UpdateExpression="SET IsPublic = :IsPublic",
+        )
+
+        metrics = get_invocation_metrics()
+        self.assertEqual(3, metrics["requests"])
+        self.assertEqual(1.5, metrics["consumed_capacity"])
+        self.assertGreater(metrics["latency_ms"], 0)
+        self.assertEqual(
+            [
+                "GetItem iwanttoreadmore-users-metrics-test",
+                "UpdateItem iwanttoreadmore-users-metrics-test",
+            ],
+            list(metrics["operations"]),
+        )
+        self.assertEqual(
+            2,
+            metrics["operations"]["GetItem iwanttoreadmore-users-metrics-test"][
+                "requests"
+            ],
+        )
+
+        reset_invocation_metrics()
+        self.assertEqual(
+            dict(requests=0, consumed_capacity=0, latency_ms=0, operations=dict()),
+            get_invocation_metrics(),
+        )
+
+    def test_emit_invocation_metrics(self):
+        get_table(os.environ["USERS_TABLE"]).get_item(Key={"User": "user_1"})
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            emit_invocation_metrics("get_user_data")
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(1, len(lines))
+
+        metrics = json.loads(lines[0])
+        self.assertEqual("get_user_data", metrics["Handler"])
+        self.assertEqual(1, metrics["DynamoDBRequests"])
+        self.assertEqual(0.5, metrics["DynamoDBConsumedCapacity"])
+        self.assertIn(
+            "GetItem iwanttoreadmore-users-metrics-test", metrics["DynamoDBOperations"]
+        )
+
+        emf = metrics["_aws"]["CloudWatchMetrics"][0]
+        self.assertEqual([["Handler"]], emf["Dimensions"])
+        self.assertEqual(
+            ["DynamoDBRequests", "DynamoDBConsumedCapacity", "DynamoDBLatency"],
+            [metric["Name"] for metric in emf["Metrics"]],
+        )
+        for metric in emf["Metrics"]:
+            self.assertIn(metric["Name"], metrics)
+
+        # Disabled metrics are not emitted
+        output = io.StringIO()
+        with mock.patch.dict("os.environ", {"INVOCATION_METRICS": "0"}):
+            with redirect_stdout(output):
+                emit_invocation_metrics("get_user_data")
+        self.assertEqual("", output.getvalue())
+
+    def test_instrumented(self):
+        @instrumented
+        def handler(event, _):
+            table = get_table(os.environ["USERS_TABLE"])
+            for user in event["users"]:
+                table.get_item(Key={"User": user})
+            return dict(statusCode=200)
+
+        # Every invocation emits only its own requests
+        for users in [["user_1", "user_2"], ["user_1"]]:
+            output = io.StringIO()
+            with redirect_stdout(output):
+                self.assertEqual(dict(statusCode=200), handler(dict(users=users), None))
+
+            metrics = json.loads(output.getvalue())
+            self.assertEqual("handler", metrics["Handler"])
+            self.assertEqual(len(users), metrics["DynamoDBRequests"])
+
+
+if __name__ == "__main__":
+    unittest.main()
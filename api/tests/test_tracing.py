@@ -0,0 +1,144 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+from contextlib import redirect_stdout
+from iwanttoreadmore.tracing import span, trace, traced, trace_methods
+
+
+@trace_methods
+class TracedClass:
+    def method(self, value):
+        return self.helper(value) + 1
+
+    def helper(self, value):
+        return value * 2
+
+    def failing(self):
+        raise ValueError("Failed")
+
+    def generator(self):
+        yield 1
+
+    def _private(self):
+        return 0
+
+
+class TracingTestCase(unittest.TestCase):
+    def read_trace(self, function):
+        output = io.StringIO()
+        with mock.patch.dict("os.environ", {"TRACE_EXPORT": "stdout"}):
+            with redirect_stdout(output):
+                function()
+
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_disabled(self):
+        with mock.patch.dict("os.environ", {"TRACE_EXPORT": ""}):
+            output = io.StringIO()
+            with redirect_stdout(output):
+                with trace("root") as root:
+                    self.assertIsNone(root)
+                    with span("child") as child:
+                        self.assertIsNone(child)
+
+            self.assertEqual("", output.getvalue())
+
+        # Spans outside of a trace are not recorded
+        with span("child") as child:
+            self.assertIsNone(child)
+        self.assertEqual(3, TracedClass().method(1))
+
+    def test_trace(self):
+        def run():
+            with trace("root", user="user_1"):
+                with span("stage_1"):
+                    TracedClass().method(1)
+                with span("stage_2", topic="topic_a") as stage:
+                    stage["attributes"]["outcome"] = "added"
+
+        spans = {span["name"]: span for span in self.read_trace(run)}
+        self.assertEqual(
+            ["root", "stage_1", "TracedClass.method", "TracedClass.helper", "stage_2"],
+            list(spans),
+        )
+
+        # All spans belong to the same trace and form a tree
+        self.assertEqual(1, len({span["trace_id"] for span in spans.values()}))
+        self.assertIsNone(spans["root"]["parent_id"])
+        self.assertEqual(spans["root"]["span_id"], spans["stage_1"]["parent_id"])
+        self.assertEqual(
+            spans["stage_1"]["span_id"], spans["TracedClass.method"]["parent_id"]
+        )
+        self.assertEqual(
+            spans["TracedClass.method"]["span_id"],
+            spans["TracedClass.helper"]["parent_id"],
+        )
+        self.assertEqual(spans["root"]["span_id"], spans["stage_2"]["parent_id"])
+
+        self.assertEqual(dict(user="user_1"), spans["root"]["attributes"])
+        self.assertEqual(
+            dict(topic="topic_a", outcome="added"), spans["stage_2"]["attributes"]
+        )
+        self.assertGreaterEqual(
+            spans["root"]["duration_ms"], spans["stage_1"]["duration_ms"]
+        )
+        self.assertNotIn("spans", spans["root"])
+
+        # Nested traces become spans of the outer trace
+        def run_nested():
+            with trace("root"):
+                with trace("nested"):
+                    pass
+
+        spans = self.read_trace(run_nested)
+        self.assertEqual(["root", "nested"], [span["name"] for span in spans])
+        self.assertEqual(spans[0]["span_id"], spans[1]["parent_id"])
+
+    def test_error(self):
+        def run():
+            with self.assertRaises(ValueError):
+                with trace("root"):
+                    TracedClass().failing()
+
+        spans = self.read_trace(run)
+        self.assertEqual(["ValueError", "ValueError"], [span["error"] for span in spans])
+
+    def test_traced(self):
+        @traced("function")
+        def function(value):
+            return value + 1
+
+        def run():
+            with trace("root"):
+                self.assertEqual(2, function(1))
+                self.assertEqual([1], list(TracedClass().generator()))
+                self.assertEqual(0, TracedClass()._private())
+
+        spans = self.read_trace(run)
+        self.assertEqual(["root", "function"], [span["name"] for span in spans])
+        self.assertEqual("function", function.__name__)
+
+    def test_export_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "traces.jsonl")
+
+            with mock.patch.dict("os.environ", {"TRACE_EXPORT": path}):
+                for _ in range(2):
+                    with trace("root"):
+                        with span("child"):
+                            pass
+
+            with open(path) as file:
+                spans = [json.loads(line) for line in file]
+
+        self.assertEqual(
+            ["root", "child", "root", "child"], [span["name"] for span in spans]
+        )
+        self.assertEqual(2, len({span["trace_id"] for span in spans}))
+
+
+if __name__ == "__main__":
+    unittest.main()